@@ -1,66 +1,127 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from typing import List, Dict, Any, AsyncIterator, Optional
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from ..core.config import settings
 from ..core.database import get_db
 from ..api.deps import get_current_user
 from ..models.user import User
-from ..crud import transaction, scheduled_task
-from ..services.ai_analysis_engine import ai_analysis_engine
+from ..crud import scheduled_task
+from ..services.ai_analysis_engine import ai_analysis_engine, PREFERRED_MODELS
 from ..services.scheduler_service import scheduler_service
+from ..services.inference_queue import inference_queue
+from ..services.circuit_breaker import circuit_breakers
+from ..services.ollama_model_manager import ollama_model_manager
+from ..services.ollama_model_benchmark_service import ollama_model_benchmark_service
+from ..services.ollama_server_pool import ollama_server_pool
+from ..services.llm_backends import get_llm_backend
+from ..services.precomputed_analysis_service import precomputed_analysis_service, ANALYSIS_TYPES
+from ..services.request_deadline import request_deadline
+from ..services.analysis_transactions import load_analysis_transactions
 from ..schemas.scheduled_task import ScheduledTaskCreate, ScheduledTaskResponse
+import asyncio
+import json
 
 router = APIRouter()
 
+# SSE 연결 유지용 heartbeat 간격 (초)
+SSE_HEARTBEAT_INTERVAL = 15
+
+def _load_transactions_data(db: Session, current_user: User, days_back: int) -> List[Dict[str, Any]]:
+    """최근 days_back일 거래 내역을 분석용 dict 목록으로 변환"""
+    return load_analysis_transactions(db, current_user.id, days_back)
+
+def _deadline_seconds(requested: Optional[float], default: float) -> Optional[float]:
+    """요청 마감 시간 (X-Request-Deadline 헤더는 엔드포인트 기본값보다 짧게만 지정 가능)"""
+    if requested and requested > 0:
+        return min(requested, default) if default > 0 else requested
+    return default if default > 0 else None
+
+def _validate_model(model: Optional[str]) -> None:
+    """요청별 모델 검증 (알 수 없는 값이 프로바이더 호출까지 가서 서킷 브레이커/라우터 상태에 반영되지 않도록)"""
+    if model is not None and model not in PREFERRED_MODELS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"지원하지 않는 모델: {model} (사용 가능: {', '.join(PREFERRED_MODELS)})"
+        )
+
+def _format_sse(event: str, data: Any) -> str:
+    """SSE 메시지 포맷"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def _sse_stream(
+    events: AsyncIterator[Dict[str, Any]],
+    deadline_seconds: Optional[float] = None
+) -> AsyncIterator[str]:
+    """분석 이벤트를 SSE로 변환 (이벤트가 없으면 heartbeat 주석 전송)"""
+    with request_deadline.scope(deadline_seconds):
+        # 마감 시간은 응답 스트리밍이 시작될 때 적용 (이벤트 태스크에 전파)
+        async for message in _sse_messages(events):
+            yield message
+
+async def _sse_messages(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """분석 이벤트를 SSE 메시지로 변환"""
+    iterator = events.__aiter__()
+    next_event = asyncio.ensure_future(iterator.__anext__())
+    
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_event}, timeout=SSE_HEARTBEAT_INTERVAL)
+            if not done:
+                # 프록시의 유휴 연결 종료 방지
+                yield ": keep-alive\n\n"
+                continue
+            
+            try:
+                item = next_event.result()
+            except StopAsyncIteration:
+                break
+            except Exception as e:
+                yield _format_sse("error", {"detail": f"AI 분석 실패: {str(e)}"})
+                break
+            
+            yield _format_sse(item["event"], item["data"])
+            next_event = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        if not next_event.done():
+            next_event.cancel()
+        await iterator.aclose()
+
 @router.post("/analyze")
 async def analyze_with_ai_engine(
     analysis_type: str = "pattern",  # pattern, report, optimization
     days_back: int = 30,
     force_refresh: bool = False,
+    model: Optional[str] = None,  # 이번 요청에만 사용할 모델 (빠른 조회는 local)
+    x_request_deadline: Optional[float] = Header(None),  # 요청 마감 시간 (초, 엔드포인트 기본값보다 짧게만)
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """AI 분석 엔진을 통한 통합 분석"""
+    _validate_model(model)
+    
     try:
         # 캐시 강제 새로고침
         if force_refresh:
             ai_analysis_engine.clear_cache(str(current_user.id))
         
-        # 사용자 거래 내역 조회
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days_back)
+        # 거래 조회부터 프로바이더 호출/재시도/fallback까지 남은 시간 안에서만 진행
+        with request_deadline.scope(_deadline_seconds(x_request_deadline, settings.analysis_deadline_seconds)):
+            # 사용자 거래 내역 조회
+            transactions_data = _load_transactions_data(db, current_user, days_back)
         
-        user_transactions = transaction.get_by_user(db, user_id=current_user.id, limit=1000)
-        
-        # 기간 필터링
-        filtered_transactions = [
-            t for t in user_transactions 
-            if start_date <= t.transaction_date <= end_date
-        ]
+            if not transactions_data:
+                return {
+                    "message": "분석할 거래 내역이 없습니다.",
+                    "analysis": None,
+                    "transaction_count": 0
+                }
         
-        if not filtered_transactions:
-            return {
-                "message": "분석할 거래 내역이 없습니다.",
-                "analysis": None,
-                "transaction_count": 0
-            }
-        
-        # 거래 데이터 변환
-        transactions_data = []
-        for t in filtered_transactions:
-            transactions_data.append({
-                "amount": float(t.amount),
-                "transaction_type": t.transaction_type,
-                "transaction_date": t.transaction_date,
-                "original_merchant_name": t.original_merchant_name,
-                "manual_category": getattr(t.merchant, 'manual_category', '기타') if t.merchant else '기타',
-                "memo": t.memo
-            })
-        
-        # AI 분석 엔진 실행
-        result = await ai_analysis_engine.analyze_with_preferred_ai(
-            current_user, transactions_data, analysis_type, db
-        )
+            # AI 분석 엔진 실행
+            result = await ai_analysis_engine.analyze_with_preferred_ai(
+                current_user, transactions_data, analysis_type, db, model=model
+            )
         
         return {
             "analysis_type": analysis_type,
@@ -70,25 +131,206 @@ async def analyze_with_ai_engine(
             "cached": result["cached"],
             "analysis": result["analysis"]
         }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI 분석 실패: {str(e)}")
+
+@router.post("/analyze/bundle")
+async def analyze_bundle_with_ai_engine(
+    analysis_types: str = ",".join(ANALYSIS_TYPES),  # 쉼표로 구분 (pattern,report,optimization)
+    days_back: int = 30,
+    force_refresh: bool = False,
+    model: Optional[str] = None,  # 이번 요청에만 사용할 모델 (빠른 조회는 local)
+    x_request_deadline: Optional[float] = Header(None),  # 요청 마감 시간 (초, 엔드포인트 기본값보다 짧게만)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """여러 분석을 한 요청으로 수행 (거래 조회/요약 1회, 타입별 결과는 개별 캐싱)"""
+    requested_types = list(dict.fromkeys(t.strip() for t in analysis_types.split(",") if t.strip()))
+    invalid_types = [t for t in requested_types if t not in ANALYSIS_TYPES]
+    if not requested_types or invalid_types:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 분석 타입: {', '.join(invalid_types) or analysis_types}")
+    _validate_model(model)
+    
+    try:
+        # 캐시 강제 새로고침
+        if force_refresh:
+            ai_analysis_engine.clear_cache(str(current_user.id))
+        
+        with request_deadline.scope(_deadline_seconds(x_request_deadline, settings.analysis_bundle_deadline_seconds)):
+            transactions_data = _load_transactions_data(db, current_user, days_back)
+        
+            if not transactions_data:
+                return {
+                    "message": "분석할 거래 내역이 없습니다.",
+                    "results": {},
+                    "transaction_count": 0
+                }
+        
+            bundle = await ai_analysis_engine.analyze_bundle(
+                current_user, transactions_data, requested_types, db, model=model
+            )
+        
+        return {
+            "analysis_types": requested_types,
+            "transaction_count": len(transactions_data),
+            "days_analyzed": days_back,
+            "mode": bundle["mode"],
+            "results": bundle["results"]
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"AI 분석 실패: {str(e)}")
+
+@router.post("/analyze/stream")
+async def stream_analysis_with_ai_engine(
+    analysis_type: str = "pattern",  # pattern, report, optimization
+    days_back: int = 30,
+    force_refresh: bool = False,
+    model: Optional[str] = None,  # 이번 요청에만 사용할 모델 (빠른 조회는 local)
+    x_request_deadline: Optional[float] = Header(None),  # 요청 마감 시간 (초, 엔드포인트 기본값보다 짧게만)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> StreamingResponse:
+    """AI 분석 엔진 스트리밍 분석 (SSE: status/token 이벤트 후 최종 result 이벤트)"""
+    _validate_model(model)
+    
+    try:
+        # 캐시 강제 새로고침
+        if force_refresh:
+            ai_analysis_engine.clear_cache(str(current_user.id))
+        
+        transactions_data = _load_transactions_data(db, current_user, days_back)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI 분석 실패: {str(e)}")
+    
+    if not transactions_data:
+        raise HTTPException(status_code=404, detail="분석할 거래 내역이 없습니다.")
+    
+    events = ai_analysis_engine.stream_with_preferred_ai(
+        current_user, transactions_data, analysis_type, db, model=model
+    )
+    
+    return StreamingResponse(
+        _sse_stream(events, _deadline_seconds(x_request_deadline, settings.analysis_stream_deadline_seconds)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.get("/precomputed/{analysis_type}")
+async def get_precomputed_analysis(
+    analysis_type: str,  # pattern, report, optimization
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """동기화/스케줄 작업 후 미리 계산된 최신 분석 조회 (LLM 호출 없이 즉시 반환)"""
+    if analysis_type not in ANALYSIS_TYPES:
+        raise HTTPException(status_code=400, detail=f"지원하지 않는 분석 타입입니다: {analysis_type}")
+    
+    try:
+        result = await asyncio.to_thread(precomputed_analysis_service.get, db, current_user.id, analysis_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"사전 계산 분석 조회 실패: {str(e)}")
+    
+    if result is None:
+        # 아직 계산된 결과가 없으면 백그라운드 계산 예약
+        precomputed_analysis_service.schedule_refresh(current_user.id)
+        raise HTTPException(status_code=404, detail="사전 계산된 분석이 없습니다. 잠시 후 다시 시도하세요.")
+    return result
 
 @router.get("/performance")
 async def get_ai_performance_metrics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    days_back: int = 30,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
-    """AI 분석 성능 메트릭 조회"""
+    """AI 분석 성능 메트릭 조회 (start/end 미지정 시 최근 days_back일)"""
     try:
+        end = end or datetime.now()
         metrics = await ai_analysis_engine.get_analysis_performance_metrics(
-            str(current_user.id), db
+            str(current_user.id), db,
+            start=start or end - timedelta(days=days_back),
+            end=end
         )
+        metrics["precomputed"] = precomputed_analysis_service.get_metrics()
         return metrics
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"성능 메트릭 조회 실패: {str(e)}")
 
+@router.get("/queue")
+async def get_inference_queue_metrics(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """AI 추론 대기열 상태 조회 (자원별 대기 건수, 대기 시간)"""
+    return inference_queue.get_metrics()
+
+@router.get("/circuit-breakers")
+async def get_circuit_breaker_states(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """프로바이더 / Ollama 서버별 서킷 브레이커 상태 조회"""
+    return circuit_breakers.get_states()
+
+@router.get("/ollama/models")
+async def get_ollama_model_status(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """사용자 Ollama 서버의 로드된 모델 / keep-alive / 모델 로딩 시간 통계 조회"""
+    try:
+        running_models = await ollama_model_manager.get_running_models(current_user.ollama_server_url)
+        status = ollama_model_manager.get_status(current_user.ollama_server_url)
+        return {"running_models": running_models, **next(iter(status.values()))}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ollama 모델 상태 조회 실패: {str(e)}")
+
+@router.post("/ollama/warmup")
+async def warm_up_ollama_model(
+    model: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """사용자 Ollama 서버에 모델을 미리 로드 (첫 분석의 모델 로딩 대기 제거)"""
+    return await ollama_model_manager.warm_up(current_user.ollama_server_url, model)
+
+def _benchmark_servers(current_user: User) -> List[str]:
+    """사용자 분석이 실행되는 Ollama 서버 (개인 서버, 없으면 서버 풀)"""
+    return [current_user.ollama_server_url] if current_user.ollama_server_url else ollama_server_pool.servers
+
+@router.get("/ollama/benchmark")
+async def get_ollama_benchmark_results(
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """사용자 Ollama 서버의 모델별 벤치마크 결과와 분석 타입별 자동 선택 모델 조회"""
+    return {
+        "servers": [ollama_model_benchmark_service.get_results(url) for url in _benchmark_servers(current_user)]
+    }
+
+@router.post("/ollama/benchmark")
+async def run_ollama_benchmark(
+    model: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """사용자 개인 Ollama 서버의 모델(지정 시 해당 모델만) 벤치마크를 백그라운드로 시작 (결과는 GET으로 조회)
+    
+    공유 서버(기본 서버, 서버 풀)는 OLLAMA_BENCHMARK_NIGHTLY로만 측정한다
+    """
+    if not current_user.ollama_server_url:
+        raise HTTPException(
+            status_code=403,
+            detail="개인 Ollama 서버가 등록된 사용자만 벤치마크를 실행할 수 있습니다. 공유 서버는 매일 새벽 새 모델을 자동으로 측정합니다."
+        )
+    
+    url = current_user.ollama_server_url
+    started = ollama_model_benchmark_service.schedule(url, [model] if model else None)
+    return {"started": [url] if started else [], "already_running": [] if started else [url]}
+
 @router.post("/clear-cache")
 async def clear_ai_cache(
     current_user: User = Depends(get_current_user)
@@ -212,11 +454,11 @@ async def delete_analysis_schedule(
 
 @router.post("/test-analysis")
 async def test_ai_analysis(
-    model_type: str = "auto",  # auto, gemini, ollama, hybrid
+    model_type: str = "auto",  # auto, gemini, ollama, hybrid, hybrid_fast, hybrid_shadow, local
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
-    """AI 분석 테스트 (개발/디버깅 용도)"""
+    """AI 분석 테스트 (개발/디버깅 용도, AI_PROVIDER_BACKEND=fake/replay면 네트워크 없이 실행)"""
     try:
         # 테스트용 더미 거래 데이터
         test_transactions = [
@@ -264,6 +506,7 @@ async def test_ai_analysis(
             "test_mode": True,
             "model_requested": model_type,
             "model_used": result["model_used"],
+            "llm_backend": get_llm_backend().name,
             "test_data_count": len(test_transactions),
             "analysis": result["analysis"]
         }
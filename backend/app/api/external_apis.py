@@ -1,12 +1,18 @@
 from typing import List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
 from ..core.database import get_db
 from ..api.deps import get_current_user
 from ..models.user import User
+from ..models.ai_analysis_log import AIAnalysisLog
 from ..crud import transaction, merchant, ai_analysis_log
 from ..services import woori_bank_service, google_places_service, gemini_service, create_ollama_service
+from ..services.ollama_capability_registry import ollama_capability_registry
+from ..services.analysis_log_writer import analysis_log_writer
+from ..services.analysis_payload_store import analysis_payload_store
+from ..services.precomputed_analysis_service import precomputed_analysis_service
+from ..services.analysis_transactions import load_analysis_transactions
 from ..schemas.transaction import TransactionCreate
 
 router = APIRouter()
@@ -57,6 +63,9 @@ async def sync_transactions(
             transaction.create_with_user(db, obj_in=transaction_create, user_id=current_user.id)
             synced_count += 1
         
+        # 새 거래 기준으로 사전 계산 분석 백그라운드 갱신
+        precomputed_analysis_service.schedule_refresh(current_user.id)
+        
         return {
             "message": f"{synced_count}건의 거래 내역이 동기화되었습니다.",
             "synced_count": synced_count
@@ -107,33 +116,12 @@ async def analyze_spending_patterns(
 ) -> Dict[str, Any]:
     """AI 소비 패턴 분석"""
     try:
-        # 사용자 거래 내역 조회
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days_back)
-        
-        user_transactions = transaction.get_by_user(db, user_id=current_user.id, limit=1000)
+        # 사용자 거래 내역 조회 (기간 필터링은 SQL에서)
+        transactions_data = load_analysis_transactions(db, current_user.id, days_back)
         
-        # 기간 필터링
-        filtered_transactions = [
-            t for t in user_transactions 
-            if start_date <= t.transaction_date <= end_date
-        ]
-        
-        if not filtered_transactions:
+        if not transactions_data:
             return {"message": "분석할 거래 내역이 없습니다.", "analysis": None}
         
-        # 거래 데이터 변환
-        transactions_data = []
-        for t in filtered_transactions:
-            transactions_data.append({
-                "amount": float(t.amount),
-                "transaction_type": t.transaction_type,
-                "transaction_date": t.transaction_date,
-                "original_merchant_name": t.original_merchant_name,
-                "manual_category": getattr(t.merchant, 'manual_category', '기타') if t.merchant else '기타',
-                "memo": t.memo
-            })
-        
         # AI 모델 선택 (사용자 설정에 따라)
         ai_model_used = current_user.preferred_ai_model or "gemini"
         analysis_result = None
@@ -151,11 +139,15 @@ async def analyze_spending_patterns(
             # Ollama 분석
             ollama_service = create_ollama_service(current_user.ollama_server_url)
             async with ollama_service as ollama:
-                if await ollama.is_available():
+                if await ollama_capability_registry.is_available(current_user.ollama_server_url):
                     if analysis_type == "pattern":
                         analysis_result = await ollama.analyze_spending_patterns(transactions_data)
                     elif analysis_type == "report":
                         analysis_result = await ollama.generate_monthly_report(transactions_data)
+                    
+                    # 생성 실패 시 서버 캐시 무효화
+                    if analysis_result and "error" in analysis_result:
+                        ollama_capability_registry.invalidate(current_user.ollama_server_url)
                 else:
                     # Ollama 연결 실패 시 Gemini로 fallback
                     if analysis_type == "pattern":
@@ -165,8 +157,7 @@ async def analyze_spending_patterns(
                     ai_model_used = "gemini"
         
         # 분석 로그 저장
-        ai_analysis_log.create_log(
-            db,
+        analysis_log_writer.enqueue(
             user_id=current_user.id,
             request_payload={
                 "analysis_type": analysis_type,
@@ -188,8 +179,7 @@ async def analyze_spending_patterns(
         
     except Exception as e:
         # 에러 로그 저장
-        ai_analysis_log.create_log(
-            db,
+        analysis_log_writer.enqueue(
             user_id=current_user.id,
             request_payload={"analysis_type": analysis_type, "days_back": days_back},
             response_payload={},
@@ -217,16 +207,20 @@ async def get_available_ai_models(
                 "available": False,
                 "models": [],
                 "description": "로컬에서 실행되는 오픈소스 LLM"
+            },
+            "local": {
+                "name": "빠른 분석 (LLM 없음)",
+                "available": True,
+                "description": "거래 데이터 계산만으로 즉시 생성하는 분석"
             }
         }
         
         # Ollama 모델 확인
         if current_user.ollama_server_url:
-            ollama_service = create_ollama_service(current_user.ollama_server_url)
-            async with ollama_service as ollama:
-                if await ollama.is_available():
-                    available_models["ollama"]["available"] = True
-                    available_models["ollama"]["models"] = await ollama.get_available_models()
+            capabilities = await ollama_capability_registry.get_capabilities(current_user.ollama_server_url)
+            if capabilities["available"]:
+                available_models["ollama"]["available"] = True
+                available_models["ollama"]["models"] = capabilities["models"]
         
         return {
             "current_preference": current_user.preferred_ai_model,
@@ -253,8 +247,11 @@ async def get_analysis_logs(
                 "request_timestamp": log.request_timestamp.isoformat(),
                 "ai_model_used": log.ai_model_used,
                 "status": log.status,
-                "request_payload": log.request_payload,
-                "response_payload": log.response_payload,
+                # payload 본문은 필요할 때 별도 조회 (목록 응답을 작게 유지)
+                "request_payload_hash": log.request_payload_hash,
+                "response_payload_hash": log.response_payload_hash,
+                "request_payload_url": f"/api/external/analysis-logs/payloads/{log.request_payload_hash}",
+                "response_payload_url": f"/api/external/analysis-logs/payloads/{log.response_payload_hash}",
                 "error_message": log.error_message
             }
             for log in logs
@@ -263,3 +260,33 @@ async def get_analysis_logs(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"분석 로그 조회 실패: {str(e)}")
 
+@router.get("/analysis-logs/payloads/{payload_hash}")
+async def get_analysis_log_payload(
+    payload_hash: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """AI 분석 로그 payload 조회 (해시 기준)"""
+    try:
+        # 본인 로그에서 참조하는 payload만 조회 가능
+        owned = db.query(AIAnalysisLog.id).filter(
+            AIAnalysisLog.user_id == current_user.id,
+            or_(
+                AIAnalysisLog.request_payload_hash == payload_hash,
+                AIAnalysisLog.response_payload_hash == payload_hash
+            )
+        ).first()
+        if not owned:
+            raise HTTPException(status_code=404, detail="payload를 찾을 수 없습니다.")
+        
+        payload = analysis_payload_store.get(db, payload_hash)
+        if payload is None:
+            raise HTTPException(status_code=404, detail="payload를 찾을 수 없습니다.")
+        
+        return {"hash": payload_hash, "payload": payload}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"payload 조회 실패: {str(e)}")
+
@@ -1,11 +1,15 @@
-from typing import List
+from typing import List, Dict, Any
+from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ..core.database import get_db
 from ..api.deps import get_current_user
 from ..models.user import User
+from ..models.transaction import Transaction
+from ..models.merchant import Merchant
 from ..crud import transaction
 from ..schemas.transaction import TransactionCreate, TransactionResponse
+from ..services.transaction_summary import TransactionColumns, summarize_transactions
 
 router = APIRouter()
 
@@ -31,6 +35,31 @@ def create_transaction(
     created_transaction = transaction.create_with_user(db, obj_in=transaction_in, user_id=current_user.id)
     return created_transaction
 
+@router.get("/summary")
+def read_transaction_summary(
+    days_back: int = 30,
+    top_merchants: int = 5,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    """기간별 거래 요약 (카테고리별 합계, 일별 추이, 상위 가맹점)"""
+    start_date = datetime.now() - timedelta(days=days_back)
+    
+    # ORM 객체 대신 필요한 컬럼만 조회
+    rows = (
+        db.query(
+            Transaction.amount,
+            Transaction.transaction_date,
+            Transaction.original_merchant_name,
+            Merchant.manual_category
+        )
+        .outerjoin(Merchant, Transaction.merchant_id == Merchant.id)
+        .filter(Transaction.user_id == current_user.id, Transaction.transaction_date >= start_date)
+        .all()
+    )
+    
+    return summarize_transactions(TransactionColumns.from_rows(rows), top_merchants)
+
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 def read_transaction(
     *,
@@ -19,8 +19,99 @@ class Settings(BaseSettings):
     google_places_api_key: Optional[str] = os.getenv("GOOGLE_PLACES_API_KEY")
     google_gemini_api_key: Optional[str] = os.getenv("GOOGLE_GEMINI_API_KEY")
     
+    # Gemini
+    gemini_max_concurrency: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+    gemini_request_timeout: float = float(os.getenv("GEMINI_REQUEST_TIMEOUT", "30"))
+    gemini_fast_model: str = os.getenv("GEMINI_FAST_MODEL", "gemini-1.5-flash")  # 작은 입력/가벼운 분석용
+    gemini_strong_model: str = os.getenv("GEMINI_STRONG_MODEL", "gemini-1.5-pro")  # 리포트/큰 입력용 (기본 모델, JSON 모드 지원 모델)
+    
     # Ollama
     default_ollama_server_url: str = os.getenv("DEFAULT_OLLAMA_SERVER_URL", "http://localhost:11434")
+    ollama_max_concurrency: int = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))  # 전체 Ollama 동시 요청 수
+    ollama_server_max_concurrency: int = int(os.getenv("OLLAMA_SERVER_MAX_CONCURRENCY", "1"))  # 서버당 동시 요청 수
+    ollama_capability_ttl: int = int(os.getenv("OLLAMA_CAPABILITY_TTL", "60"))  # 서버 상태/모델 목록 캐시 (초)
+    ollama_default_model: str = os.getenv("OLLAMA_DEFAULT_MODEL", "llama3")  # 서버에 있으면 우선 사용 (없으면 첫 번째 모델)
+    ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # 요청 후 모델을 메모리에 유지할 시간
+    ollama_keep_alive_overrides: str = os.getenv("OLLAMA_KEEP_ALIVE_OVERRIDES", "")  # 서버별 keep-alive ("URL=값,URL=값")
+    ollama_output_format: str = os.getenv("OLLAMA_OUTPUT_FORMAT", "schema")  # schema: JSON 스키마 제약, json: JSON 모드, none: 제약 없음
+    ollama_request_timeout: float = float(os.getenv("OLLAMA_REQUEST_TIMEOUT", "60"))  # 생성 요청 타임아웃 (초, 스트리밍은 청크 간 대기 시간)
+    ollama_early_stop: bool = os.getenv("OLLAMA_EARLY_STOP", "true").lower() == "true"  # 스트리밍으로 생성하고 최상위 JSON 객체가 완성되면 요청 종료 (뒤따르는 설명 생성 중단)
+    ollama_num_predict: str = os.getenv("OLLAMA_NUM_PREDICT", "pattern=1024,report=2048,chunk_summary=512")  # 분석 타입별 최대 생성 토큰 ("타입=N,...", default=N은 나머지 타입, 없으면 제한 없음)
+    ollama_pool_servers: str = os.getenv("OLLAMA_POOL_SERVERS", "")  # 개인 서버가 없는 사용자가 나눠 쓸 Ollama 서버 풀 ("URL,URL", 비어 있으면 DEFAULT_OLLAMA_SERVER_URL만 사용)
+    ollama_pool_strategy: str = os.getenv("OLLAMA_POOL_STRATEGY", "least_outstanding")  # least_outstanding: 사용 중 요청 수, latency: (사용 중 요청 수 + 1) x 평균 지연
+    ollama_fast_model: str = os.getenv("OLLAMA_FAST_MODEL", "")  # 작은 입력/가벼운 분석용 (서버에 없거나 미설정이면 기본 모델)
+    ollama_strong_model: str = os.getenv("OLLAMA_STRONG_MODEL", "")  # 리포트/큰 입력용 (서버에 없거나 미설정이면 기본 모델)
+    
+    # 모델 라우팅 (분석 타입/입력 크기로 fast/strong 티어 선택, 최근 지연/오류율이 기준을 넘으면 다른 티어로 전환)
+    model_router_strong_types: str = os.getenv("MODEL_ROUTER_STRONG_TYPES", "report")  # strong 티어를 사용할 분석 타입 (쉼표 구분)
+    model_router_large_input_tokens: int = int(os.getenv("MODEL_ROUTER_LARGE_INPUT_TOKENS", "800"))  # 예상 프롬프트 토큰이 이 이상이면 strong 티어
+    model_router_max_error_rate: float = float(os.getenv("MODEL_ROUTER_MAX_ERROR_RATE", "0.3"))  # 최근 오류율이 이를 넘으면 다른 티어로 전환
+    model_router_latency_slo_ms: int = int(os.getenv("MODEL_ROUTER_LATENCY_SLO_MS", "20000"))  # 최근 평균 지연이 이를 넘으면 다른 티어로 전환 (0이면 미사용)
+    model_router_window_seconds: int = int(os.getenv("MODEL_ROUTER_WINDOW_SECONDS", "300"))  # 지연/오류율 집계 창 (초)
+    
+    # Ollama 모델 벤치마크 (서버별 모델을 고정 분석 프롬프트로 측정하여 분석 타입별 자동 선택)
+    ollama_auto_model: bool = os.getenv("OLLAMA_AUTO_MODEL", "true").lower() == "true"  # 벤치마크 결과가 있으면 기준을 통과한 가장 빠른 모델 사용 (티어 모델 설정이 우선)
+    ollama_benchmark_types: str = os.getenv("OLLAMA_BENCHMARK_TYPES", "pattern,report")  # 벤치마크할 분석 타입 (쉼표 구분)
+    ollama_benchmark_runs: int = int(os.getenv("OLLAMA_BENCHMARK_RUNS", "2"))  # 모델/분석 타입별 측정 횟수
+    ollama_benchmark_min_valid_rate: float = float(os.getenv("OLLAMA_BENCHMARK_MIN_VALID_RATE", "1.0"))  # 스키마에 맞는 JSON 응답 비율이 이 이상인 모델만 자동 선택
+    ollama_benchmark_nightly: bool = os.getenv("OLLAMA_BENCHMARK_NIGHTLY", "true").lower() == "true"  # 매일 새벽 기본 서버/서버 풀의 새 모델 벤치마크 (개인 서버는 API로만 실행)
+    
+    # Circuit breaker (프로바이더 / Ollama 서버별)
+    circuit_failure_rate_threshold: float = float(os.getenv("CIRCUIT_FAILURE_RATE_THRESHOLD", "0.5"))
+    circuit_minimum_calls: int = int(os.getenv("CIRCUIT_MINIMUM_CALLS", "4"))  # 실패율 판단 최소 호출 수
+    circuit_window_size: int = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))  # 실패율 계산 대상 최근 호출 수
+    circuit_open_seconds: float = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))  # open 유지 시간 (초)
+    circuit_probe_timeout: float = float(os.getenv("CIRCUIT_PROBE_TIMEOUT", "120"))  # half_open 시험 요청이 결과 없이(취소/마감 초과) 이 시간을 넘기면 슬롯 반환 (초)
+    
+    # Hybrid (hybrid_fast / hybrid_shadow 모드)
+    hybrid_hedge_delay: float = float(os.getenv("HYBRID_HEDGE_DELAY", "2.0"))  # 보조 모델 요청 시작 지연 (초)
+    hybrid_loser_budget: float = float(os.getenv("HYBRID_LOSER_BUDGET", "0"))  # 승자 결정 후 느린 모델 대기 시간 (초, 0이면 즉시 취소)
+    hybrid_shadow_sample_rate: float = float(os.getenv("HYBRID_SHADOW_SAMPLE_RATE", "1.0"))  # 섀도 비교를 실행할 요청 비율 (0~1)
+    hybrid_shadow_max_in_flight: int = int(os.getenv("HYBRID_SHADOW_MAX_IN_FLIGHT", "4"))  # 동시에 진행할 섀도 비교 수 (초과 시 건너뜀)
+    
+    # 증분 분석 (이전 결과 재사용)
+    incremental_analysis_threshold: float = float(os.getenv("INCREMENTAL_ANALYSIS_THRESHOLD", "0.05"))  # 카테고리 금액 변화율이 이 이하이면 재사용 (0이면 비활성화)
+    incremental_analysis_max_age: int = int(os.getenv("INCREMENTAL_ANALYSIS_MAX_AGE", "86400"))  # 재사용 가능한 이전 결과 최대 경과 시간 (초)
+    incremental_analysis_max_baselines: int = int(os.getenv("INCREMENTAL_ANALYSIS_MAX_BASELINES", "10000"))  # 메모리에 보관할 기준 결과 최대 개수 (넘으면 오래된 것부터 제거)
+    
+    # 사전 계산 분석 (거래 동기화 후 백그라운드 갱신)
+    precomputed_analysis_days_back: int = int(os.getenv("PRECOMPUTED_ANALYSIS_DAYS_BACK", "30"))  # 사전 계산 분석 기간 (일)
+    precomputed_analysis_delay: float = float(os.getenv("PRECOMPUTED_ANALYSIS_DELAY", "5"))  # 갱신 요청 후 실행까지 대기 시간 (초, 연속 동기화를 한 번으로 합침)
+    
+    # 긴 거래 내역 청크 분석 (map-reduce)
+    analysis_max_transactions: int = int(os.getenv("ANALYSIS_MAX_TRANSACTIONS", "20000"))  # 분석 시 조회할 최대 거래 수
+    chunked_analysis_token_budget: int = int(os.getenv("CHUNKED_ANALYSIS_TOKEN_BUDGET", "6000"))  # 단일 프롬프트 예상 토큰이 이 값 또는 모델 컨텍스트(응답 토큰 제외)를 넘으면 청크 분석 (0이면 비활성화)
+    ollama_context_tokens: int = int(os.getenv("OLLAMA_CONTEXT_TOKENS", "2048"))  # Ollama 모델 컨텍스트 크기 (서버 num_ctx, 넘는 프롬프트는 잘리므로 청크 분석)
+    gemini_context_tokens: int = int(os.getenv("GEMINI_CONTEXT_TOKENS", "30720"))  # Gemini 모델 입력 토큰 한도 (gemini-pro 기준)
+    chunked_analysis_partition: str = os.getenv("CHUNKED_ANALYSIS_PARTITION", "month")  # month: 월별, category: 카테고리별
+    chunked_analysis_max_parallel: int = int(os.getenv("CHUNKED_ANALYSIS_MAX_PARALLEL", "4"))  # 동시에 요약할 청크 수
+    
+    # 요청 마감 시간 (엔드포인트별 기본값, X-Request-Deadline 헤더로 더 짧게 지정 가능) 및 적응형 타임아웃
+    analysis_deadline_seconds: float = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "45"))  # /analyze (0이면 마감 없음)
+    analysis_stream_deadline_seconds: float = float(os.getenv("ANALYSIS_STREAM_DEADLINE_SECONDS", "120"))  # /analyze/stream
+    analysis_bundle_deadline_seconds: float = float(os.getenv("ANALYSIS_BUNDLE_DEADLINE_SECONDS", "60"))  # /analyze/bundle
+    adaptive_timeout_multiplier: float = float(os.getenv("ADAPTIVE_TIMEOUT_MULTIPLIER", "3"))  # 프로바이더 타임아웃 = 관측 p95 x 배수 (0이면 고정 타임아웃)
+    adaptive_timeout_min: float = float(os.getenv("ADAPTIVE_TIMEOUT_MIN", "10"))  # 적응형 타임아웃 하한 (초)
+    
+    # 복합 분석 (여러 분석 타입을 한 요청으로)
+    analysis_bundle_mode: str = os.getenv("ANALYSIS_BUNDLE_MODE", "fused")  # fused: Gemini 통합 프롬프트 1회 호출, parallel: 타입별 동시 호출
+    
+    # 프로바이더 백엔드 (real: 실제 호출, fake: 가짜 응답, record: 실제 호출 녹화, replay: 녹화 재생)
+    ai_provider_backend: str = os.getenv("AI_PROVIDER_BACKEND", "real")
+    fake_llm_latency: float = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))  # 가짜 응답 첫 토큰 지연 (초)
+    fake_llm_tokens_per_second: float = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "40"))  # 가짜 응답 생성 속도
+    fake_llm_failure_rate: float = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))  # 가짜 장애 주입 확률
+    fake_llm_seed: int = int(os.getenv("FAKE_LLM_SEED", "42"))
+    ai_recordings_path: str = os.getenv("AI_RECORDINGS_PATH", "recordings/ai_responses.jsonl")  # 녹화 파일 (JSONL)
+    ai_replay_latency_scale: float = float(os.getenv("AI_REPLAY_LATENCY_SCALE", "0"))  # 재생 시 녹화된 지연 배율 (0이면 즉시)
+    
+    # AI 분석 로그 배치 기록
+    analysis_log_batch_size: int = int(os.getenv("ANALYSIS_LOG_BATCH_SIZE", "50"))  # 이 건수가 쌓이면 즉시 flush
+    analysis_log_flush_interval: float = float(os.getenv("ANALYSIS_LOG_FLUSH_INTERVAL", "2.0"))  # 최대 flush 간격 (초)
+    analysis_log_max_buffer: int = int(os.getenv("ANALYSIS_LOG_MAX_BUFFER", "5000"))  # 버퍼 최대 건수
+    analysis_log_retention_months: int = int(os.getenv("ANALYSIS_LOG_RETENTION_MONTHS", "6"))  # 로그 파티션 보존 개월 수
+    analysis_payload_purge_batch: int = int(os.getenv("ANALYSIS_PAYLOAD_PURGE_BATCH", "1000"))  # 고아 payload 삭제 배치 크기
+    analysis_log_maintenance_interval: float = float(os.getenv("ANALYSIS_LOG_MAINTENANCE_INTERVAL", "6"))  # 파티션 생성/만료 파티션 삭제/고아 payload 정리 주기 (시간, 시작 직후 1회 실행)
     
     # CORS
     allowed_origins: list = ["*"]  # In production, specify exact origins
@@ -25,7 +25,7 @@ if config.config_file_name is not None:
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 from app.core.database import Base
-from app.models import user, merchant, transaction, ai_analysis_log, scheduled_task
+from app.models import user, merchant, transaction, ai_analysis_log, ai_analysis_payload, scheduled_task, precomputed_analysis, ollama_model_benchmark
 
 target_metadata = Base.metadata
 
@@ -1,7 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.analysis_log_writer import analysis_log_writer
+from app.services.analysis_payload_store import analysis_payload_store
+from app.services.ollama_model_manager import ollama_model_manager
+from app.services.ollama_model_benchmark_service import ollama_model_benchmark_service
+from app.services.ollama_server_pool import ollama_server_pool
 # from app.services.scheduler_service import scheduler_service  # 임시 비활성화
+from datetime import datetime, timedelta
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="AI Household Ledger API",
@@ -60,14 +71,77 @@ async def startup_event():
     """애플리케이션 시작 시 실행"""
     # 스케줄러 시작 (임시 비활성화)
     # scheduler_service.start()
-    pass
+    
+    # AI 분석 로그 월 파티션 준비
+    try:
+        db = SessionLocal()
+        try:
+            await asyncio.to_thread(analysis_payload_store.ensure_partitions, db)
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"AI 분석 로그 파티션 생성 실패: {e}")
+    
+    # AI 분석 로그 배치 기록기 시작
+    analysis_log_writer.start()
+    
+    # AI 분석 로그 파티션 생성/보존 기간 정리 주기 실행
+    analysis_payload_store.start()
+    
+    # 알려진 Ollama 서버의 모델 예열 (시작을 지연시키지 않도록 백그라운드 실행)
+    asyncio.ensure_future(_warm_up_ollama_models())
+    
+    # 매일 새벽 새 Ollama 모델 벤치마크 (스케줄러와 무관하게 실행)
+    if settings.ollama_benchmark_nightly:
+        app.state.nightly_benchmark = asyncio.ensure_future(_benchmark_new_ollama_models_nightly())
+
+async def _warm_up_ollama_models():
+    """저장된 모델 벤치마크 결과 로드 후 기본 서버, 서버 풀, 사용자 등록 서버에 모델 preload"""
+    try:
+        db = SessionLocal()
+        try:
+            # 벤치마크로 자동 선택되는 모델을 예열하도록 먼저 로드
+            try:
+                await asyncio.to_thread(ollama_model_benchmark_service.load, db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Ollama 모델 벤치마크 결과 로드 실패: {e}")
+            servers = await asyncio.to_thread(ollama_model_manager.get_known_servers, db)
+        finally:
+            db.close()
+        await ollama_model_manager.warm_up_all(servers + ollama_server_pool.servers)
+    except Exception as e:
+        logger.error(f"Ollama 모델 예열 실패: {e}")
+
+async def _benchmark_new_ollama_models_nightly():
+    """매일 새벽 4시 운영 Ollama 서버(기본 서버, 서버 풀)의 아직 측정하지 않은 모델 벤치마크 (사용자 개인 서버는 제외)"""
+    while True:
+        now = datetime.now()
+        next_run = now.replace(hour=4, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        
+        for url in sorted(set(ollama_server_pool.servers) | {settings.default_ollama_server_url.rstrip("/")}):
+            try:
+                result = await ollama_model_benchmark_service.benchmark(url, only_new=True)
+                logger.info(f"Ollama 모델 벤치마크 완료 ({url}): {list(result.get('models', {}))}, 선택 {result.get('selected')}")
+            except Exception as e:
+                logger.error(f"Ollama 모델 벤치마크 실패 ({url}): {e}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """애플리케이션 종료 시 실행"""
     # 스케줄러 중지 (임시 비활성화)
     # scheduler_service.stop()
-    pass
+    
+    # 버퍼에 남은 AI 분석 로그 기록
+    await analysis_log_writer.stop()
+    await analysis_payload_store.stop()
+    
+    nightly_benchmark = getattr(app.state, "nightly_benchmark", None)
+    if nightly_benchmark:
+        nightly_benchmark.cancel()
 
 @app.get("/")
 def read_root():
@@ -1,21 +1,37 @@
-from sqlalchemy import Column, String, DateTime, func, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, String, DateTime, func, ForeignKey, Text, Index, Integer, Boolean
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
 from ..core.database import Base
 
 class AIAnalysisLog(Base):
     __tablename__ = "ai_analysis_logs"
+    __table_args__ = (
+        Index("ix_ai_analysis_logs_user_id_request_timestamp", "user_id", "request_timestamp"),
+        Index("ix_ai_analysis_logs_request_payload_hash", "request_payload_hash"),
+        Index("ix_ai_analysis_logs_response_payload_hash", "response_payload_hash"),
+        # 월 단위 RANGE 파티션 (파티션 생성/보존 기간 정리는 analysis_payload_store 참고)
+        {"postgresql_partition_by": "RANGE (request_timestamp)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    request_timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    request_payload = Column(JSONB, nullable=False)
-    response_payload = Column(JSONB, nullable=False)
+    # 파티션 키는 기본 키에 포함되어야 함
+    request_timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+    # ai_analysis_payloads.hash 참조 (payload 본문은 압축되어 별도 저장)
+    request_payload_hash = Column(String(64), nullable=False)
+    response_payload_hash = Column(String(64), nullable=False)
     ai_model_used = Column(String(50), nullable=False)
     status = Column(String(50), nullable=False)
     error_message = Column(Text, nullable=True)
+    # 성능 메트릭 (캐시 적중은 latency/토큰 없이 기록)
+    latency_ms = Column(Integer, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    generation_ms = Column(Integer, nullable=True)  # 토큰 생성 시간 (Ollama eval_duration, 알 수 없으면 NULL)
+    cache_hit = Column(Boolean, nullable=False, default=False, server_default="false")
+    # 진행 중인 같은 분석의 결과를 공유받은 요청 (single-flight 대기 요청)
+    coalesced = Column(Boolean, nullable=False, default=False, server_default="false")
 
     # Relationships
     user = relationship("User", back_populates="ai_analysis_logs")
-
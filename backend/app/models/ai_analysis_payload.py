@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime, func, Integer, LargeBinary
+from ..core.database import Base
+
+class AIAnalysisPayload(Base):
+    __tablename__ = "ai_analysis_payloads"
+
+    # 정규화된 JSON의 SHA-256 (내용 주소 방식, 동일 payload는 한 번만 저장)
+    hash = Column(String(64), primary_key=True)
+    compressed_payload = Column(LargeBinary, nullable=False)  # zlib 압축된 JSON
+    size_bytes = Column(Integer, nullable=False)  # 압축 전 크기
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, DateTime, func, Integer, Float, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from ..core.database import Base
+
+class OllamaModelBenchmark(Base):
+    __tablename__ = "ollama_model_benchmarks"
+    __table_args__ = (
+        # 서버/모델/분석 타입별 최신 측정 1건
+        UniqueConstraint("server_url", "model", "analysis_type", name="uq_ollama_model_benchmarks_server_model_type"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    server_url = Column(String(255), nullable=False)
+    model = Column(String(100), nullable=False)
+    analysis_type = Column(String(50), nullable=False)
+    runs = Column(Integer, nullable=False)
+    valid_runs = Column(Integer, nullable=False)  # 스키마에 맞는 JSON 응답 횟수
+    tokens_per_second = Column(Float, nullable=True)
+    avg_latency_ms = Column(Float, nullable=True)  # 모델 로드 후 요청 1건 평균 응답 시간
+    first_token_ms = Column(Float, nullable=True)
+    load_ms = Column(Float, nullable=True)
+    last_error = Column(Text, nullable=True)
+    benchmarked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, DateTime, func, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import relationship
+import uuid
+from ..core.database import Base
+
+class PrecomputedAnalysis(Base):
+    __tablename__ = "precomputed_analyses"
+    __table_args__ = (
+        # 사용자/분석 타입별 최신 결과 1건 (조회와 upsert 모두 이 인덱스 사용)
+        UniqueConstraint("user_id", "analysis_type", name="uq_precomputed_analyses_user_type"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    analysis_type = Column(String(50), nullable=False)
+    ai_model_used = Column(String(50), nullable=False)
+    result = Column(JSONB, nullable=False)
+    data_version = Column(String(64), nullable=False)  # 분석에 사용한 거래 데이터의 SHA-256
+    transaction_count = Column(Integer, nullable=False)
+    days_back = Column(Integer, nullable=False)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Relationships
+    user = relationship("User", back_populates="precomputed_analyses")
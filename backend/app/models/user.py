@@ -20,4 +20,5 @@ class User(Base):
     transactions = relationship("Transaction", back_populates="user")
     ai_analysis_logs = relationship("AIAnalysisLog", back_populates="user")
     scheduled_tasks = relationship("ScheduledTask", back_populates="user")
+    precomputed_analyses = relationship("PrecomputedAnalysis", back_populates="user")
 
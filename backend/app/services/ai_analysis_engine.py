@@ -1,90 +1,230 @@
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, AsyncIterator, Tuple
 from datetime import datetime, timedelta
+from sqlalchemy import func, case, and_
 from sqlalchemy.orm import Session
 from ..models.user import User
-from ..crud import transaction, ai_analysis_log
+from ..core.config import settings
+from ..crud import transaction
+from ..models.ai_analysis_log import AIAnalysisLog
 from .gemini_service import gemini_service
-from .ollama_service import create_ollama_service
+from .ollama_service import create_ollama_service, early_stop_stats as ollama_early_stop_stats
+from .ollama_capability_registry import ollama_capability_registry
+from .ollama_model_manager import ollama_model_manager
+from .inference_queue import inference_queue, PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED
+from .circuit_breaker import circuit_breakers, ProbeToken
+from .analysis_log_writer import analysis_log_writer
+from .local_analysis_service import local_analysis_service
+from .incremental_analysis import incremental_analysis_store
+from .transaction_summary import build_transaction_summary
+from .structured_output import structured_output_parser, extract_json, ollama_output_format
+from .llm_backends import get_llm_backend
+from .chunked_analysis import chunked_analysis_service, estimate_tokens
+from .model_router import model_router
+from .ollama_server_pool import ollama_server_pool
+from .ollama_model_benchmark_service import ollama_model_benchmark_service
+from .request_deadline import request_deadline
+from types import SimpleNamespace
 import asyncio
 import logging
 import json
+import random
+import time
 
 logger = logging.getLogger(__name__)
 
+# 분석 타입별 유효 결과 필수 키
+REQUIRED_RESULT_KEYS = {
+    "pattern": ["summary"],
+    "report": ["executive_summary"],
+    "optimization": ["priority_actions"]
+}
+
+# 복합 분석 기본 타입 (대시보드)
+BUNDLE_ANALYSIS_TYPES = ("pattern", "report", "optimization")
+
+# 선호 모델/요청별 모델로 지정할 수 있는 분석 방식
+PREFERRED_MODELS = ("gemini", "ollama", "hybrid", "hybrid_fast", "hybrid_shadow", "local")
+
 class AIAnalysisEngine:
-    """AI 분석 엔진 통합 서비스 - Gemini/Ollama 하이브리드"""
+    """AI 분석 엔진 통합 서비스 - Gemini/Ollama 하이브리드 (+ LLM 없는 로컬 분석)"""
     
     def __init__(self):
         self.cache = {}  # 간단한 메모리 캐시 (실제 운영에서는 Redis 등 사용)
         self.cache_ttl = 3600  # 1시간 캐시
+        self.hedge_stats = {"total": 0, "wins": {}, "recent_margins_ms": []}  # hybrid_fast 승자/격차 통계
+        self._background_tasks = set()
+        self._in_flight: Dict[str, asyncio.Future] = {}  # 진행 중인 분석 (single-flight)
+        self.single_flight_stats = {"leaders": 0, "coalesced": 0}
+        self.bundle_stats = {"fused": 0, "parallel": 0, "fused_failed": 0, "fused_partial": 0}
+        self._shadow_tasks = set()  # 진행 중인 hybrid_shadow 비교
+        self.shadow_stats = {"started": 0, "skipped": 0, "completed": 0, "shadow_failed": 0, "recent": []}
     
     async def analyze_with_preferred_ai(
         self,
         user: User,
         transactions_data: List[Dict[str, Any]],
         analysis_type: str = "pattern",
-        db: Session = None
+        db: Session = None,
+        priority: str = PRIORITY_INTERACTIVE,
+        model: str = None
     ) -> Dict[str, Any]:
-        """사용자 선호 AI 모델로 분석 수행 (하이브리드 로직)"""
+        """사용자 선호 AI 모델로 분석 수행 (하이브리드 로직)
+        
+        priority: 추론 대기열 우선순위 (interactive: 사용자 요청, scheduled: 스케줄 작업)
+        model: 이번 요청에만 사용할 모델 (예: 빠른 조회용 local). 없으면 사용자 선호 모델
+        """
         
         # 캐시 확인
         cache_key = self._generate_cache_key(user.id, transactions_data, analysis_type)
+        preferred_model = model or user.preferred_ai_model or "gemini"
         cached_result = self._get_from_cache(cache_key)
         if cached_result:
             logger.info(f"캐시에서 분석 결과 반환: {cache_key}")
-            return cached_result
+            if db:
+                self._save_analysis_log(
+                    db, user, analysis_type, transactions_data,
+                    preferred_model, preferred_model, cached_result, cache_hit=True
+                )
+            return {
+                "model_used": preferred_model,
+                "analysis": cached_result,
+                "cached": True
+            }
+        
+        # 같은 분석이 이미 진행 중이면 새로 생성하지 않고 그 결과를 기다림 (중복 클릭, 여러 탭, 스케줄 작업 동시 실행)
+        flight_key = f"{cache_key}:{preferred_model}"
+        in_flight = self._in_flight.get(flight_key)
+        if in_flight is not None:
+            self.single_flight_stats["coalesced"] += 1
+            logger.info(f"진행 중인 분석 결과 공유: {flight_key}")
+            try:
+                # 먼저 시작한 요청보다 마감이 짧으면 남은 시간까지만 기다림
+                result = await asyncio.wait_for(asyncio.shield(in_flight), request_deadline.remaining())
+            except asyncio.TimeoutError:
+                logger.warning(f"진행 중인 분석 대기 중 요청 마감 초과, 로컬 분석으로 대체: {flight_key}")
+                analysis_result = self._analyze_with_local(transactions_data, analysis_type)
+                analysis_result["deadline_exceeded"] = True
+                return {"model_used": "local", "analysis": analysis_result, "cached": False}
+            if db:
+                self._save_analysis_log(
+                    db, user, analysis_type, transactions_data,
+                    preferred_model, result["model_used"], result["analysis"], coalesced=True
+                )
+            return {**result, "coalesced": True}
+        
+        self.single_flight_stats["leaders"] += 1
+        task = asyncio.ensure_future(self._analyze_uncached(
+            user, transactions_data, analysis_type, db, priority, preferred_model, cache_key
+        ))
+        self._in_flight[flight_key] = task
+        task.add_done_callback(lambda _: self._in_flight.pop(flight_key, None))
+        # 첫 요청이 취소되어도 기다리는 다른 요청을 위해 분석은 계속 진행
+        return await asyncio.shield(task)
+    
+    async def _analyze_uncached(
+        self,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        db: Optional[Session],
+        priority: str,
+        preferred_model: str,
+        cache_key: str
+    ) -> Dict[str, Any]:
+        """캐시에 없는 분석 수행 (증분 재사용 → 모델별 분석 → 로컬 fallback)"""
+        # 이전 분석 대비 변화가 작으면 LLM 호출 없이 수치만 갱신해 재사용
+        summary, reused = self._reuse_incremental(user, transactions_data, analysis_type, preferred_model)
+        if reused:
+            self._save_to_cache(cache_key, reused["analysis"])
+            if db:
+                self._save_analysis_log(
+                    db, user, analysis_type, transactions_data,
+                    preferred_model, reused["model_used"], reused["analysis"], cache_hit=True
+                )
+            return {**reused, "cached": False}
         
-        preferred_model = user.preferred_ai_model or "gemini"
         analysis_result = None
         model_used = preferred_model
+        started_at = time.perf_counter()
         
         try:
-            if preferred_model == "ollama":
+            # 긴 거래 내역은 청크별 요약 후 종합 (실패하면 아래 단일 프롬프트 분석으로 진행)
+            chunked = await self._analyze_chunked(user, transactions_data, analysis_type, preferred_model, priority)
+            if chunked is not None:
+                analysis_result, model_used = chunked
+            
+            elif preferred_model == "local":
+                # LLM 호출 없이 로컬 계산으로 즉시 분석
+                analysis_result = self._analyze_with_local(transactions_data, analysis_type)
+            
+            elif preferred_model == "ollama":
                 # Ollama 우선 시도
                 analysis_result = await self._analyze_with_ollama(
-                    user, transactions_data, analysis_type
+                    user, transactions_data, analysis_type, priority
                 )
                 
                 # Ollama 실패 시 Gemini로 fallback
                 if not analysis_result or "error" in analysis_result:
                     logger.warning("Ollama 분석 실패, Gemini로 fallback")
                     analysis_result = await self._analyze_with_gemini(
-                        transactions_data, analysis_type
+                        transactions_data, analysis_type, user.id, priority
                     )
                     model_used = "gemini"
             
+            elif preferred_model == "hybrid_fast":
+                # 지연 최적화 하이브리드: 먼저 도착한 유효 결과 사용
+                analysis_result = await self._analyze_with_hedged_hybrid(
+                    user, transactions_data, analysis_type, priority
+                )
+                model_used = "hybrid_fast"
+            
+            elif preferred_model == "hybrid_shadow":
+                # 섀도 모드: Gemini 결과를 바로 반환하고 Ollama 비교는 응답 경로 밖에서 실행
+                analysis_result, model_used = await self._analyze_with_shadow(
+                    user, transactions_data, analysis_type, priority, persist=db is not None
+                )
+            
             elif preferred_model == "hybrid":
                 # 하이브리드 모드: 두 모델 모두 사용하여 결과 비교
                 analysis_result = await self._analyze_with_hybrid(
-                    user, transactions_data, analysis_type
+                    user, transactions_data, analysis_type, priority
                 )
                 model_used = "hybrid"
             
             else:
                 # Gemini 기본 사용
                 analysis_result = await self._analyze_with_gemini(
-                    transactions_data, analysis_type
+                    transactions_data, analysis_type, user.id, priority
                 )
                 model_used = "gemini"
+                
+                # Gemini 브레이커가 열려 있으면 사용자 Ollama 서버로 바로 fallback
+                if analysis_result.get("circuit_open") and self._has_ollama(user):
+                    logger.warning("Gemini 서킷 브레이커 열림, Ollama로 fallback")
+                    analysis_result = await self._analyze_with_ollama(
+                        user, transactions_data, analysis_type, priority
+                    )
+                    model_used = "ollama"
+            
+            # 모든 LLM이 실패하면(요청 마감 초과 포함) 로컬 계산 결과로 대체
+            if model_used != "local" and self._needs_local_fallback(analysis_result):
+                logger.warning(f"{model_used} 분석 실패, 로컬 분석으로 fallback")
+                analysis_result = self._analyze_with_local(transactions_data, analysis_type)
+                model_used = "local"
+                if request_deadline.expired():
+                    analysis_result["deadline_exceeded"] = True
             
-            # 결과 캐싱
-            if analysis_result and "error" not in analysis_result:
+            # 결과 캐싱 (로컬 분석은 즉시 계산되므로 캐싱하지 않음)
+            if model_used != "local" and analysis_result and "error" not in analysis_result:
                 self._save_to_cache(cache_key, analysis_result)
+                self._save_incremental_baseline(user, analysis_type, summary, analysis_result, model_used, preferred_model)
             
             # 분석 로그 저장
             if db:
-                ai_analysis_log.create_log(
-                    db,
-                    user_id=user.id,
-                    request_payload={
-                        "analysis_type": analysis_type,
-                        "transaction_count": len(transactions_data),
-                        "preferred_model": preferred_model
-                    },
-                    response_payload=analysis_result or {},
-                    ai_model_used=model_used,
-                    status="success" if analysis_result and "error" not in analysis_result else "error",
-                    error_message=analysis_result.get("error") if analysis_result else None
+                self._save_analysis_log(
+                    db, user, analysis_type, transactions_data,
+                    preferred_model, model_used, analysis_result,
+                    latency_ms=self._elapsed_ms(started_at)
                 )
             
             return {
@@ -98,8 +238,7 @@ class AIAnalysisEngine:
             
             # 에러 로그 저장
             if db:
-                ai_analysis_log.create_log(
-                    db,
+                analysis_log_writer.enqueue(
                     user_id=user.id,
                     request_payload={
                         "analysis_type": analysis_type,
@@ -108,7 +247,8 @@ class AIAnalysisEngine:
                     response_payload={},
                     ai_model_used=preferred_model,
                     status="error",
-                    error_message=str(e)
+                    error_message=str(e),
+                    latency_ms=self._elapsed_ms(started_at)
                 )
             
             return {
@@ -117,70 +257,714 @@ class AIAnalysisEngine:
                 "cached": False
             }
     
+    async def analyze_bundle(
+        self,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_types: List[str] = BUNDLE_ANALYSIS_TYPES,
+        db: Session = None,
+        priority: str = PRIORITY_INTERACTIVE,
+        model: str = None
+    ) -> Dict[str, Any]:
+        """여러 분석 타입을 한 요청으로 수행 (대시보드용)
+        
+        캐시에 없는 타입은 Gemini 통합 프롬프트 1회 호출(fused) 또는 타입별 동시 호출(parallel)로 분석하고,
+        결과는 타입별로 캐싱해 단일 분석 요청과 공유한다.
+        """
+        preferred_model = model or user.preferred_ai_model or "gemini"
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        
+        for analysis_type in analysis_types:
+            cache_key = self._generate_cache_key(user.id, transactions_data, analysis_type)
+            cached_result = self._get_from_cache(cache_key)
+            if cached_result:
+                if db:
+                    self._save_analysis_log(
+                        db, user, analysis_type, transactions_data,
+                        preferred_model, preferred_model, cached_result, cache_hit=True
+                    )
+                results[analysis_type] = {"model_used": preferred_model, "analysis": cached_result, "cached": True}
+            else:
+                pending.append(analysis_type)
+        
+        # 통합 프롬프트는 Gemini 단일 호출이 가능한 경우에만 (청크 분석 대상이면 타입별 분석으로)
+        mode = "parallel"
+        if (
+            settings.analysis_bundle_mode == "fused"
+            and preferred_model == "gemini"
+            and len(pending) > 1
+            and not chunked_analysis_service.plan(transactions_data, pending[0])
+        ):
+            mode = "fused"
+            fused = await self._analyze_bundle_fused(user, transactions_data, pending, db, priority)
+            results.update(fused)
+            pending = [analysis_type for analysis_type in pending if analysis_type not in fused]
+        
+        # 남은 타입은 동시에 분석 (타입별 캐시, single-flight, fallback 그대로 적용)
+        if pending:
+            outcomes = await asyncio.gather(*(
+                self.analyze_with_preferred_ai(user, transactions_data, analysis_type, db, priority, model)
+                for analysis_type in pending
+            ))
+            results.update(zip(pending, outcomes))
+        
+        self.bundle_stats[mode] += 1
+        return {
+            "mode": mode,
+            "results": {analysis_type: results[analysis_type] for analysis_type in analysis_types}
+        }
+    
+    async def _analyze_bundle_fused(
+        self,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_types: List[str],
+        db: Optional[Session],
+        priority: str
+    ) -> Dict[str, Dict[str, Any]]:
+        """Gemini 통합 프롬프트 1회 호출 후 타입별로 나눠 캐싱 (파싱에 실패한 타입은 결과에서 제외)"""
+        if not gemini_service.is_configured:
+            return {}
+        breaker = circuit_breakers.get("gemini")
+        probe = breaker.allow_request()
+        if not probe:
+            return {}
+        
+        started_at = time.perf_counter()
+        summary = build_transaction_summary(transactions_data)
+        prompt = gemini_service.build_bundle_prompt(summary, analysis_types)
+        model_name = model_router.route("gemini", analysis_types, estimate_tokens(prompt))
+        
+        try:
+            async with inference_queue.slot("gemini", user.id, priority):
+                call_started_at = time.perf_counter()
+                response_text = await gemini_service.generate_text(prompt, model_name)
+        except Exception as e:
+            logger.warning(f"통합 분석 실패, 타입별 분석으로 진행: {e}")
+            if not request_deadline.expired():
+                breaker.record_failure()
+                model_router.record("gemini", model_name, self._elapsed_ms(started_at), False)
+            else:
+                breaker.release(probe)
+            self.bundle_stats["fused_failed"] += 1
+            return {}
+        except asyncio.CancelledError:
+            breaker.release(probe)
+            raise
+        breaker.record_success()
+        model_router.record("gemini", model_name, self._elapsed_ms(call_started_at), True)
+        
+        sections, _ = extract_json(response_text)
+        if not isinstance(sections, dict):
+            sections = {}
+        
+        latency_ms = self._elapsed_ms(started_at)
+        results = {}
+        for analysis_type in analysis_types:
+            section = sections.get(analysis_type)
+            if not isinstance(section, dict):
+                continue
+            analysis_result = structured_output_parser.parse(
+                json.dumps(section, ensure_ascii=False), analysis_type, "gemini"
+            )
+            if "error" in analysis_result:
+                continue
+            analysis_result["model_used"] = model_name
+            
+            self._save_to_cache(self._generate_cache_key(user.id, transactions_data, analysis_type), analysis_result)
+            self._save_incremental_baseline(user, analysis_type, summary, analysis_result, "gemini", "gemini")
+            if db:
+                self._save_analysis_log(
+                    db, user, analysis_type, transactions_data,
+                    "gemini", "gemini", analysis_result, latency_ms=latency_ms
+                )
+            results[analysis_type] = {"model_used": "gemini", "analysis": analysis_result, "cached": False, "bundled": True}
+        
+        if len(results) < len(analysis_types):
+            logger.warning(f"통합 분석 응답에서 {len(analysis_types) - len(results)}개 타입 누락, 타입별 분석으로 보완")
+            self.bundle_stats["fused_partial"] += 1
+        return results
+    
+    async def stream_with_preferred_ai(
+        self,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str = "pattern",
+        db: Session = None,
+        priority: str = PRIORITY_INTERACTIVE,
+        model: str = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """사용자 선호 AI 모델의 생성 토큰을 이벤트로 전달하고 마지막에 파싱된 결과 전달
+        
+        이벤트 형식: {"event": "status" | "token" | "result", "data": ...}
+        """
+        preferred_model = model or user.preferred_ai_model or "gemini"
+        
+        # 캐시 확인
+        cache_key = self._generate_cache_key(user.id, transactions_data, analysis_type)
+        cached_result = self._get_from_cache(cache_key)
+        if cached_result:
+            if db:
+                self._save_analysis_log(
+                    db, user, analysis_type, transactions_data,
+                    preferred_model, preferred_model, cached_result, cache_hit=True
+                )
+            yield {
+                "event": "result",
+                "data": {"model_used": preferred_model, "analysis": cached_result, "cached": True}
+            }
+            return
+        
+        summary, reused = self._reuse_incremental(user, transactions_data, analysis_type, preferred_model)
+        if reused:
+            self._save_to_cache(cache_key, reused["analysis"])
+            if db:
+                self._save_analysis_log(
+                    db, user, analysis_type, transactions_data,
+                    preferred_model, reused["model_used"], reused["analysis"], cache_hit=True
+                )
+            yield {"event": "result", "data": {**reused, "cached": False}}
+            return
+        
+        # 하이브리드 모드는 여러 모델 결과를 다뤄야 하므로, 로컬 분석은 생성 토큰이 없으므로,
+        # 청크 분석은 여러 번의 생성을 거치므로 최종 결과만 전달
+        if preferred_model in ("hybrid", "hybrid_fast", "local") or chunked_analysis_service.plan(
+            transactions_data, analysis_type, "ollama" if preferred_model == "ollama" else "gemini"
+        ):
+            yield {"event": "status", "data": {"model": preferred_model}}
+            result = await self.analyze_with_preferred_ai(
+                user, transactions_data, analysis_type, db, priority, preferred_model
+            )
+            yield {"event": "result", "data": result}
+            return
+        
+        # Ollama 선호 시 실패하면 Gemini로, 섀도 모드는 Gemini 실패 시 Ollama로 fallback
+        if preferred_model == "ollama":
+            providers = ["ollama", "gemini"]
+        elif preferred_model == "hybrid_shadow" and self._has_ollama(user):
+            providers = ["gemini", "ollama"]
+        else:
+            providers = ["gemini"]
+        analysis_result = None
+        model_used = providers[0]
+        started_at = time.perf_counter()
+        
+        for provider in providers:
+            # 클라이언트는 status 이벤트를 받으면 이전 토큰을 비운다
+            yield {"event": "status", "data": {"model": provider, "fallback": provider != providers[0]}}
+            model_used = provider
+            meta = {}
+            chunks = []
+            
+            try:
+                async for token in self._stream_provider(
+                    provider, user, transactions_data, analysis_type, meta, priority
+                ):
+                    chunks.append(token)
+                    yield {"event": "token", "data": token}
+                
+                analysis_result = self._parse_streamed_response(provider, "".join(chunks), analysis_type)
+                if "error" not in analysis_result:
+                    analysis_result["model_used"] = meta.get("model")
+                if provider == "ollama" and "error" not in analysis_result:
+                    analysis_result["processing_time"] = meta.get("total_duration", 0)
+                    analysis_result["token_usage"] = meta.get("token_usage", {})
+                    
+            except (asyncio.CancelledError, GeneratorExit):
+                # 클라이언트 연결 종료/취소: 결과 없음으로 보고 half_open 시험 슬롯 반환
+                if meta.get("probe"):
+                    self._get_breaker(provider, meta.get("server_url", user.ollama_server_url)).release(meta["probe"])
+                raise
+            except Exception as e:
+                logger.warning(f"{provider} 스트리밍 분석 실패: {e}")
+                analysis_result = {"error": str(e)}
+            
+            if meta.get("probe"):
+                self._record_breaker_result(
+                    provider, meta.get("server_url", user.ollama_server_url), analysis_result, meta["probe"]
+                )
+            if "started_at" in meta:
+                self._record_route_result(provider, meta.get("model"), meta["started_at"], analysis_result)
+            
+            if "error" not in analysis_result:
+                break
+        
+        # 모든 LLM이 실패하면 로컬 계산 결과로 대체
+        if self._needs_local_fallback(analysis_result):
+            logger.warning(f"{model_used} 스트리밍 분석 실패, 로컬 분석으로 fallback")
+            yield {"event": "status", "data": {"model": "local", "fallback": True}}
+            analysis_result = self._analyze_with_local(transactions_data, analysis_type)
+            model_used = "local"
+        
+        # 섀도 모드: 스트리밍이 끝난 Gemini 결과와 비교할 Ollama 분석을 백그라운드로 시작
+        if preferred_model == "hybrid_shadow" and model_used == "gemini" and self._is_valid_result(analysis_result, analysis_type):
+            self._start_shadow(
+                user, transactions_data, analysis_type, analysis_result,
+                self._elapsed_ms(started_at), persist=db is not None
+            )
+        
+        # 결과 캐싱 (로컬 분석은 캐싱하지 않음)
+        if model_used != "local" and "error" not in analysis_result:
+            self._save_to_cache(cache_key, analysis_result)
+            self._save_incremental_baseline(user, analysis_type, summary, analysis_result, model_used, preferred_model)
+        
+        # 분석 로그 저장
+        if db:
+            self._save_analysis_log(
+                db, user, analysis_type, transactions_data,
+                preferred_model, model_used, analysis_result,
+                latency_ms=self._elapsed_ms(started_at)
+            )
+        
+        yield {
+            "event": "result",
+            "data": {"model_used": model_used, "analysis": analysis_result, "cached": False}
+        }
+    
+    async def _stream_provider(
+        self,
+        provider: str,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        meta: Dict[str, Any],
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> AsyncIterator[str]:
+        """프로바이더별 텍스트 토큰 스트림 (메타데이터는 meta에 기록)"""
+        request_deadline.check(f"{provider} 스트리밍")
+        
+        if provider == "gemini":
+            meta["probe"] = self._get_breaker("gemini").allow_request()
+            if not meta["probe"]:
+                meta["circuit_open"] = True
+                raise RuntimeError("gemini 서킷 브레이커가 열려 있습니다")
+            
+            prompt = gemini_service.build_prompt(transactions_data, analysis_type)
+            if prompt is None:
+                raise ValueError(f"지원하지 않는 분석 타입: {analysis_type}")
+            
+            model_name = model_router.route("gemini", analysis_type, estimate_tokens(prompt))
+            meta["model"] = model_name
+            async with inference_queue.slot("gemini", user.id, priority):
+                meta["started_at"] = time.perf_counter()
+                async for text in gemini_service.stream_content(prompt, model_name):
+                    yield text
+            return
+        
+        prompts = create_ollama_service().build_prompt(transactions_data, analysis_type)
+        if prompts is None:
+            raise ValueError(f"Ollama에서 지원하지 않는 분석 타입: {analysis_type}")
+        
+        prompt, system_prompt = prompts
+        input_tokens = estimate_tokens(prompt + (system_prompt or ""))
+        
+        # 개인 서버가 없으면 서버 풀에서 선택 (스트리밍 중에는 다른 서버로 failover하지 않고 Gemini fallback)
+        async with ollama_server_pool.lease(user.ollama_server_url, analysis_type, input_tokens) as server_url:
+            meta["server_url"] = server_url
+            meta["probe"] = self._get_breaker("ollama", server_url).allow_request()
+            if not meta["probe"]:
+                meta["circuit_open"] = True
+                raise RuntimeError("ollama 서킷 브레이커가 열려 있습니다")
+        
+            capabilities = await ollama_capability_registry.get_capabilities(server_url)
+            if not capabilities["available"]:
+                raise RuntimeError("Ollama 서버에 연결할 수 없습니다")
+            
+            available_models = capabilities["models"]
+            if not available_models:
+                raise RuntimeError("사용 가능한 Ollama 모델이 없습니다")
+            
+            async with create_ollama_service(server_url) as ollama:
+                model_to_use = model_router.route(
+                    "ollama", analysis_type, input_tokens,
+                    available_models, ollama_model_manager.select_model(available_models, server_url, analysis_type)
+                )
+                meta["model"] = model_to_use
+                try:
+                    async with inference_queue.slot("ollama", user.id, priority, server_url):
+                        meta["started_at"] = time.perf_counter()
+                        async for chunk in ollama.stream_response(
+                            prompt, model_to_use, system_prompt, ollama_output_format(analysis_type),
+                            analysis_type, stop_at_json=settings.ollama_early_stop
+                        ):
+                            if chunk.get("response"):
+                                yield chunk["response"]
+                            if chunk.get("done"):
+                                meta["total_duration"] = chunk.get("total_duration", 0)
+                                meta["token_usage"] = ollama._token_usage(chunk)
+                                ollama_model_manager.record_load(
+                                    server_url, model_to_use, chunk.get("load_duration", 0)
+                                )
+                except Exception:
+                    ollama_capability_registry.invalidate(server_url)
+                    if not request_deadline.expired():
+                        ollama_server_pool.record(server_url, 0, False)
+                    raise
+                ollama_server_pool.record(server_url, self._elapsed_ms(meta["started_at"]), True)
+    
+    async def _analyze_chunked(
+        self,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        preferred_model: str,
+        priority: str
+    ) -> Optional[Tuple[Dict[str, Any], str]]:
+        """토큰 예산을 넘는 긴 거래 내역이면 청크 분석 후 (결과, 사용 모델) 반환. 대상이 아니거나 실패하면 None
+        
+        Ollama 선호 시 Ollama, 그 외(하이브리드 포함)는 Gemini로 요약/종합한다.
+        """
+        if preferred_model == "local":
+            return None
+        
+        provider = "ollama" if preferred_model == "ollama" else "gemini"
+        chunks = chunked_analysis_service.plan(transactions_data, analysis_type, provider)
+        if not chunks:
+            return None
+        
+        result = await chunked_analysis_service.analyze(
+            user, transactions_data, analysis_type, provider, chunks, priority
+        )
+        if "error" in result:
+            logger.warning(f"청크 분석 실패, 단일 프롬프트 분석으로 진행: {result['error']}")
+            return None
+        return result, provider
+    
+    def _analyze_with_local(
+        self,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str
+    ) -> Dict[str, Any]:
+        """LLM 호출 없이 로컬 계산으로 분석 (동일 JSON 스키마)"""
+        try:
+            return local_analysis_service.analyze(transactions_data, analysis_type)
+        except Exception as e:
+            logger.error(f"로컬 분석 실패: {e}")
+            return {"error": str(e)}
+    
+    def _reuse_incremental(
+        self,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        preferred_model: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """현재 집계 스냅샷과 (재사용 가능하면) 수치를 갱신한 이전 결과 반환"""
+        # 로컬 분석과 하이브리드 비교 결과는 재사용 대상이 아님
+        if preferred_model in ("local", "hybrid", "hybrid_fast"):
+            return None, None
+        
+        summary = build_transaction_summary(transactions_data)
+        reused = incremental_analysis_store.reuse(user.id, analysis_type, summary, preferred_model)
+        if reused:
+            logger.info(f"이전 분석 결과 재사용 (변화율 {reused['analysis']['incremental']['change_ratio']})")
+        return summary, reused
+    
+    def _save_incremental_baseline(
+        self,
+        user: User,
+        analysis_type: str,
+        summary: Optional[Dict[str, Any]],
+        analysis_result: Dict[str, Any],
+        model_used: str,
+        preferred_model: str
+    ) -> None:
+        """LLM 분석 결과를 증분 분석 기준으로 저장 (분석 타입 스키마를 따르는 결과만)"""
+        if summary is not None and self._is_valid_result(analysis_result, analysis_type):
+            incremental_analysis_store.save(user.id, analysis_type, summary, analysis_result, model_used, preferred_model)
+    
+    def _needs_local_fallback(self, result: Optional[Dict[str, Any]]) -> bool:
+        """LLM 결과가 없거나 실패했는지 (하이브리드는 추천 결과 기준)"""
+        if not result or "error" in result:
+            return True
+        recommended = result.get("recommended_result")
+        return isinstance(recommended, dict) and recommended.get("source") == "none"
+    
+    def _has_ollama(self, user: User) -> bool:
+        """Ollama를 사용할 수 있는 사용자인지 (개인 서버 또는 서버 풀)"""
+        return bool(user.ollama_server_url) or ollama_server_pool.enabled
+    
+    def _get_breaker(self, provider: str, server_url: Optional[str] = None):
+        """프로바이더(Ollama는 서버 URL별) 서킷 브레이커 조회"""
+        if provider == "ollama":
+            return circuit_breakers.get("ollama", server_url)
+        return circuit_breakers.get(provider)
+    
+    def _record_breaker_result(
+        self,
+        provider: str,
+        server_url: Optional[str],
+        result: Dict[str, Any],
+        probe: ProbeToken
+    ) -> None:
+        """호출 결과를 서킷 브레이커에 기록 (JSON 파싱 실패와 요청 마감으로 중단된 호출은 프로바이더 장애로 보지 않음)"""
+        breaker = self._get_breaker(provider, server_url)
+        if "error" not in result or "raw_response" in result:
+            breaker.record_success()
+        elif not request_deadline.expired():
+            breaker.record_failure()
+        else:
+            # 결과 없이 끝난 호출은 half_open 시험 슬롯만 반환
+            breaker.release(probe)
+    
+    def _route_ollama_model(
+        self,
+        ollama_service: Any,
+        server_url: Optional[str],
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        available_models: List[str]
+    ) -> Optional[str]:
+        """Ollama 프롬프트 크기 기준 모델 라우팅 (서버 벤치마크 선택 모델 또는 기본 모델이 fallback)"""
+        prompts = ollama_service.build_prompt(transactions_data, analysis_type)
+        input_tokens = estimate_tokens(prompts[0] + (prompts[1] or "")) if prompts else 0
+        return model_router.route(
+            "ollama", analysis_type, input_tokens,
+            available_models, ollama_model_manager.select_model(available_models, server_url, analysis_type)
+        )
+    
+    def _record_route_result(self, provider: str, model: Optional[str], started_at: float, result: Dict[str, Any]) -> None:
+        """모델 라우터에 호출 지연/성공 여부 기록 (JSON 파싱 실패는 모델 장애로 보지 않음, 요청 마감으로 중단된 호출은 제외)"""
+        if request_deadline.expired():
+            return
+        model_router.record(
+            provider, model, self._elapsed_ms(started_at), "error" not in result or "raw_response" in result
+        )
+    
+    def _parse_streamed_response(self, provider: str, response_text: str, analysis_type: str) -> Dict[str, Any]:
+        """스트리밍으로 모은 응답 텍스트를 프로바이더별 파서로 파싱"""
+        if provider == "gemini":
+            return gemini_service._parse_analysis_response(response_text, analysis_type)
+        return create_ollama_service()._parse_json_response(response_text, analysis_type)
+    
+    def _save_analysis_log(
+        self,
+        db: Session,
+        user: User,
+        analysis_type: str,
+        transactions_data: List[Dict[str, Any]],
+        preferred_model: str,
+        model_used: str,
+        analysis_result: Optional[Dict[str, Any]],
+        latency_ms: Optional[int] = None,
+        cache_hit: bool = False,
+        coalesced: bool = False
+    ) -> None:
+        """분석 로그 저장 (배치 기록기 버퍼에 추가, 응답 경로에서 커밋하지 않음)"""
+        # 캐시 적중/공유받은 결과는 원래 결과의 토큰 수를 다시 집계하지 않음
+        token_usage = {} if cache_hit or coalesced else (analysis_result or {}).get("token_usage") or {}
+        analysis_log_writer.enqueue(
+            user_id=user.id,
+            request_payload={
+                "analysis_type": analysis_type,
+                "transaction_count": len(transactions_data),
+                "preferred_model": preferred_model
+            },
+            response_payload=analysis_result or {},
+            ai_model_used=model_used,
+            status="success" if analysis_result and "error" not in analysis_result else "error",
+            error_message=analysis_result.get("error") if analysis_result else None,
+            latency_ms=latency_ms,
+            prompt_tokens=token_usage.get("prompt_tokens"),
+            completion_tokens=token_usage.get("completion_tokens"),
+            generation_ms=token_usage.get("generation_ms"),
+            cache_hit=cache_hit,
+            coalesced=coalesced
+        )
+    
+    def _deadline_error(self) -> Dict[str, Any]:
+        """요청 마감 초과 결과 (로컬 분석 fallback 대상)"""
+        return {"error": "요청 마감 시간 초과", "deadline_exceeded": True}
+    
+    def _elapsed_ms(self, started_at: float) -> int:
+        """perf_counter 기준 경과 시간 (ms)"""
+        return int((time.perf_counter() - started_at) * 1000)
+    
     async def _analyze_with_gemini(
         self, 
         transactions_data: List[Dict[str, Any]], 
-        analysis_type: str
+        analysis_type: str,
+        user_id: Any = None,
+        priority: str = PRIORITY_INTERACTIVE
     ) -> Dict[str, Any]:
         """Gemini를 사용한 분석"""
+        probe = None
         try:
-            if analysis_type == "pattern":
-                return await gemini_service.analyze_spending_patterns(transactions_data)
-            elif analysis_type == "report":
-                return await gemini_service.generate_monthly_report(transactions_data)
-            elif analysis_type == "optimization":
-                return await gemini_service.suggest_budget_optimization(transactions_data)
-            else:
+            if analysis_type not in ("pattern", "report", "optimization"):
                 return {"error": f"지원하지 않는 분석 타입: {analysis_type}"}
+            
+            # 요청 마감이 지났으면 fallback 호출도 시작하지 않음
+            if request_deadline.expired():
+                return self._deadline_error()
+            
+            # 서킷 브레이커가 열려 있으면 호출하지 않고 즉시 실패 (fallback으로 이동)
+            breaker = circuit_breakers.get("gemini")
+            probe = breaker.allow_request()
+            if not probe:
+                return {"error": "Gemini 서킷 브레이커가 열려 있습니다", "circuit_open": True}
+            
+            # 분석 타입/프롬프트 크기/최근 지연·오류율로 Gemini 모델 선택 (프롬프트는 한 번만 생성해 호출에 재사용)
+            prompt = gemini_service.build_prompt(transactions_data, analysis_type)
+            model_name = model_router.route("gemini", analysis_type, estimate_tokens(prompt))
+            
+            # 추론 대기열에서 Gemini 슬롯 획득 후 호출
+            async with inference_queue.slot("gemini", user_id, priority):
+                started_at = time.perf_counter()
+                if analysis_type == "pattern":
+                    result = await gemini_service.analyze_spending_patterns(transactions_data, model_name=model_name, prompt=prompt)
+                elif analysis_type == "report":
+                    result = await gemini_service.generate_monthly_report(transactions_data, model_name=model_name, prompt=prompt)
+                else:
+                    result = await gemini_service.suggest_budget_optimization(transactions_data, model_name=model_name, prompt=prompt)
+            
+            self._record_breaker_result("gemini", None, result, probe)
+            self._record_route_result("gemini", model_name, started_at, result)
+            if "error" not in result:
+                result["model_used"] = model_name
+            return result
+        except asyncio.CancelledError:
+            # hybrid_fast 패자 취소 등: 결과 없음으로 보고 half_open 시험 슬롯 반환
+            circuit_breakers.get("gemini").release(probe)
+            raise
         except Exception as e:
+            if request_deadline.expired():
+                circuit_breakers.get("gemini").release(probe)
+                return self._deadline_error()
             logger.error(f"Gemini 분석 실패: {e}")
+            circuit_breakers.get("gemini").record_failure()
             return {"error": str(e)}
     
     async def _analyze_with_ollama(
         self, 
         user: User, 
         transactions_data: List[Dict[str, Any]], 
-        analysis_type: str
+        analysis_type: str,
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> Dict[str, Any]:
+        """Ollama를 사용한 분석 (개인 서버가 없으면 서버 풀에서 선택, 서버 장애 시 다른 풀 서버로 failover)"""
+        if analysis_type not in ("pattern", "report"):
+            return {"error": f"Ollama에서 지원하지 않는 분석 타입: {analysis_type}"}
+        
+        if not ollama_server_pool.pooled(user.ollama_server_url):
+            return await self._analyze_on_ollama_server(
+                user.ollama_server_url, user, transactions_data, analysis_type, priority
+            )
+        
+        prompts = create_ollama_service().build_prompt(transactions_data, analysis_type)
+        input_tokens = estimate_tokens(prompts[0] + (prompts[1] or ""))
+        
+        tried = []
+        result = {"error": "사용 가능한 Ollama 서버가 없습니다"}
+        for _ in ollama_server_pool.servers:
+            async with ollama_server_pool.lease(None, analysis_type, input_tokens, tried) as server_url:
+                if server_url is None:
+                    break
+                tried.append(server_url)
+                result = await self._analyze_on_ollama_server(
+                    server_url, user, transactions_data, analysis_type, priority
+                )
+            
+            # JSON 파싱 실패, 요청 마감 초과는 다른 서버에서도 같으므로 failover하지 않음
+            if "error" not in result or "raw_response" in result or request_deadline.expired():
+                break
+            logger.warning(f"Ollama 서버 {server_url} 분석 실패, 다른 서버로 failover: {result['error']}")
+        return result
+    
+    async def _analyze_on_ollama_server(
+        self,
+        server_url: Optional[str],
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        priority: str = PRIORITY_INTERACTIVE
     ) -> Dict[str, Any]:
-        """Ollama를 사용한 분석"""
+        """지정한 Ollama 서버로 분석 (None이면 기본 서버)"""
+        if request_deadline.expired():
+            return self._deadline_error()
+        
+        # 서버별 서킷 브레이커가 열려 있으면 연결 시도 없이 즉시 실패 (fallback으로 이동)
+        breaker = circuit_breakers.get("ollama", server_url)
+        probe = breaker.allow_request()
+        if not probe:
+            return {"error": "Ollama 서킷 브레이커가 열려 있습니다", "circuit_open": True}
+        
         try:
-            ollama_service = create_ollama_service(user.ollama_server_url)
+            # 서버 연결 여부/모델 목록은 캐시에서 조회 (generate 요청만 전송)
+            capabilities = await ollama_capability_registry.get_capabilities(server_url)
+            if not capabilities["available"]:
+                breaker.record_failure()
+                return {"error": "Ollama 서버에 연결할 수 없습니다"}
             
-            async with ollama_service as ollama:
-                # Ollama 서버 연결 확인
-                if not await ollama.is_available():
-                    return {"error": "Ollama 서버에 연결할 수 없습니다"}
-                
-                # 사용 가능한 모델 확인
-                available_models = await ollama.get_available_models()
-                if not available_models:
-                    return {"error": "사용 가능한 Ollama 모델이 없습니다"}
-                
-                # 기본 모델 선택 (llama3 우선, 없으면 첫 번째 모델)
-                model_to_use = "llama3" if "llama3" in available_models else available_models[0]
-                
-                if analysis_type == "pattern":
-                    return await ollama.analyze_spending_patterns(transactions_data, model_to_use)
-                elif analysis_type == "report":
-                    return await ollama.generate_monthly_report(transactions_data, model=model_to_use)
+            available_models = capabilities["models"]
+            if not available_models:
+                breaker.record_failure()
+                return {"error": "사용 가능한 Ollama 모델이 없습니다"}
+            
+            ollama_service = create_ollama_service(server_url)
+            
+            # 티어 모델(OLLAMA_FAST_MODEL/OLLAMA_STRONG_MODEL)이 서버에 있으면 라우팅, 없으면 벤치마크 선택 모델 또는 기본 모델
+            model_to_use = self._route_ollama_model(
+                ollama_service, server_url, transactions_data, analysis_type, available_models
+            )
+            
+            # 추론 대기열에서 Ollama(프로바이더 + 서버) 슬롯 획득 후 호출
+            async with inference_queue.slot("ollama", user.id, priority, server_url):
+                started_at = time.perf_counter()
+                async with ollama_service as ollama:
+                    if analysis_type == "pattern":
+                        result = await ollama.analyze_spending_patterns(transactions_data, model_to_use)
+                    else:
+                        result = await ollama.generate_monthly_report(transactions_data, model=model_to_use)
+            
+            # 모델 로딩 시간 기록 (keep-alive 기준 로드 상태 갱신)
+            if "token_usage" in result:
+                ollama_model_manager.record_load(
+                    server_url, model_to_use, result["token_usage"].get("load_duration", 0)
+                )
+            
+            self._record_route_result("ollama", model_to_use, started_at, result)
+            ollama_server_pool.record(
+                server_url, self._elapsed_ms(started_at), "error" not in result or "raw_response" in result
+            )
+            
+            # 생성 실패 시 서버 캐시 무효화 (JSON 파싱 실패와 요청 마감으로 중단된 호출은 서버 장애로 보지 않음)
+            if "error" in result and "raw_response" not in result:
+                if not request_deadline.expired():
+                    ollama_capability_registry.invalidate(server_url)
+                    breaker.record_failure()
                 else:
-                    return {"error": f"Ollama에서 지원하지 않는 분석 타입: {analysis_type}"}
+                    breaker.release(probe)
+            else:
+                breaker.record_success()
+            
+            return result
                     
+        except asyncio.CancelledError:
+            # hybrid_fast 패자 취소 등: 결과 없음으로 보고 half_open 시험 슬롯 반환
+            breaker.release(probe)
+            raise
         except Exception as e:
+            if request_deadline.expired():
+                breaker.release(probe)
+                return self._deadline_error()
             logger.error(f"Ollama 분석 실패: {e}")
+            ollama_capability_registry.invalidate(server_url)
+            breaker.record_failure()
             return {"error": str(e)}
     
     async def _analyze_with_hybrid(
         self, 
         user: User, 
         transactions_data: List[Dict[str, Any]], 
-        analysis_type: str
+        analysis_type: str,
+        priority: str = PRIORITY_INTERACTIVE
     ) -> Dict[str, Any]:
         """하이브리드 모드: Gemini와 Ollama 결과 비교"""
         try:
             # 두 모델로 동시 분석
-            gemini_task = self._analyze_with_gemini(transactions_data, analysis_type)
-            ollama_task = self._analyze_with_ollama(user, transactions_data, analysis_type)
+            gemini_task = self._analyze_with_gemini(transactions_data, analysis_type, user.id, priority)
+            ollama_task = self._analyze_with_ollama(user, transactions_data, analysis_type, priority)
             
             gemini_result, ollama_result = await asyncio.gather(
                 gemini_task, ollama_task, return_exceptions=True
@@ -201,6 +985,294 @@ class AIAnalysisEngine:
             logger.error(f"하이브리드 분석 실패: {e}")
             return {"error": str(e)}
     
+    async def _analyze_with_hedged_hybrid(
+        self, 
+        user: User, 
+        transactions_data: List[Dict[str, Any]], 
+        analysis_type: str,
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> Dict[str, Any]:
+        """지연 최적화 하이브리드: Gemini 우선 요청, 지연 후 Ollama 헤징, 먼저 도착한 유효 결과 반환"""
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        latencies = {}
+        
+        async def run(provider: str) -> Dict[str, Any]:
+            try:
+                if provider == "gemini":
+                    return await self._analyze_with_gemini(transactions_data, analysis_type, user.id, priority)
+                return await self._analyze_with_ollama(user, transactions_data, analysis_type, priority)
+            finally:
+                latencies[provider] = (loop.time() - started_at) * 1000
+        
+        primary, secondary = "gemini", "ollama"
+        tasks = {asyncio.ensure_future(run(primary)): primary}
+        pending = set(tasks)
+        results = {}
+        winner = None
+        secondary_started = False
+        
+        while pending:
+            timeout = None
+            if not secondary_started:
+                timeout = max(0.0, settings.hybrid_hedge_delay - (loop.time() - started_at))
+            
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            
+            for task in done:
+                provider = tasks[task]
+                results[provider] = task.result() if not task.exception() else {"error": str(task.exception())}
+                if winner is None and self._is_valid_result(results[provider], analysis_type):
+                    winner = provider
+            
+            if winner:
+                break
+            
+            # 헤징 지연이 지났거나 우선 모델이 실패하면 보조 모델 시작
+            if not secondary_started:
+                secondary_task = asyncio.ensure_future(run(secondary))
+                tasks[secondary_task] = secondary
+                pending.add(secondary_task)
+                secondary_started = True
+        
+        if winner is None:
+            return {
+                "error": "모든 AI 모델 분석 실패",
+                "analysis_type": analysis_type,
+                "attempts": {p: {"error": r.get("error") if isinstance(r, dict) else None} for p, r in results.items()}
+            }
+        
+        winner_latency_ms = latencies[winner]
+        
+        # 느린 모델은 예산 내에서만 대기 후 취소 (응답 경로와 분리)
+        if pending:
+            task = asyncio.ensure_future(
+                self._finish_hedge(pending, tasks, winner, winner_latency_ms, latencies, analysis_type)
+            )
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        else:
+            self._record_hedge_result(
+                winner, winner_latency_ms,
+                self._loser_latency(winner, results, latencies, analysis_type)
+            )
+        
+        return {
+            "analysis_type": analysis_type,
+            "mode": "hedged",
+            "winner": winner,
+            "winner_latency_ms": round(winner_latency_ms, 1),
+            "secondary_started": secondary_started,
+            "recommended_result": {"source": winner, "result": results[winner]}
+        }
+    
+    async def _finish_hedge(
+        self,
+        pending: set,
+        tasks: Dict[asyncio.Future, str],
+        winner: str,
+        winner_latency_ms: float,
+        latencies: Dict[str, float],
+        analysis_type: str
+    ) -> None:
+        """승자 결정 후 남은 요청 처리 (예산 초과 시 취소) 및 격차 기록"""
+        results = {}
+        if settings.hybrid_loser_budget > 0:
+            done, pending = await asyncio.wait(pending, timeout=settings.hybrid_loser_budget)
+            for task in done:
+                results[tasks[task]] = task.result() if not task.exception() else {"error": str(task.exception())}
+        
+        for task in pending:
+            task.cancel()
+        
+        self._record_hedge_result(
+            winner, winner_latency_ms,
+            self._loser_latency(winner, results, latencies, analysis_type)
+        )
+    
+    def _loser_latency(
+        self,
+        winner: str,
+        results: Dict[str, Any],
+        latencies: Dict[str, float],
+        analysis_type: str
+    ) -> Optional[float]:
+        """유효한 결과를 낸 느린 모델의 응답 시간(ms). 없으면 None"""
+        loser_latencies = [
+            latencies[provider] for provider, result in results.items()
+            if provider != winner and self._is_valid_result(result, analysis_type)
+        ]
+        return min(loser_latencies) if loser_latencies else None
+    
+    def _record_hedge_result(
+        self,
+        winner: str,
+        winner_latency_ms: float,
+        loser_latency_ms: Optional[float]
+    ) -> None:
+        """hybrid_fast 승자와 격차(ms) 기록 (느린 모델이 실패/취소되었으면 격차는 None)"""
+        margin_ms = round(loser_latency_ms - winner_latency_ms, 1) if loser_latency_ms is not None else None
+        
+        self.hedge_stats["total"] += 1
+        self.hedge_stats["wins"][winner] = self.hedge_stats["wins"].get(winner, 0) + 1
+        if margin_ms is not None:
+            self.hedge_stats["recent_margins_ms"].append(margin_ms)
+            # 최근 100건만 유지
+            self.hedge_stats["recent_margins_ms"] = self.hedge_stats["recent_margins_ms"][-100:]
+        
+        logger.info(
+            f"hybrid_fast 승자: {winner} ({winner_latency_ms:.0f}ms), "
+            f"격차: {f'{margin_ms:.0f}ms' if margin_ms is not None else '측정 불가'}"
+        )
+    
+    async def _analyze_with_shadow(
+        self,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        priority: str = PRIORITY_INTERACTIVE,
+        persist: bool = True
+    ) -> Tuple[Dict[str, Any], str]:
+        """섀도 모드: Gemini 결과를 바로 반환하고 Ollama는 백그라운드에서 실행해 비교 지표만 기록"""
+        started_at = time.perf_counter()
+        result = await self._analyze_with_gemini(transactions_data, analysis_type, user.id, priority)
+        primary_latency_ms = self._elapsed_ms(started_at)
+        
+        if not self._is_valid_result(result, analysis_type):
+            # Gemini가 실패하면 비교 대신 Ollama 결과로 응답
+            if self._has_ollama(user):
+                logger.warning("섀도 모드 Gemini 분석 실패, Ollama로 fallback")
+                return await self._analyze_with_ollama(user, transactions_data, analysis_type, priority), "ollama"
+            return result, "gemini"
+        
+        self._start_shadow(user, transactions_data, analysis_type, result, primary_latency_ms, persist)
+        return result, "gemini"
+    
+    def _start_shadow(
+        self,
+        user: User,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        primary_result: Dict[str, Any],
+        primary_latency_ms: int,
+        persist: bool
+    ) -> None:
+        """섀도 비교 시작 (Ollama 미지원 타입, 샘플링 제외, 동시 진행 한도 초과 시 건너뜀)"""
+        if (
+            not self._has_ollama(user)
+            or analysis_type not in ("pattern", "report")
+            or random.random() >= settings.hybrid_shadow_sample_rate
+            or len(self._shadow_tasks) >= settings.hybrid_shadow_max_in_flight
+        ):
+            self.shadow_stats["skipped"] += 1
+            return
+        
+        # 응답 후 DB 세션이 닫혀도 쓸 수 있도록 필요한 사용자 정보만 복사
+        shadow_user = SimpleNamespace(id=user.id, ollama_server_url=user.ollama_server_url)
+        task = asyncio.ensure_future(self._run_shadow(
+            shadow_user, transactions_data, analysis_type, primary_result, primary_latency_ms, persist
+        ))
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+        self.shadow_stats["started"] += 1
+    
+    async def _run_shadow(
+        self,
+        user: Any,
+        transactions_data: List[Dict[str, Any]],
+        analysis_type: str,
+        primary_result: Dict[str, Any],
+        primary_latency_ms: int,
+        persist: bool
+    ) -> None:
+        """백그라운드 Ollama 분석 (스케줄 작업 우선순위, 요청 마감 미적용) 후 비교 지표 기록"""
+        try:
+            with request_deadline.detached():
+                started_at = time.perf_counter()
+                shadow_result = await self._analyze_with_ollama(
+                    user, transactions_data, analysis_type, PRIORITY_SCHEDULED
+                )
+                shadow_latency_ms = self._elapsed_ms(started_at)
+            
+            self._record_shadow_result(
+                user, analysis_type, transactions_data,
+                primary_result, primary_latency_ms, shadow_result, shadow_latency_ms, persist
+            )
+        except Exception as e:
+            logger.error(f"섀도 비교 실패: {e}")
+    
+    def _record_shadow_result(
+        self,
+        user: Any,
+        analysis_type: str,
+        transactions_data: List[Dict[str, Any]],
+        primary_result: Dict[str, Any],
+        primary_latency_ms: int,
+        shadow_result: Dict[str, Any],
+        shadow_latency_ms: int,
+        persist: bool
+    ) -> None:
+        """섀도 비교 지표 기록 (통계 + 분석 로그 ai_model_used=ollama_shadow)"""
+        comparison = {
+            **self._compare_results(primary_result, shadow_result),
+            "shadow_valid": self._is_valid_result(shadow_result, analysis_type),
+            "primary_latency_ms": primary_latency_ms,
+            "shadow_latency_ms": shadow_latency_ms
+        }
+        
+        self.shadow_stats["completed"] += 1
+        if not comparison["ollama_success"]:
+            self.shadow_stats["shadow_failed"] += 1
+        self.shadow_stats["recent"].append({
+            "at": datetime.now().isoformat(),
+            "analysis_type": analysis_type,
+            **{key: value for key, value in comparison.items() if key != "differences"}
+        })
+        # 최근 50건만 유지
+        self.shadow_stats["recent"] = self.shadow_stats["recent"][-50:]
+        
+        logger.info(
+            f"섀도 비교: {analysis_type} 일관성 {comparison['consistency_score']:.2f}, "
+            f"gemini {primary_latency_ms}ms / ollama {shadow_latency_ms}ms"
+        )
+        
+        if not persist:
+            return
+        
+        # 비교 결과와 Ollama 응답은 모델 품질 검토용으로 분석 로그에 저장 (모델별 집계에서 ollama와 구분)
+        token_usage = shadow_result.get("token_usage") or {}
+        analysis_log_writer.enqueue(
+            user_id=user.id,
+            request_payload={
+                "analysis_type": analysis_type,
+                "transaction_count": len(transactions_data),
+                "preferred_model": "hybrid_shadow",
+                "shadow_of": "gemini"
+            },
+            response_payload={"comparison": comparison, "shadow_result": shadow_result},
+            ai_model_used="ollama_shadow",
+            status="success" if "error" not in shadow_result else "error",
+            error_message=shadow_result.get("error"),
+            latency_ms=shadow_latency_ms,
+            prompt_tokens=token_usage.get("prompt_tokens"),
+            completion_tokens=token_usage.get("completion_tokens"),
+            generation_ms=token_usage.get("generation_ms"),
+            cache_hit=False
+        )
+    
+    async def wait_for_shadow_comparisons(self) -> None:
+        """진행 중인 섀도 비교가 끝날 때까지 대기 (벤치마크 등)"""
+        if self._shadow_tasks:
+            await asyncio.gather(*list(self._shadow_tasks), return_exceptions=True)
+    
+    def _is_valid_result(self, result: Any, analysis_type: str) -> bool:
+        """분석 결과가 오류 없이 분석 타입의 필수 키를 포함하는지 확인"""
+        if not isinstance(result, dict) or "error" in result:
+            return False
+        return all(key in result for key in REQUIRED_RESULT_KEYS.get(analysis_type, []))
+    
     def _compare_results(
         self, 
         gemini_result: Dict[str, Any], 
@@ -297,44 +1369,125 @@ class AIAnalysisEngine:
         else:
             # 전체 캐시 삭제
             self.cache.clear()
+        
+        # 증분 분석 기준 결과도 함께 삭제 (강제 새로고침 시 전체 재분석)
+        incremental_analysis_store.clear(user_id)
     
-    async def get_analysis_performance_metrics(self, user_id: str, db: Session) -> Dict[str, Any]:
-        """AI 분석 성능 메트릭 조회"""
+    async def get_analysis_performance_metrics(
+        self,
+        user_id: str,
+        db: Session,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """AI 분석 성능 메트릭 조회 (기간 내 로그를 SQL로 집계, 기본 최근 30일)"""
         try:
-            # 최근 30일간의 분석 로그 조회
-            logs = ai_analysis_log.get_by_user(db, user_id=user_id, limit=100)
-            
-            if not logs:
-                return {"message": "분석 로그가 없습니다"}
-            
-            # 성능 메트릭 계산
-            total_analyses = len(logs)
-            successful_analyses = len([log for log in logs if log.status == "success"])
-            failed_analyses = total_analyses - successful_analyses
-            
-            model_usage = {}
-            for log in logs:
-                model = log.ai_model_used
-                if model not in model_usage:
-                    model_usage[model] = {"count": 0, "success": 0, "error": 0}
-                model_usage[model]["count"] += 1
-                if log.status == "success":
-                    model_usage[model]["success"] += 1
-                else:
-                    model_usage[model]["error"] += 1
+            end = end or datetime.now()
+            start = start or end - timedelta(days=30)
+            
+            # 집계 쿼리는 동기 DB 작업이므로 스레드에서 실행
+            model_metrics = await asyncio.to_thread(self._query_model_metrics, db, user_id, start, end)
+            
+            total_analyses = sum(m["count"] for m in model_metrics.values())
+            successful_analyses = sum(m["success"] for m in model_metrics.values())
+            cache_hits = sum(m["cache_hits"] for m in model_metrics.values())
             
             return {
+                "window": {"start": start.isoformat(), "end": end.isoformat()},
                 "total_analyses": total_analyses,
                 "success_rate": successful_analyses / total_analyses if total_analyses > 0 else 0,
                 "successful_analyses": successful_analyses,
-                "failed_analyses": failed_analyses,
-                "model_usage": model_usage,
-                "cache_size": len(self.cache)
+                "failed_analyses": total_analyses - successful_analyses,
+                "cache_hit_rate": cache_hits / total_analyses if total_analyses > 0 else 0,
+                "model_usage": model_metrics,
+                "cache_size": len(self.cache),
+                "hedged_hybrid": self.hedge_stats,
+                "shadow": {**self.shadow_stats, "in_flight": len(self._shadow_tasks)},
+                "single_flight": {**self.single_flight_stats, "in_flight": len(self._in_flight)},
+                "bundle": self.bundle_stats,
+                "model_router": model_router.get_metrics(),
+                "ollama_pool": ollama_server_pool.get_metrics(),
+                "ollama_auto_model": ollama_model_benchmark_service.get_metrics(),
+                "deadline": request_deadline.get_metrics(),
+                "inference_queue": inference_queue.get_metrics(),
+                "circuit_breakers": circuit_breakers.get_states(),
+                "log_writer": analysis_log_writer.get_metrics(),
+                "incremental": incremental_analysis_store.get_metrics(),
+                "output_parsing": structured_output_parser.get_metrics(),
+                "ollama_early_stop": dict(ollama_early_stop_stats),
+                "ollama_models": ollama_model_manager.get_status(),
+                "llm_backend": get_llm_backend().get_metrics(),
+                "chunked_analysis": chunked_analysis_service.get_metrics()
             }
             
         except Exception as e:
             logger.error(f"성능 메트릭 조회 실패: {e}")
             return {"error": str(e)}
+    
+    def _query_model_metrics(
+        self,
+        db: Session,
+        user_id: str,
+        start: datetime,
+        end: datetime
+    ) -> Dict[str, Dict[str, Any]]:
+        """모델별 성공률 / 지연 백분위수 / 초당 토큰 수 집계 (캐시 적중은 지연 통계에서 제외)"""
+        is_success = AIAnalysisLog.status == "success"
+        # 지연 통계 대상: 캐시/결과 공유를 거치지 않은 성공 호출
+        measured = and_(is_success, AIAnalysisLog.cache_hit.is_(False), AIAnalysisLog.coalesced.is_(False))
+        latency = case((measured, AIAnalysisLog.latency_ms))
+        # 초당 토큰 수 대상: 생성 토큰 수와 생성 시간이 모두 기록된 호출 (대기열/모델 로드/재시도가 포함된 latency_ms는 사용하지 않음)
+        has_tokens = and_(measured, AIAnalysisLog.completion_tokens.isnot(None), AIAnalysisLog.generation_ms > 0)
+        
+        def percentile(fraction: float):
+            return func.percentile_cont(fraction).within_group(latency.asc())
+        
+        rows = (
+            db.query(
+                AIAnalysisLog.ai_model_used,
+                func.count().label("count"),
+                func.count().filter(is_success).label("success"),
+                func.count().filter(AIAnalysisLog.cache_hit.is_(True)).label("cache_hits"),
+                func.count().filter(AIAnalysisLog.coalesced.is_(True)).label("coalesced"),
+                func.avg(latency).label("avg_latency_ms"),
+                percentile(0.5).label("p50_latency_ms"),
+                percentile(0.95).label("p95_latency_ms"),
+                percentile(0.99).label("p99_latency_ms"),
+                func.sum(case((has_tokens, AIAnalysisLog.completion_tokens))).label("completion_tokens"),
+                func.sum(case((has_tokens, AIAnalysisLog.generation_ms))).label("generation_ms")
+            )
+            .filter(
+                AIAnalysisLog.user_id == user_id,
+                AIAnalysisLog.request_timestamp >= start,
+                AIAnalysisLog.request_timestamp < end
+            )
+            .group_by(AIAnalysisLog.ai_model_used)
+            .all()
+        )
+        
+        def rounded(value: Any) -> Optional[float]:
+            return round(float(value), 1) if value is not None else None
+        
+        metrics = {}
+        for row in rows:
+            tokens_per_second = None
+            if row.completion_tokens and row.generation_ms:
+                tokens_per_second = round(row.completion_tokens / (row.generation_ms / 1000), 2)
+            
+            metrics[row.ai_model_used] = {
+                "count": row.count,
+                "success": row.success,
+                "error": row.count - row.success,
+                "success_rate": row.success / row.count if row.count else 0,
+                "cache_hits": row.cache_hits,
+                "coalesced": row.coalesced,
+                "avg_latency_ms": rounded(row.avg_latency_ms),
+                "p50_latency_ms": rounded(row.p50_latency_ms),
+                "p95_latency_ms": rounded(row.p95_latency_ms),
+                "p99_latency_ms": rounded(row.p99_latency_ms),
+                "tokens_per_second": tokens_per_second
+            }
+        return metrics
 
 # 싱글톤 인스턴스
 ai_analysis_engine = AIAnalysisEngine()
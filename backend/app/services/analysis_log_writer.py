@@ -0,0 +1,148 @@
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.ai_analysis_log import AIAnalysisLog
+from .analysis_payload_store import analysis_payload_store
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AnalysisLogWriter:
+    """AI 분석 로그 비동기 배치 기록기 (응답 경로에서 DB 커밋 제거)"""
+    
+    def __init__(
+        self,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_buffer_size: int = None
+    ):
+        self.batch_size = batch_size or settings.analysis_log_batch_size
+        self.flush_interval = flush_interval or settings.analysis_log_flush_interval
+        self.max_buffer_size = max_buffer_size or settings.analysis_log_max_buffer
+        self.buffer: List[Dict[str, Any]] = []
+        self.total_written = 0
+        self.total_dropped = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._size_event: Optional[asyncio.Event] = None
+    
+    def start(self) -> None:
+        """주기적 flush 루프 시작 (이벤트 루프 안에서 호출)"""
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._flush_lock = asyncio.Lock()
+        self._size_event = asyncio.Event()
+        self._flush_task = asyncio.ensure_future(self._flush_loop())
+        logger.info("AI 분석 로그 기록기가 시작되었습니다.")
+    
+    async def stop(self) -> None:
+        """flush 루프 중지 후 남은 로그 기록 (애플리케이션 종료 시)"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        
+        await self.flush()
+        logger.info("AI 분석 로그 기록기가 중지되었습니다.")
+    
+    def enqueue(self, **fields: Any) -> None:
+        """로그 한 건을 버퍼에 추가 (DB 작업 없음)"""
+        fields.setdefault("request_timestamp", datetime.now(timezone.utc))
+        # 배치 INSERT는 모든 행의 컬럼이 같아야 하므로 선택 항목도 채움
+        fields.setdefault("error_message", None)
+        for metric in ("latency_ms", "prompt_tokens", "completion_tokens", "generation_ms"):
+            fields.setdefault(metric, None)
+        fields.setdefault("cache_hit", False)
+        fields.setdefault("coalesced", False)
+        self.buffer.append(fields)
+        
+        # 버퍼 한도 초과 시 가장 오래된 로그부터 버림
+        overflow = len(self.buffer) - self.max_buffer_size
+        if overflow > 0:
+            del self.buffer[:overflow]
+            self.total_dropped += overflow
+            logger.warning(f"AI 분석 로그 버퍼 초과로 {overflow}건 폐기")
+        
+        # 루프 밖(스크립트 등)에서 호출된 경우에도 기록되도록 필요 시 시작
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start()
+        
+        if len(self.buffer) >= self.batch_size:
+            self._size_event.set()
+    
+    async def _flush_loop(self) -> None:
+        """크기 또는 시간 임계치에 도달하면 flush"""
+        while True:
+            try:
+                await asyncio.wait_for(self._size_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._size_event.clear()
+            await self.flush()
+    
+    async def flush(self) -> int:
+        """버퍼의 로그를 배치 INSERT로 기록"""
+        if not self.buffer:
+            return 0
+        
+        # 로그 테이블이 변환 전이면 배치마다 실패하지 않도록 기록 보류 (버퍼 한도까지 보관)
+        if analysis_payload_store.log_table_partitioned is False:
+            return 0
+        
+        lock = self._flush_lock or asyncio.Lock()
+        async with lock:
+            records, self.buffer = self.buffer, []
+            try:
+                # 동기 DB 작업은 스레드에서 실행
+                await asyncio.to_thread(self._write_batch, records)
+                self.total_written += len(records)
+                return len(records)
+            except Exception as e:
+                logger.error(f"AI 분석 로그 배치 기록 실패 ({len(records)}건): {e}")
+                # 실패한 로그는 다음 flush에서 재시도
+                self.buffer = records + self.buffer
+                return 0
+    
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        """한 번의 트랜잭션으로 payload 저장 + 로그 다건 INSERT"""
+        db = SessionLocal()
+        try:
+            # 요청/응답 payload는 압축 후 해시 기준으로 중복 없이 저장
+            hashes = analysis_payload_store.store_many(
+                db,
+                [r["request_payload"] for r in records] + [r["response_payload"] for r in records]
+            )
+            rows = []
+            for i, record in enumerate(records):
+                row = {k: v for k, v in record.items() if k not in ("request_payload", "response_payload")}
+                row["request_payload_hash"] = hashes[i]
+                row["response_payload_hash"] = hashes[len(records) + i]
+                rows.append(row)
+            
+            db.execute(insert(AIAnalysisLog), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """기록기 상태"""
+        return {
+            "buffered": len(self.buffer),
+            "total_written": self.total_written,
+            "total_dropped": self.total_dropped
+        }
+
+# 싱글톤 인스턴스
+analysis_log_writer = AnalysisLogWriter()
@@ -0,0 +1,206 @@
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.ai_analysis_payload import AIAnalysisPayload
+import asyncio
+import hashlib
+import json
+import zlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOG_TABLE = "ai_analysis_logs"
+
+class AnalysisPayloadStore:
+    """AI 분석 payload 내용 주소 저장소 + 로그 파티션/보존 기간 관리"""
+    
+    def __init__(self):
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self.last_maintenance: Optional[Dict[str, Any]] = None
+        # 로그 테이블이 파티션 테이블인지 (None이면 아직 확인 전, False면 변환 전이라 로그 기록 보류)
+        self.log_table_partitioned: Optional[bool] = None
+    
+    def encode(self, payload: Dict[str, Any]) -> Tuple[str, bytes, int]:
+        """payload를 (SHA-256 해시, zlib 압축 바이트, 원본 크기)로 변환"""
+        canonical = json.dumps(
+            payload or {}, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+        ).encode("utf-8")
+        return hashlib.sha256(canonical).hexdigest(), zlib.compress(canonical, 6), len(canonical)
+    
+    def decode(self, compressed_payload: bytes) -> Dict[str, Any]:
+        """압축된 payload 복원"""
+        return json.loads(zlib.decompress(compressed_payload).decode("utf-8"))
+    
+    def store_many(self, db: Session, payloads: List[Dict[str, Any]]) -> List[str]:
+        """payload 목록 저장 (이미 있으면 last_used_at만 갱신) 후 해시 목록 반환. 커밋은 호출자 담당"""
+        hashes = []
+        rows = {}
+        for payload in payloads:
+            payload_hash, compressed, size = self.encode(payload)
+            hashes.append(payload_hash)
+            rows[payload_hash] = {
+                "hash": payload_hash,
+                "compressed_payload": compressed,
+                "size_bytes": size
+            }
+        
+        if rows:
+            stmt = pg_insert(AIAnalysisPayload).values(list(rows.values()))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AIAnalysisPayload.hash],
+                set_={"last_used_at": text("now()")}
+            )
+            db.execute(stmt)
+        
+        return hashes
+    
+    def get(self, db: Session, payload_hash: str) -> Optional[Dict[str, Any]]:
+        """해시로 payload 조회"""
+        compressed = db.execute(
+            select(AIAnalysisPayload.compressed_payload).where(AIAnalysisPayload.hash == payload_hash)
+        ).scalar_one_or_none()
+        return self.decode(compressed) if compressed is not None else None
+    
+    def log_table_kind(self, db: Session) -> Optional[str]:
+        """로그 테이블 종류 ("partitioned", 파티션 도입 전 일반 테이블이면 "legacy", 없으면 None)"""
+        relkind = db.execute(text(
+            "SELECT c.relkind FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = :table AND n.nspname = current_schema()"
+        ), {"table": LOG_TABLE}).scalar_one_or_none()
+        if relkind is None:
+            return None
+        return "partitioned" if relkind == "p" else "legacy"
+    
+    def ensure_partitions(self, db: Session, months_ahead: int = 2, since: Optional[datetime] = None) -> bool:
+        """since(기본 이번 달)부터 months_ahead개월 뒤까지 월 파티션과 기본 파티션 생성. 파티션 테이블이 아니면 False"""
+        kind = self.log_table_kind(db)
+        self.log_table_partitioned = kind == "partitioned"
+        if kind != "partitioned":
+            # 파티션 도입 전 테이블에는 PARTITION OF가 실패하고 새 형식 로그도 기록할 수 없음
+            logger.error(
+                f"{LOG_TABLE} 테이블이 {'파티션 테이블이 아닙니다' if kind else '없습니다'}. "
+                "scripts/migrate_ai_analysis_logs.py로 변환하기 전까지 AI 분석 로그 기록과 정리를 보류합니다."
+            )
+            return False
+        
+        db.execute(text(f"CREATE TABLE IF NOT EXISTS {LOG_TABLE}_default PARTITION OF {LOG_TABLE} DEFAULT"))
+        
+        now = datetime.now(timezone.utc)
+        month_start = (since.astimezone(timezone.utc) if since else now).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        months = months_ahead + 1 + (now.year - month_start.year) * 12 + now.month - month_start.month
+        for _ in range(months):
+            next_month = (month_start + timedelta(days=32)).replace(day=1)
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {LOG_TABLE}_{month_start:%Y_%m} PARTITION OF {LOG_TABLE} "
+                f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{next_month.isoformat()}')"
+            ))
+            month_start = next_month
+        db.commit()
+        return True
+    
+    def drop_expired_partitions(self, db: Session, retention_months: int = None) -> List[str]:
+        """보존 기간이 지난 월 파티션 삭제 (행 단위 DELETE 없이 파티션째 제거)"""
+        retention_months = retention_months or settings.analysis_log_retention_months
+        cutoff = datetime.now(timezone.utc).replace(day=1)
+        for _ in range(retention_months):
+            cutoff = (cutoff - timedelta(days=1)).replace(day=1)
+        cutoff_suffix = f"{cutoff:%Y_%m}"
+        
+        partitions = db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {"table": LOG_TABLE}).scalars().all()
+        
+        dropped = []
+        for name in partitions:
+            suffix = name[len(LOG_TABLE) + 1:]
+            # ai_analysis_logs_YYYY_MM 형식만 대상 (기본 파티션 제외)
+            if len(suffix) == 7 and suffix[4] == "_" and suffix < cutoff_suffix:
+                db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                dropped.append(name)
+        db.commit()
+        
+        if dropped:
+            logger.info(f"보존 기간이 지난 AI 분석 로그 파티션 삭제: {dropped}")
+        return dropped
+    
+    def purge_orphan_payloads(self, db: Session, batch_size: int = None, max_batches: int = 100) -> int:
+        """어떤 로그에서도 참조하지 않는 오래된 payload를 배치 단위로 삭제"""
+        batch_size = batch_size or settings.analysis_payload_purge_batch
+        cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+        total_deleted = 0
+        
+        for _ in range(max_batches):
+            # 배치마다 커밋하여 잠금 시간과 트랜잭션 크기를 제한
+            result = db.execute(text(
+                "DELETE FROM ai_analysis_payloads WHERE hash IN ("
+                "  SELECT p.hash FROM ai_analysis_payloads p"
+                "  WHERE p.last_used_at < :cutoff"
+                f"  AND NOT EXISTS (SELECT 1 FROM {LOG_TABLE} l WHERE l.request_payload_hash = p.hash)"
+                f"  AND NOT EXISTS (SELECT 1 FROM {LOG_TABLE} l WHERE l.response_payload_hash = p.hash)"
+                "  LIMIT :batch_size"
+                ")"
+            ), {"cutoff": cutoff, "batch_size": batch_size})
+            db.commit()
+            
+            total_deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+        
+        if total_deleted:
+            logger.info(f"참조되지 않는 AI 분석 payload {total_deleted}건 삭제")
+        return total_deleted
+    
+    def run_maintenance(self, db: Session) -> Dict[str, Any]:
+        """파티션 생성, 만료 파티션 삭제, 고아 payload 정리 (로그 테이블 변환 전이면 건너뜀)"""
+        if not self.ensure_partitions(db):
+            return {"skipped": f"{LOG_TABLE} 변환 필요"}
+        dropped = self.drop_expired_partitions(db)
+        purged = self.purge_orphan_payloads(db)
+        return {"dropped_partitions": dropped, "purged_payloads": purged}
+    
+    def start(self) -> None:
+        """주기적 유지보수 루프 시작 (스케줄러와 무관하게 애플리케이션에서 실행, 이벤트 루프 안에서 호출)"""
+        if self._maintenance_task and not self._maintenance_task.done():
+            return
+        self._maintenance_task = asyncio.ensure_future(self._maintenance_loop())
+    
+    async def stop(self) -> None:
+        """유지보수 루프 중지 (애플리케이션 종료 시)"""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+    
+    async def _maintenance_loop(self) -> None:
+        """시작 직후 1회, 이후 ANALYSIS_LOG_MAINTENANCE_INTERVAL마다 유지보수 (다음 달 파티션이 미리 생성되어 기본 파티션에 쌓이지 않음)"""
+        while True:
+            try:
+                result = await asyncio.to_thread(self._run_maintenance_session)
+                self.last_maintenance = {**result, "at": datetime.now(timezone.utc).isoformat()}
+                logger.info(f"AI 분석 로그 정리 완료: {result}")
+            except Exception as e:
+                logger.error(f"AI 분석 로그 정리 실패: {e}")
+            await asyncio.sleep(settings.analysis_log_maintenance_interval * 3600)
+    
+    def _run_maintenance_session(self) -> Dict[str, Any]:
+        """별도 세션으로 유지보수 실행 (스레드에서 실행)"""
+        db = SessionLocal()
+        try:
+            return self.run_maintenance(db)
+        finally:
+            db.close()
+
+# 싱글톤 인스턴스
+analysis_payload_store = AnalysisPayloadStore()
@@ -0,0 +1,44 @@
+from typing import Dict, Any, List
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.transaction import Transaction
+from ..models.merchant import Merchant
+from .transaction_summary import DEFAULT_CATEGORY
+
+def load_analysis_transactions(db: Session, user_id: Any, days_back: int) -> List[Dict[str, Any]]:
+    """최근 days_back일 거래를 분석용 dict 목록으로 조회 (기간은 SQL에서 필터링하고 ORM 객체 대신 필요한 컬럼만 조회)"""
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days_back)
+    
+    rows = (
+        db.query(
+            Transaction.amount,
+            Transaction.transaction_type,
+            Transaction.transaction_date,
+            Transaction.original_merchant_name,
+            Merchant.manual_category,
+            Transaction.memo
+        )
+        .outerjoin(Merchant, Transaction.merchant_id == Merchant.id)
+        .filter(
+            Transaction.user_id == user_id,
+            Transaction.transaction_date >= start_date,
+            Transaction.transaction_date <= end_date
+        )
+        .order_by(Transaction.transaction_date.desc())
+        .limit(settings.analysis_max_transactions)
+        .all()
+    )
+    
+    return [
+        {
+            "amount": float(row.amount),
+            "transaction_type": row.transaction_type,
+            "transaction_date": row.transaction_date,
+            "original_merchant_name": row.original_merchant_name,
+            "manual_category": row.manual_category or DEFAULT_CATEGORY,
+            "memo": row.memo
+        }
+        for row in rows
+    ]
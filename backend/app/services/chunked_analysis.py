@@ -0,0 +1,360 @@
+from typing import Dict, Any, List, Optional, Tuple
+from ..core.config import settings
+from ..models.user import User
+from .gemini_service import gemini_service, RESPONSE_FORMATS
+from .ollama_service import OllamaService, create_ollama_service
+from .ollama_capability_registry import ollama_capability_registry
+from .ollama_model_manager import ollama_model_manager
+from .inference_queue import inference_queue, PRIORITY_INTERACTIVE
+from .circuit_breaker import circuit_breakers
+from .transaction_summary import build_transaction_summary, DEFAULT_CATEGORY
+from .structured_output import structured_output_parser, extract_json, ollama_output_format
+from .model_router import model_router
+from .ollama_server_pool import ollama_server_pool
+from .request_deadline import request_deadline
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 청크 요약(map) 응답 스키마
+CHUNK_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "highlights": {"type": "array", "items": {"type": "string"}},
+        "anomalies": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["summary", "highlights"]
+}
+
+# 모델 컨텍스트 중 응답 생성을 위해 남겨둘 토큰 수
+RESPONSE_RESERVE_TOKENS = 512
+
+CHUNK_SYSTEM_PROMPT = """당신은 개인 금융 분석 전문가입니다. 주어진 기간 또는 카테고리의 거래 집계만 보고 핵심 특징을 짧게 요약해주세요. 응답은 반드시 JSON 형식으로 제공해야 합니다."""
+
+def estimate_tokens(text: str) -> int:
+    """프롬프트 토큰 수 보수적 근사 (한글 1자, 숫자 약 3자, 그 외 영문/기호 약 4자당 1토큰)"""
+    digits = sum(1 for char in text if char.isdigit())
+    ascii_chars = sum(1 for char in text if ord(char) < 128) - digits
+    return int((len(text) - ascii_chars - digits) + digits / 3 + ascii_chars / 4) + 1
+
+class ChunkedAnalysisService:
+    """긴 거래 내역을 월/카테고리 단위로 나눠 요약(map)한 뒤 요약들을 종합(reduce)하는 분석"""
+    
+    def __init__(self):
+        self.stats = {"chunked": 0, "chunks": 0, "failed_chunks": 0, "failed": 0}
+    
+    def partition(self, transactions: List[Dict[str, Any]], mode: str = None) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        """거래를 월(YYYY-MM) 또는 카테고리별로 분할 (라벨 순 정렬)"""
+        mode = mode or settings.chunked_analysis_partition
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for transaction in transactions:
+            if mode == "category":
+                label = transaction.get("manual_category") or DEFAULT_CATEGORY
+            else:
+                transaction_date = transaction.get("transaction_date")
+                label = str(transaction_date)[:7] if transaction_date else "날짜 없음"
+            groups.setdefault(label, []).append(transaction)
+        return sorted(groups.items())
+    
+    def token_limit(self, provider: str) -> int:
+        """단일 프롬프트 허용 토큰 (모델 컨텍스트에서 응답 토큰을 뺀 값과 토큰 예산 중 작은 값)"""
+        context = settings.ollama_context_tokens if provider == "ollama" else settings.gemini_context_tokens
+        return min(settings.chunked_analysis_token_budget, context - RESPONSE_RESERVE_TOKENS)
+    
+    def plan(
+        self,
+        transactions: List[Dict[str, Any]],
+        analysis_type: str,
+        provider: str = "gemini"
+    ) -> Optional[List[Dict[str, Any]]]:
+        """프로바이더가 실제로 보낼 단일 프롬프트가 허용 토큰을 넘으면 청크 목록 반환 (넘지 않으면 None)"""
+        if settings.chunked_analysis_token_budget <= 0 or analysis_type not in ("pattern", "report", "optimization"):
+            return None
+        
+        partitions = self.partition(transactions)
+        if len(partitions) < 2:
+            return None
+        
+        prompts = self._single_prompt(provider, transactions, analysis_type)
+        if prompts is None:
+            return None
+        
+        limit = self.token_limit(provider)
+        estimated = estimate_tokens(prompts[0] + (prompts[1] or ""))
+        if estimated <= limit:
+            return None
+        
+        chunks = [
+            {"label": label, "facts": self._chunk_facts(label, build_transaction_summary(chunk))}
+            for label, chunk in partitions
+        ]
+        logger.info(f"청크 분석 사용: {len(chunks)}개 청크, 단일 프롬프트 예상 {estimated} 토큰 (허용 {limit})")
+        return chunks
+    
+    def _chunk_facts(self, label: str, summary: Dict[str, Any]) -> str:
+        """청크 집계를 프롬프트용 텍스트로 변환 (카테고리 금액 순, 상위 가맹점 3곳)"""
+        lines = [f"[{label}] 총 {summary['total_amount']:,.0f}원 / {summary['total_transactions']}건"]
+        categories = sorted(summary["categories"].items(), key=lambda item: -item[1]["amount"])
+        for category, data in categories:
+            lines.append(f"- {category}: {data['amount']:,.0f}원 ({data['count']}건)")
+        if summary["top_merchants"]:
+            merchants = ", ".join(
+                f"{merchant['merchant']} {merchant['amount']:,.0f}원" for merchant in summary["top_merchants"][:3]
+            )
+            lines.append(f"- 주요 가맹점: {merchants}")
+        return "\n".join(lines)
+    
+    async def analyze(
+        self,
+        user: User,
+        transactions: List[Dict[str, Any]],
+        analysis_type: str,
+        provider: str,
+        chunks: List[Dict[str, Any]],
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> Dict[str, Any]:
+        """청크 요약을 제한된 병렬도로 생성한 뒤 요약만으로 만든 종합 프롬프트로 최종 분석"""
+        if provider == "ollama" and analysis_type not in OllamaService.SYSTEM_PROMPTS:
+            return {"error": f"{provider}에서 지원하지 않는 분석 타입: {analysis_type}"}
+        
+        started_at = time.perf_counter()
+        semaphore = asyncio.Semaphore(settings.chunked_analysis_max_parallel)
+        
+        async def summarize(chunk: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    text = await self._generate(
+                        provider, user, self._map_prompt(chunk), CHUNK_SYSTEM_PROMPT, self._map_format(), priority,
+                        "chunk_summary"
+                    )
+                except Exception as e:
+                    logger.warning(f"청크 요약 실패 ({chunk['label']}): {e}")
+                    return None
+                summary, _ = extract_json(text)
+                return summary if isinstance(summary, dict) and summary.get("summary") else None
+        
+        summaries = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+        map_ms = int((time.perf_counter() - started_at) * 1000)
+        
+        failed = sum(1 for summary in summaries if summary is None)
+        self.stats["chunks"] += len(chunks)
+        self.stats["failed_chunks"] += failed
+        if failed == len(chunks):
+            self.stats["failed"] += 1
+            return {"error": "모든 청크 요약에 실패했습니다"}
+        
+        # 요약에 실패한 청크는 집계 수치만 전달
+        sections = []
+        for chunk, summary in zip(chunks, summaries):
+            if summary is None:
+                sections.append(chunk["facts"])
+                continue
+            notes = [summary["summary"]] + list(summary.get("highlights", []))[:3] + list(summary.get("anomalies", []))[:2]
+            sections.append(f"[{chunk['label']}] " + " / ".join(str(note) for note in notes))
+        
+        prompt, system_prompt = self._reduce_prompt(provider, transactions, analysis_type, sections)
+        
+        reduce_started_at = time.perf_counter()
+        try:
+            text = await self._generate(
+                provider, user, prompt, system_prompt, ollama_output_format(analysis_type), priority, analysis_type
+            )
+        except Exception as e:
+            self.stats["failed"] += 1
+            return {"error": f"종합 분석 실패: {e}"}
+        
+        result = structured_output_parser.parse(text, analysis_type, provider)
+        if "error" not in result:
+            self.stats["chunked"] += 1
+            result["chunked"] = {
+                "partition": settings.chunked_analysis_partition,
+                "chunks": len(chunks),
+                "failed_chunks": failed,
+                "map_ms": map_ms,
+                "reduce_ms": int((time.perf_counter() - reduce_started_at) * 1000)
+            }
+        return result
+    
+    def _map_prompt(self, chunk: Dict[str, Any]) -> str:
+        """청크 요약 프롬프트"""
+        return f"""
+다음 거래 집계의 핵심 특징을 요약해주세요.
+
+{chunk['facts']}
+
+다음 형식의 JSON으로 짧게 응답해주세요:
+{{
+    "summary": "한 문장 요약 (한글)",
+    "highlights": ["주요 특징 1", "주요 특징 2"],
+    "anomalies": ["평소와 다른 점 (없으면 빈 배열)"]
+}}
+"""
+    
+    def _map_format(self) -> Any:
+        """청크 요약 요청의 Ollama format 값 (OLLAMA_OUTPUT_FORMAT 설정을 따름)"""
+        if settings.ollama_output_format == "schema":
+            return CHUNK_SUMMARY_SCHEMA
+        return "json" if settings.ollama_output_format == "json" else None
+    
+    def _reduce_prompt(
+        self,
+        provider: str,
+        transactions: List[Dict[str, Any]],
+        analysis_type: str,
+        sections: List[str]
+    ) -> Tuple[str, Optional[str]]:
+        """종합 프롬프트 (전체 합계 + 청크 요약 + 응답 형식, 단일 프롬프트의 세부 집계는 다시 넣지 않음)"""
+        summary = build_transaction_summary(transactions)
+        date_range = summary["date_range"]
+        prompt = f"""
+다음은 전체 거래를 기간/카테고리별로 나눠 요약한 결과입니다. 이를 종합하여 {analysis_type} 분석을 수행해주세요.
+
+전체: 총 {summary['total_amount']:,.0f}원 / {summary['total_transactions']}건 ({date_range.get('start', '')} ~ {date_range.get('end', '')})
+
+기간/카테고리별 요약:
+""" + "\n".join(sections) + """
+
+위 요약의 추세와 특이사항을 반영하여 다음 JSON 형식으로만 응답해주세요:
+""" + RESPONSE_FORMATS[analysis_type]
+        system_prompt = OllamaService.SYSTEM_PROMPTS[analysis_type] if provider == "ollama" else None
+        return prompt, system_prompt
+    
+    def _single_prompt(
+        self,
+        provider: str,
+        transactions: List[Dict[str, Any]],
+        analysis_type: str
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """청크로 나누지 않을 때 프로바이더가 보낼 (프롬프트, 시스템 프롬프트). 지원하지 않는 타입이면 None"""
+        if provider == "gemini":
+            prompt = gemini_service.build_prompt(transactions, analysis_type)
+            return (prompt, None) if prompt is not None else None
+        return create_ollama_service().build_prompt(transactions, analysis_type)
+    
+    async def _generate(
+        self,
+        provider: str,
+        user: User,
+        prompt: str,
+        system_prompt: Optional[str],
+        output_format: Any,
+        priority: str,
+        analysis_type: str
+    ) -> str:
+        """프로바이더 텍스트 생성 (Ollama는 개인 서버가 없으면 청크마다 서버 풀에서 선택해 여러 서버로 분산)"""
+        input_tokens = estimate_tokens(prompt + (system_prompt or ""))
+        if provider != "ollama":
+            return await self._generate_on(
+                provider, None, user, prompt, system_prompt, output_format, priority, analysis_type, input_tokens
+            )
+        
+        async with ollama_server_pool.lease(user.ollama_server_url, analysis_type, input_tokens) as server_url:
+            return await self._generate_on(
+                provider, server_url, user, prompt, system_prompt, output_format, priority, analysis_type, input_tokens
+            )
+    
+    async def _generate_on(
+        self,
+        provider: str,
+        server_url: Optional[str],
+        user: User,
+        prompt: str,
+        system_prompt: Optional[str],
+        output_format: Any,
+        priority: str,
+        analysis_type: str,
+        input_tokens: int
+    ) -> str:
+        """프로바이더(Ollama는 지정 서버) 텍스트 생성 (추론 대기열 슬롯 + 서킷 브레이커 + 모델 라우팅 적용)"""
+        # 설정 문제는 프로바이더 장애가 아니므로 서킷 브레이커/모델 라우터에 기록하지 않음
+        if provider == "gemini" and not gemini_service.is_configured:
+            raise RuntimeError("Gemini API not configured")
+        
+        breaker = circuit_breakers.get(provider, server_url)
+        probe = breaker.allow_request()
+        if not probe:
+            raise RuntimeError(f"{provider} 서킷 브레이커가 열려 있습니다")
+        
+        route = {}
+        try:
+            if provider == "gemini":
+                route["model"] = model_router.route("gemini", analysis_type, input_tokens)
+                async with inference_queue.slot("gemini", user.id, priority):
+                    route["started_at"] = time.perf_counter()
+                    text = await gemini_service.generate_text(prompt, route["model"], system_prompt)
+            else:
+                text = await self._generate_ollama(
+                    user, server_url, prompt, system_prompt, output_format, priority, analysis_type, input_tokens, route
+                )
+        except asyncio.CancelledError:
+            # 취소된 호출은 결과 없음으로 보고 half_open 시험 슬롯만 반환
+            breaker.release(probe)
+            raise
+        except Exception:
+            # 요청 마감으로 중단된 호출은 프로바이더/모델 장애로 보지 않음
+            if not request_deadline.expired():
+                breaker.record_failure()
+                ollama_server_pool.record(server_url, 0, False)
+                if "started_at" in route:
+                    model_router.record(provider, route["model"], self._elapsed_ms(route["started_at"]), False)
+            else:
+                breaker.release(probe)
+            raise
+        
+        breaker.record_success()
+        model_router.record(provider, route["model"], self._elapsed_ms(route["started_at"]), True)
+        ollama_server_pool.record(server_url, self._elapsed_ms(route["started_at"]), True)
+        return text
+    
+    def _elapsed_ms(self, started_at: float) -> int:
+        """경과 시간 (ms)"""
+        return int((time.perf_counter() - started_at) * 1000)
+    
+    async def _generate_ollama(
+        self,
+        user: User,
+        server_url: Optional[str],
+        prompt: str,
+        system_prompt: Optional[str],
+        output_format: Any,
+        priority: str,
+        analysis_type: str,
+        input_tokens: int,
+        route: Dict[str, Any]
+    ) -> str:
+        """Ollama 서버로 텍스트 생성 (선택한 모델과 시작 시각은 route에 기록)"""
+        capabilities = await ollama_capability_registry.get_capabilities(server_url)
+        if not capabilities["available"]:
+            raise RuntimeError("Ollama 서버에 연결할 수 없습니다")
+        
+        model = model_router.route(
+            "ollama", analysis_type, input_tokens,
+            capabilities["models"], ollama_model_manager.select_model(capabilities["models"], server_url, analysis_type)
+        )
+        if model is None:
+            raise RuntimeError("사용 가능한 Ollama 모델이 없습니다")
+        route["model"] = model
+        
+        async with inference_queue.slot("ollama", user.id, priority, server_url):
+            route["started_at"] = time.perf_counter()
+            async with create_ollama_service(server_url) as ollama:
+                result = await ollama.generate_response(
+                    prompt, model, system_prompt, output_format, analysis_type
+                )
+        
+        if not result["success"]:
+            ollama_capability_registry.invalidate(server_url)
+            raise RuntimeError(result["error"])
+        
+        ollama_model_manager.record_load(server_url, model, result.get("load_duration", 0))
+        return result["response"]
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """청크 분석 통계"""
+        return dict(self.stats)
+
+# 싱글톤 인스턴스
+chunked_analysis_service = ChunkedAnalysisService()
@@ -0,0 +1,175 @@
+from typing import Dict, Any, List, Optional
+from ..core.config import settings
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class ProbeToken:
+    """allow_request가 허용한 요청 표시 (half_open 시험 요청이면 probe_id로 슬롯 소유 확인)"""
+    
+    __slots__ = ("probe_id",)
+    
+    def __init__(self, probe_id: Optional[int] = None):
+        self.probe_id = probe_id
+
+class CircuitBreaker:
+    """실패율 기반 서킷 브레이커 (closed -> open -> half_open -> closed)"""
+    
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = None,
+        minimum_calls: int = None,
+        window_size: int = None,
+        open_seconds: float = None,
+        half_open_max_calls: int = 1,
+        probe_timeout: float = None
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold if failure_rate_threshold is not None else settings.circuit_failure_rate_threshold
+        self.minimum_calls = minimum_calls if minimum_calls is not None else settings.circuit_minimum_calls
+        self.window_size = window_size if window_size is not None else settings.circuit_window_size
+        self.open_seconds = open_seconds if open_seconds is not None else settings.circuit_open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.probe_timeout = probe_timeout if probe_timeout is not None else settings.circuit_probe_timeout
+        
+        self.state = STATE_CLOSED
+        self.results: List[bool] = []  # 최근 호출 결과 (True: 성공)
+        self.opened_at = 0.0
+        self.probes: Dict[int, float] = {}  # 진행 중인 half_open 시험 요청 ID -> 시작 시각
+        self._next_probe_id = 0
+        self.total_rejected = 0
+        self.total_probe_timeouts = 0
+    
+    @property
+    def half_open_calls(self) -> int:
+        """진행 중인 half_open 시험 요청 수"""
+        return len(self.probes)
+    
+    def allow_request(self) -> Optional[ProbeToken]:
+        """요청 허용 시 토큰 반환, 거부면 None (open 상태면 즉시 거부, 대기 시간이 지나면 half_open으로 시험 요청 허용)"""
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.total_rejected += 1
+                return None
+            self._transition(STATE_HALF_OPEN)
+        
+        if self.state == STATE_HALF_OPEN:
+            self._expire_probes()
+            if len(self.probes) >= self.half_open_max_calls:
+                self.total_rejected += 1
+                return None
+            self._next_probe_id += 1
+            self.probes[self._next_probe_id] = time.monotonic()
+            return ProbeToken(self._next_probe_id)
+        
+        return ProbeToken()
+    
+    def rejecting(self) -> bool:
+        """현재 요청을 거부하는 상태인지 (상태 변경 없이 확인, 서버 선택용)"""
+        if self.state == STATE_OPEN:
+            return time.monotonic() - self.opened_at < self.open_seconds
+        if self.state != STATE_HALF_OPEN:
+            return False
+        now = time.monotonic()
+        live = sum(1 for started_at in self.probes.values() if now - started_at < self.probe_timeout)
+        return live >= self.half_open_max_calls
+    
+    def release(self, token: Optional[ProbeToken]) -> None:
+        """결과 없이 끝난 시험 요청(취소/요청 마감 초과)의 half_open 슬롯 반환 (그 시험 요청의 토큰일 때만)"""
+        if token is not None and token.probe_id is not None:
+            self.probes.pop(token.probe_id, None)
+    
+    def _expire_probes(self) -> None:
+        """PROBE_TIMEOUT 동안 결과를 보고하지 않은 시험 요청은 결과 없음으로 보고 슬롯 반환 (half_open 고착 방지)"""
+        now = time.monotonic()
+        expired = [probe_id for probe_id, started_at in self.probes.items() if now - started_at >= self.probe_timeout]
+        for probe_id in expired:
+            del self.probes[probe_id]
+        if expired:
+            logger.warning(f"서킷 브레이커 시험 요청 결과 없음 ({self.name}), 슬롯 {len(expired)}개 반환")
+            self.total_probe_timeouts += len(expired)
+    
+    def record_success(self) -> None:
+        """성공 기록 (half_open이면 closed로 복구)"""
+        if self.state == STATE_HALF_OPEN:
+            self._transition(STATE_CLOSED)
+            return
+        self._record(True)
+    
+    def record_failure(self) -> None:
+        """실패 기록 (half_open이거나 실패율이 임계치를 넘으면 open)"""
+        if self.state == STATE_HALF_OPEN:
+            self._transition(STATE_OPEN)
+            return
+        if self.state == STATE_OPEN:
+            # open 이전에 시작된 요청의 실패는 대기 시간을 연장하지 않음
+            return
+        
+        self._record(False)
+        if len(self.results) >= self.minimum_calls and self.failure_rate() >= self.failure_rate_threshold:
+            self._transition(STATE_OPEN)
+    
+    def failure_rate(self) -> float:
+        """최근 호출 실패율"""
+        if not self.results:
+            return 0.0
+        return self.results.count(False) / len(self.results)
+    
+    def _record(self, success: bool) -> None:
+        """슬라이딩 윈도우에 결과 기록"""
+        self.results.append(success)
+        self.results = self.results[-self.window_size:]
+    
+    def _transition(self, state: str) -> None:
+        """상태 전이"""
+        logger.info(f"서킷 브레이커 상태 변경 ({self.name}): {self.state} -> {state}")
+        self.state = state
+        self.probes = {}
+        if state == STATE_OPEN:
+            self.opened_at = time.monotonic()
+        elif state == STATE_CLOSED:
+            self.results = []
+    
+    def get_state(self) -> Dict[str, Any]:
+        """브레이커 상태 조회"""
+        retry_after = 0.0
+        if self.state == STATE_OPEN:
+            retry_after = max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+        
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 3),
+            "recent_calls": len(self.results),
+            "total_rejected": self.total_rejected,
+            "probe_timeouts": self.total_probe_timeouts,
+            "retry_after_seconds": round(retry_after, 1)
+        }
+
+class CircuitBreakerRegistry:
+    """프로바이더 / Ollama 서버 URL별 서킷 브레이커 관리"""
+    
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+    
+    def get(self, provider: str, server_url: str = None) -> CircuitBreaker:
+        """브레이커 조회 (없으면 생성)"""
+        key = provider
+        if provider == "ollama":
+            key = f"ollama:{(server_url or settings.default_ollama_server_url).rstrip('/')}"
+        
+        if key not in self.breakers:
+            self.breakers[key] = CircuitBreaker(key)
+        return self.breakers[key]
+    
+    def get_states(self) -> Dict[str, Any]:
+        """전체 브레이커 상태"""
+        return {key: breaker.get_state() for key, breaker in self.breakers.items()}
+
+# 싱글톤 인스턴스
+circuit_breakers = CircuitBreakerRegistry()
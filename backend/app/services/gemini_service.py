@@ -1,147 +1,344 @@
 import google.generativeai as genai
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ..core.config import settings
-import json
+from .transaction_summary import build_transaction_summary
+from .structured_output import structured_output_parser
+from .llm_backends import get_llm_backend
+from .request_deadline import request_deadline
+import asyncio
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 분석 타입별 응답 JSON 형식 안내 (단일 분석 프롬프트와 통합 프롬프트에서 공유)
+RESPONSE_FORMATS = {
+    "pattern": """{
+    "summary": "전체 소비 패턴 요약 (한글)",
+    "category_analysis": {
+        "카테고리명": {
+            "percentage": 전체 대비 비율,
+            "trend": "증가/감소/유지",
+            "insight": "해당 카테고리 분석 내용"
+        }
+    },
+    "spending_habits": [
+        "주요 소비 습관 1",
+        "주요 소비 습관 2"
+    ],
+    "recommendations": [
+        "개선 제안 1",
+        "개선 제안 2"
+    ],
+    "risk_factors": [
+        "주의할 점 1",
+        "주의할 점 2"
+    ]
+}
+""",
+    "report": """{
+    "title": "YYYY년 MM월 소비 리포트",
+    "executive_summary": "이번 달 소비 요약 (한글)",
+    "key_metrics": {
+        "total_spending": 총소비금액,
+        "transaction_count": 거래건수,
+        "average_per_transaction": 건당평균금액,
+        "most_spent_category": "최대소비카테고리",
+        "most_frequent_category": "최다거래카테고리"
+    },
+    "category_breakdown": {
+        "카테고리명": {
+            "amount": 금액,
+            "percentage": 비율,
+            "transaction_count": 거래건수,
+            "analysis": "카테고리 분석"
+        }
+    },
+    "trends_and_insights": [
+        "주요 트렌드 1",
+        "주요 인사이트 2"
+    ],
+    "next_month_goals": [
+        "다음 달 목표 1",
+        "다음 달 목표 2"
+    ],
+    "action_items": [
+        "실행 과제 1",
+        "실행 과제 2"
+    ]
+}
+""",
+    "optimization": """{
+    "optimization_score": 1-100점,
+    "priority_actions": [
+        {
+            "category": "카테고리명",
+            "action": "구체적 행동",
+            "expected_savings": 예상절약금액,
+            "difficulty": "쉬움/보통/어려움"
+        }
+    ],
+    "budget_recommendations": {
+        "카테고리명": 권장예산금액
+    },
+    "saving_strategies": [
+        "절약 전략 1",
+        "절약 전략 2"
+    ],
+    "long_term_goals": [
+        "장기 목표 1",
+        "장기 목표 2"
+    ]
+}
+"""
+}
+
 class GeminiService:
     """Google Gemini AI API 연동 서비스"""
     
     def __init__(self):
         self.api_key = settings.google_gemini_api_key
+        self.default_model_name = settings.gemini_strong_model
+        self._models: Dict[str, Any] = {}  # 모델명 -> GenerativeModel (모델 라우터가 요청별로 선택)
         if self.api_key:
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.model = self._get_model(self.default_model_name)
         else:
             self.model = None
+        
+        # 동시 호출 수 제한 및 요청 타임아웃
+        self.request_timeout = settings.gemini_request_timeout
+        self._semaphore = asyncio.Semaphore(settings.gemini_max_concurrency)
+        
+    @property
+    def is_configured(self) -> bool:
+        """API 키가 있거나 오프라인 백엔드(fake/replay)를 사용 중인지"""
+        return self.model is not None or get_llm_backend().offline
+    
+    def _generation_config(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """JSON 모드 응답 요청 (카테고리명을 키로 쓰는 응답 구조는 Gemini 스키마로 표현할 수 없어 검증은 파싱 시 수행)
+        
+        JSON 모드를 지원하지 않는 1.0 모델(gemini-pro, gemini-1.0-*)은 HTTP 400을 반환하므로 제외
+        """
+        name = model_name.split("/")[-1]
+        if name == "gemini-pro" or name.startswith(("gemini-pro-", "gemini-1.0")):
+            return None
+        return {"response_mime_type": "application/json"}
+    
+    def _get_model(self, model_name: Optional[str] = None) -> Any:
+        """모델명별 GenerativeModel (처음 사용할 때 생성)"""
+        model_name = model_name or self.default_model_name
+        if model_name not in self._models:
+            self._models[model_name] = genai.GenerativeModel(model_name)
+        return self._models[model_name]
+    
+    async def _generate_content(self, prompt: str, model_name: str = None) -> str:
+        """Gemini 비동기 생성 호출 (동시 실행 수 제한 + 타임아웃)"""
+        model_name = model_name or self.default_model_name
+        
+        async def send() -> Dict[str, Any]:
+            response = await self._get_model(model_name).generate_content_async(
+                prompt, generation_config=self._generation_config(model_name)
+            )
+            return {"response": response.text}
+        
+        async with self._semaphore:
+            # 타임아웃(관측 p95 기반, 요청 마감까지 남은 시간 이내) 시 wait_for가 진행 중인 요청을 취소한다
+            started_at = time.perf_counter()
+            result = await asyncio.wait_for(
+                get_llm_backend().call("gemini", "generate", {"prompt": prompt, "model": model_name}, send),
+                timeout=request_deadline.timeout("gemini", self.request_timeout, model_name)
+            )
+            request_deadline.record("gemini", time.perf_counter() - started_at, model_name)
+        return result["response"]
+    
+    async def generate_text(self, prompt: str, model_name: str = None, system_prompt: str = None) -> str:
+        """프롬프트 그대로 텍스트 생성 (청크 요약/종합, 통합 분석 등 분석 타입별 메서드 밖의 호출용)"""
+        if not self.is_configured:
+            raise RuntimeError("Gemini API not configured")
+        # Gemini는 JSON 모드만 사용하므로 시스템 프롬프트는 본문 앞에 붙임
+        return await self._generate_content(f"{system_prompt}\n{prompt}" if system_prompt else prompt, model_name)
+    
+    async def stream_content(self, prompt: str, model_name: str = None) -> AsyncIterator[str]:
+        """Gemini 스트리밍 생성 (텍스트 청크를 순서대로 반환, 첫 응답과 이후 청크마다 GEMINI_REQUEST_TIMEOUT 적용)"""
+        if not self.is_configured:
+            raise RuntimeError("Gemini API not configured")
+        model_name = model_name or self.default_model_name
+        
+        async def send() -> AsyncIterator[str]:
+            response = await asyncio.wait_for(
+                self._get_model(model_name).generate_content_async(
+                    prompt, generation_config=self._generation_config(model_name), stream=True
+                ),
+                timeout=request_deadline.timeout("gemini", self.request_timeout, model_name)
+            )
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        
+        async with self._semaphore:
+            stream = get_llm_backend().stream("gemini", {"prompt": prompt, "model": model_name}, send)
+            try:
+                while True:
+                    # 청크 간 대기 시간 제한 (멈춘 스트림이 동시 실행 슬롯을 계속 잡지 않도록, 요청 마감까지 남은 시간 이내)
+                    try:
+                        text = await asyncio.wait_for(
+                            stream.__anext__(), timeout=request_deadline.bounded("gemini 스트리밍", self.request_timeout)
+                        )
+                    except StopAsyncIteration:
+                        break
+                    yield text
+            finally:
+                await stream.aclose()
+    
+    def build_prompt(self, transactions: List[Dict[str, Any]], analysis_type: str) -> Optional[str]:
+        """분석 타입별 프롬프트 생성. 지원하지 않는 타입이면 None"""
+        if analysis_type == "pattern":
+            return self._create_analysis_prompt(self._prepare_transaction_summary(transactions))
+        elif analysis_type == "report":
+            return self._create_report_prompt(self._prepare_monthly_summary(transactions))
+        elif analysis_type == "optimization":
+            return self._create_optimization_prompt(self._prepare_budget_analysis(transactions))
+        return None
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def build_bundle_prompt(
+        self,
+        transaction_summary: Dict[str, Any],
+        analysis_types: List[str]
+    ) -> str:
+        """여러 분석을 한 번에 요청하는 통합 프롬프트 (거래 요약은 한 번만, 응답은 분석 타입을 키로 하는 JSON)"""
+        prompt = f"""
+다음 거래 데이터를 바탕으로 {', '.join(analysis_types)} 분석을 한 번에 수행해주세요.
+
+거래 요약:
+- 총 거래 건수: {transaction_summary['total_transactions']}건
+- 총 소비 금액: {transaction_summary['total_amount']:,.0f}원
+- 분석 기간: {transaction_summary.get('date_range', {}).get('start', '')} ~ {transaction_summary.get('date_range', {}).get('end', '')}
+
+카테고리별 소비:
+"""
+        
+        for category, data in transaction_summary['categories'].items():
+            prompt += f"- {category}: {data['amount']:,.0f}원 ({data['count']}건)\n"
+        
+        keys = ", ".join(f'"{analysis_type}": {{...}}' for analysis_type in analysis_types)
+        prompt += f"""
+
+각 분석 결과를 분석 타입을 키로 하는 하나의 JSON 객체로 제공해주세요: {{{keys}}}
+각 키의 값은 아래 형식을 따릅니다.
+"""
+        
+        for analysis_type in analysis_types:
+            prompt += f"\n\"{analysis_type}\" 형식:\n" + RESPONSE_FORMATS[analysis_type]
+        
+        return prompt
+    
+    @retry(stop=stop_after_attempt(3) | request_deadline.retry_stop, wait=wait_exponential(multiplier=1, min=4, max=10))
     async def analyze_spending_patterns(
         self, 
         transactions: List[Dict[str, Any]], 
-        user_preferences: Dict[str, Any] = None
+        user_preferences: Dict[str, Any] = None,
+        model_name: str = None,
+        prompt: str = None
     ) -> Dict[str, Any]:
         """소비 패턴 분석"""
-        if not self.model:
+        if not self.is_configured:
             logger.warning("Gemini API 키가 설정되지 않았습니다.")
             return {"error": "Gemini API not configured"}
         
         try:
-            # 거래 데이터 요약
-            transaction_summary = self._prepare_transaction_summary(transactions)
-            
-            # 분석 프롬프트 생성
-            prompt = self._create_analysis_prompt(transaction_summary, user_preferences)
+            # 분석 프롬프트 생성 (호출자가 미리 만든 프롬프트가 있으면 재사용)
+            if prompt is None:
+                transaction_summary = self._prepare_transaction_summary(transactions)
+                prompt = self._create_analysis_prompt(transaction_summary, user_preferences)
             
             # Gemini API 호출
-            response = self.model.generate_content(prompt)
+            response_text = await self._generate_content(prompt, model_name)
             
             # 응답 파싱
-            analysis_result = self._parse_analysis_response(response.text)
+            analysis_result = self._parse_analysis_response(response_text)
             
             return analysis_result
             
+        except asyncio.TimeoutError:
+            logger.error(f"Gemini 소비 패턴 분석 시간 초과 ({self.request_timeout}초)")
+            return {"error": "요청 시간 초과"}
         except Exception as e:
             logger.error(f"Gemini 소비 패턴 분석 실패: {e}")
             return {"error": str(e)}
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry(stop=stop_after_attempt(3) | request_deadline.retry_stop, wait=wait_exponential(multiplier=1, min=4, max=10))
     async def generate_monthly_report(
         self, 
         transactions: List[Dict[str, Any]], 
-        previous_month_data: Dict[str, Any] = None
+        previous_month_data: Dict[str, Any] = None,
+        model_name: str = None,
+        prompt: str = None
     ) -> Dict[str, Any]:
         """월간 소비 리포트 생성"""
-        if not self.model:
+        if not self.is_configured:
             logger.warning("Gemini API 키가 설정되지 않았습니다.")
             return {"error": "Gemini API not configured"}
         
         try:
-            # 월간 데이터 요약
-            monthly_summary = self._prepare_monthly_summary(transactions, previous_month_data)
-            
-            # 리포트 생성 프롬프트
-            prompt = self._create_report_prompt(monthly_summary)
+            # 리포트 생성 프롬프트 (호출자가 미리 만든 프롬프트가 있으면 재사용)
+            if prompt is None:
+                monthly_summary = self._prepare_monthly_summary(transactions, previous_month_data)
+                prompt = self._create_report_prompt(monthly_summary)
             
             # Gemini API 호출
-            response = self.model.generate_content(prompt)
+            response_text = await self._generate_content(prompt, model_name)
             
             # 리포트 파싱
-            report_result = self._parse_report_response(response.text)
+            report_result = self._parse_report_response(response_text)
             
             return report_result
             
+        except asyncio.TimeoutError:
+            logger.error(f"Gemini 월간 리포트 생성 시간 초과 ({self.request_timeout}초)")
+            return {"error": "요청 시간 초과"}
         except Exception as e:
             logger.error(f"Gemini 월간 리포트 생성 실패: {e}")
             return {"error": str(e)}
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry(stop=stop_after_attempt(3) | request_deadline.retry_stop, wait=wait_exponential(multiplier=1, min=4, max=10))
     async def suggest_budget_optimization(
         self, 
         transactions: List[Dict[str, Any]], 
-        budget_goals: Dict[str, float] = None
+        budget_goals: Dict[str, float] = None,
+        model_name: str = None,
+        prompt: str = None
     ) -> Dict[str, Any]:
         """예산 최적화 제안"""
-        if not self.model:
+        if not self.is_configured:
             logger.warning("Gemini API 키가 설정되지 않았습니다.")
             return {"error": "Gemini API not configured"}
         
         try:
-            # 예산 분석 데이터 준비
-            budget_analysis = self._prepare_budget_analysis(transactions, budget_goals)
-            
-            # 최적화 제안 프롬프트
-            prompt = self._create_optimization_prompt(budget_analysis)
+            # 최적화 제안 프롬프트 (호출자가 미리 만든 프롬프트가 있으면 재사용)
+            if prompt is None:
+                budget_analysis = self._prepare_budget_analysis(transactions, budget_goals)
+                prompt = self._create_optimization_prompt(budget_analysis)
             
             # Gemini API 호출
-            response = self.model.generate_content(prompt)
+            response_text = await self._generate_content(prompt, model_name)
             
             # 제안 파싱
-            optimization_result = self._parse_optimization_response(response.text)
+            optimization_result = self._parse_optimization_response(response_text)
             
             return optimization_result
             
+        except asyncio.TimeoutError:
+            logger.error(f"Gemini 예산 최적화 제안 시간 초과 ({self.request_timeout}초)")
+            return {"error": "요청 시간 초과"}
         except Exception as e:
             logger.error(f"Gemini 예산 최적화 제안 실패: {e}")
             return {"error": str(e)}
     
     def _prepare_transaction_summary(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """거래 데이터 요약 준비"""
-        if not transactions:
-            return {"total_transactions": 0, "categories": {}, "total_amount": 0}
-        
-        categories = {}
-        total_amount = 0
-        
-        for transaction in transactions:
-            amount = float(transaction.get("amount", 0))
-            category = transaction.get("manual_category", "기타")
-            
-            if category not in categories:
-                categories[category] = {"count": 0, "amount": 0, "transactions": []}
-            
-            categories[category]["count"] += 1
-            categories[category]["amount"] += amount
-            categories[category]["transactions"].append({
-                "merchant": transaction.get("original_merchant_name", ""),
-                "amount": amount,
-                "date": transaction.get("transaction_date", "").strftime("%Y-%m-%d") if transaction.get("transaction_date") else ""
-            })
-            
-            total_amount += amount
-        
-        return {
-            "total_transactions": len(transactions),
-            "total_amount": total_amount,
-            "categories": categories,
-            "date_range": {
-                "start": min(t.get("transaction_date", "") for t in transactions if t.get("transaction_date")),
-                "end": max(t.get("transaction_date", "") for t in transactions if t.get("transaction_date"))
-            }
-        }
+        return build_transaction_summary(transactions)
     
     def _prepare_monthly_summary(
         self, 
@@ -216,29 +413,7 @@ class GeminiService:
         prompt += """
 
 다음 형식의 JSON으로 분석 결과를 제공해주세요:
-{
-    "summary": "전체 소비 패턴 요약 (한글)",
-    "category_analysis": {
-        "카테고리명": {
-            "percentage": 전체 대비 비율,
-            "trend": "증가/감소/유지",
-            "insight": "해당 카테고리 분석 내용"
-        }
-    },
-    "spending_habits": [
-        "주요 소비 습관 1",
-        "주요 소비 습관 2"
-    ],
-    "recommendations": [
-        "개선 제안 1",
-        "개선 제안 2"
-    ],
-    "risk_factors": [
-        "주의할 점 1",
-        "주의할 점 2"
-    ]
-}
-"""
+""" + RESPONSE_FORMATS["pattern"]
         
         return prompt
     
@@ -271,38 +446,7 @@ class GeminiService:
         prompt += """
 
 다음 형식의 JSON으로 월간 리포트를 제공해주세요:
-{
-    "title": "YYYY년 MM월 소비 리포트",
-    "executive_summary": "이번 달 소비 요약 (한글)",
-    "key_metrics": {
-        "total_spending": 총소비금액,
-        "transaction_count": 거래건수,
-        "average_per_transaction": 건당평균금액,
-        "most_spent_category": "최대소비카테고리",
-        "most_frequent_category": "최다거래카테고리"
-    },
-    "category_breakdown": {
-        "카테고리명": {
-            "amount": 금액,
-            "percentage": 비율,
-            "transaction_count": 거래건수,
-            "analysis": "카테고리 분석"
-        }
-    },
-    "trends_and_insights": [
-        "주요 트렌드 1",
-        "주요 인사이트 2"
-    ],
-    "next_month_goals": [
-        "다음 달 목표 1",
-        "다음 달 목표 2"
-    ],
-    "action_items": [
-        "실행 과제 1",
-        "실행 과제 2"
-    ]
-}
-"""
+""" + RESPONSE_FORMATS["report"]
         
         return prompt
     
@@ -328,54 +472,21 @@ class GeminiService:
         prompt += """
 
 다음 형식의 JSON으로 최적화 제안을 제공해주세요:
-{
-    "optimization_score": 1-100점,
-    "priority_actions": [
-        {
-            "category": "카테고리명",
-            "action": "구체적 행동",
-            "expected_savings": 예상절약금액,
-            "difficulty": "쉬움/보통/어려움"
-        }
-    ],
-    "budget_recommendations": {
-        "카테고리명": 권장예산금액
-    },
-    "saving_strategies": [
-        "절약 전략 1",
-        "절약 전략 2"
-    ],
-    "long_term_goals": [
-        "장기 목표 1",
-        "장기 목표 2"
-    ]
-}
-"""
+""" + RESPONSE_FORMATS["optimization"]
         
         return prompt
     
-    def _parse_analysis_response(self, response_text: str) -> Dict[str, Any]:
-        """분석 응답 파싱"""
-        try:
-            # JSON 부분 추출
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response_text[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                return {"error": "JSON 형식을 찾을 수 없습니다", "raw_response": response_text}
-        except json.JSONDecodeError:
-            return {"error": "JSON 파싱 실패", "raw_response": response_text}
+    def _parse_analysis_response(self, response_text: str, analysis_type: str = "pattern") -> Dict[str, Any]:
+        """분석 응답 파싱 (JSON 추출/복구 + 스키마 검증)"""
+        return structured_output_parser.parse(response_text, analysis_type, "gemini")
     
     def _parse_report_response(self, response_text: str) -> Dict[str, Any]:
         """리포트 응답 파싱"""
-        return self._parse_analysis_response(response_text)
+        return self._parse_analysis_response(response_text, "report")
     
     def _parse_optimization_response(self, response_text: str) -> Dict[str, Any]:
         """최적화 응답 파싱"""
-        return self._parse_analysis_response(response_text)
+        return self._parse_analysis_response(response_text, "optimization")
 
 # 싱글톤 인스턴스
 gemini_service = GeminiService()
@@ -0,0 +1,152 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+from datetime import datetime
+from ..core.config import settings
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+class IncrementalAnalysisStore:
+    """사용자/분석 타입/선호 모델별 마지막 LLM 분석 결과와 기준 집계 스냅샷 보관 (변화가 작으면 LLM 없이 재사용)"""
+    
+    REFRESHABLE_TYPES = ("pattern", "report")  # 수치를 다시 계산할 수 있는 분석 타입 (optimization은 절감액 등이 서술에 묶여 있어 제외)
+    
+    def __init__(self, threshold: float = None, max_age: int = None, max_baselines: int = None):
+        self.threshold = threshold if threshold is not None else settings.incremental_analysis_threshold
+        self.max_age = max_age if max_age is not None else settings.incremental_analysis_max_age
+        self.max_baselines = max_baselines if max_baselines is not None else settings.incremental_analysis_max_baselines
+        self.baselines: OrderedDict = OrderedDict()  # 저장 순서 (가장 오래된 것부터 제거)
+        self.stats = {"reused": 0, "missed": 0, "evicted": 0}
+    
+    def _key(self, user_id: Any, analysis_type: str, preferred_model: str) -> str:
+        """기준 결과 키 (다른 모델로 요청하면 그 모델의 결과를 새로 받도록 선호 모델 포함)"""
+        return f"{user_id}:{analysis_type}:{preferred_model}"
+    
+    def save(
+        self,
+        user_id: Any,
+        analysis_type: str,
+        summary: Dict[str, Any],
+        result: Dict[str, Any],
+        model_used: str,
+        preferred_model: str
+    ) -> None:
+        """LLM 분석 결과를 기준 스냅샷과 함께 저장 (최대 개수를 넘으면 가장 오래 전에 저장된 기준부터 제거)"""
+        if self.threshold <= 0 or analysis_type not in self.REFRESHABLE_TYPES:
+            return
+        key = self._key(user_id, analysis_type, preferred_model)
+        self.baselines[key] = {
+            "snapshot": self._snapshot(summary),
+            "result": result,
+            "model_used": model_used,
+            "analyzed_at": datetime.now()
+        }
+        self.baselines.move_to_end(key)
+        while len(self.baselines) > self.max_baselines:
+            self.baselines.popitem(last=False)
+            self.stats["evicted"] += 1
+    
+    def reuse(
+        self,
+        user_id: Any,
+        analysis_type: str,
+        summary: Dict[str, Any],
+        preferred_model: str
+    ) -> Optional[Dict[str, Any]]:
+        """기준 대비 변화율이 임계치 이하이면 수치만 다시 계산한 이전 결과 반환"""
+        key = self._key(user_id, analysis_type, preferred_model)
+        baseline = self.baselines.get(key)
+        if not baseline or self.threshold <= 0:
+            return None
+        
+        if (datetime.now() - baseline["analyzed_at"]).total_seconds() > self.max_age:
+            del self.baselines[key]
+            return None
+        
+        change_ratio = self.change_ratio(baseline["snapshot"], self._snapshot(summary))
+        if change_ratio is None or change_ratio > self.threshold:
+            self.stats["missed"] += 1
+            return None
+        
+        self.stats["reused"] += 1
+        result = self._refresh_numbers(baseline["result"], analysis_type, summary)
+        result["incremental"] = {
+            "base_analyzed_at": baseline["analyzed_at"].isoformat(),
+            "change_ratio": round(change_ratio, 4)
+        }
+        return {"model_used": baseline["model_used"], "analysis": result}
+    
+    def clear(self, user_id: Any = None) -> None:
+        """기준 결과 삭제"""
+        if user_id is None:
+            self.baselines.clear()
+            return
+        for key in [k for k in self.baselines if k.startswith(f"{user_id}:")]:
+            del self.baselines[key]
+    
+    def _snapshot(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """비교에 필요한 집계만 보관"""
+        return {
+            "total_amount": summary["total_amount"],
+            "total_transactions": summary["total_transactions"],
+            "categories": {name: data["amount"] for name, data in summary["categories"].items()}
+        }
+    
+    def change_ratio(self, base: Dict[str, Any], current: Dict[str, Any]) -> Optional[float]:
+        """카테고리별 금액 변화량 합 / 기준 총액. 새 카테고리가 생기면 재사용 불가(None)"""
+        if not base["total_amount"] or set(current["categories"]) - set(base["categories"]):
+            return None
+        
+        changed = sum(
+            abs(current["categories"].get(name, 0) - amount)
+            for name, amount in base["categories"].items()
+        )
+        return changed / abs(base["total_amount"])
+    
+    def _refresh_numbers(
+        self,
+        result: Dict[str, Any],
+        analysis_type: str,
+        summary: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """이전 결과 중 집계에서 바로 계산되는 수치만 현재 데이터로 갱신 (서술형 내용은 유지)"""
+        result = copy.deepcopy(result)
+        total = summary["total_amount"]
+        count = summary["total_transactions"]
+        categories = summary["categories"]
+        
+        def percentage(name: str) -> float:
+            return round(categories[name]["amount"] / total * 100, 1) if total else 0.0
+        
+        if analysis_type == "pattern":
+            for name, data in (result.get("category_analysis") or {}).items():
+                if name in categories and isinstance(data, dict):
+                    data["percentage"] = percentage(name)
+        
+        elif analysis_type == "report":
+            key_metrics = result.get("key_metrics")
+            if isinstance(key_metrics, dict) and categories:
+                key_metrics.update({
+                    "total_spending": total,
+                    "transaction_count": count,
+                    "average_per_transaction": round(total / count) if count else 0,
+                    "most_spent_category": max(categories, key=lambda name: categories[name]["amount"]),
+                    "most_frequent_category": max(categories, key=lambda name: categories[name]["count"])
+                })
+            for name, data in (result.get("category_breakdown") or {}).items():
+                if name in categories and isinstance(data, dict):
+                    data.update({
+                        "amount": categories[name]["amount"],
+                        "percentage": percentage(name),
+                        "transaction_count": categories[name]["count"]
+                    })
+        
+        return result
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """재사용 통계"""
+        return {"baselines": len(self.baselines), **self.stats}
+
+# 싱글톤 인스턴스
+incremental_analysis_store = IncrementalAnalysisStore()
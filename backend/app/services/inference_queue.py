@@ -0,0 +1,177 @@
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from ..core.config import settings
+from .request_deadline import request_deadline
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 우선순위 클래스 (앞쪽이 높은 우선순위)
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_SCHEDULED = "scheduled"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED)
+
+class ResourcePool:
+    """동시 실행 수 제한이 있는 자원 (우선순위 + 사용자별 라운드로빈 대기열)"""
+    
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.in_flight = 0
+        # 우선순위 -> (사용자 ID -> 대기 future 목록), 사용자 순서가 라운드로빈 순서
+        self.waiters: Dict[str, OrderedDict] = {priority: OrderedDict() for priority in PRIORITIES}
+        self.total_acquired = 0
+        self.wait_times_ms: List[float] = []
+    
+    def queue_depth(self, priority: str = None) -> int:
+        """대기 중인 요청 수"""
+        priorities = [priority] if priority else PRIORITIES
+        return sum(
+            len(queue)
+            for p in priorities
+            for queue in self.waiters[p].values()
+        )
+    
+    async def acquire(self, user_id: str, priority: str) -> None:
+        """슬롯 획득 (여유가 없으면 대기열에서 순서 대기)"""
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        
+        if self.in_flight < self.capacity and self.queue_depth() == 0:
+            self.in_flight += 1
+            self._record_wait(0.0)
+            return
+        
+        future = loop.create_future()
+        self.waiters[priority].setdefault(user_id, deque()).append(future)
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 슬롯을 받은 직후 취소된 경우 반납
+                self.release()
+            else:
+                self._remove_waiter(priority, user_id, future)
+            raise
+        
+        self._record_wait((loop.time() - started_at) * 1000)
+    
+    def release(self) -> None:
+        """슬롯 반납 후 다음 대기 요청 실행"""
+        self.in_flight -= 1
+        self._wake_next()
+    
+    def _wake_next(self) -> None:
+        """여유 슬롯만큼 대기 요청 깨우기"""
+        while self.in_flight < self.capacity:
+            future = self._pop_next()
+            if future is None:
+                return
+            if future.cancelled():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+    
+    def _pop_next(self) -> Optional[asyncio.Future]:
+        """가장 높은 우선순위 클래스에서 사용자 라운드로빈으로 다음 요청 선택"""
+        for priority in PRIORITIES:
+            users = self.waiters[priority]
+            if not users:
+                continue
+            
+            user_id, queue = users.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                # 남은 요청이 있으면 해당 사용자를 맨 뒤로 (공정 스케줄링)
+                users[user_id] = queue
+            return future
+        return None
+    
+    def _remove_waiter(self, priority: str, user_id: str, future: asyncio.Future) -> None:
+        """취소된 대기 요청 제거"""
+        queue = self.waiters[priority].get(user_id)
+        if queue and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self.waiters[priority][user_id]
+    
+    def _record_wait(self, wait_ms: float) -> None:
+        """대기 시간 기록 (최근 200건 유지)"""
+        self.total_acquired += 1
+        self.wait_times_ms.append(wait_ms)
+        self.wait_times_ms = self.wait_times_ms[-200:]
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """대기열 깊이 / 대기 시간 메트릭"""
+        waits = sorted(self.wait_times_ms)
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queue_depth": {priority: self.queue_depth(priority) for priority in PRIORITIES},
+            "total_acquired": self.total_acquired,
+            "avg_wait_ms": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0
+        }
+
+class InferenceQueue:
+    """AI 추론 요청 대기열 (프로바이더/Ollama 서버별 동시 실행 수 제한)"""
+    
+    def __init__(self):
+        self.pools: Dict[str, ResourcePool] = {}
+    
+    def _get_pool(self, key: str, capacity: int) -> ResourcePool:
+        """자원 풀 조회 (없으면 생성)"""
+        if key not in self.pools:
+            self.pools[key] = ResourcePool(key, capacity)
+        return self.pools[key]
+    
+    def _resource_keys(self, provider: str, server_url: str = None) -> List[Tuple[str, int]]:
+        """요청이 점유할 자원 목록 (항상 같은 순서로 획득)"""
+        if provider == "ollama":
+            url = (server_url or settings.default_ollama_server_url).rstrip("/")
+            # 서버 슬롯을 먼저 얻어야 전체 슬롯을 잡음 (바쁜 서버 대기 요청이 전체 슬롯을 차지해 다른 서버를 막지 않도록)
+            return [
+                (f"ollama:{url}", settings.ollama_server_max_concurrency),
+                ("ollama", settings.ollama_max_concurrency)
+            ]
+        return [(provider, settings.gemini_max_concurrency)]
+    
+    @asynccontextmanager
+    async def slot(
+        self,
+        provider: str,
+        user_id: Any = None,
+        priority: str = PRIORITY_INTERACTIVE,
+        server_url: str = None
+    ) -> AsyncIterator[None]:
+        """프로바이더 호출 슬롯 점유 (요청 마감 전에 슬롯을 얻지 못하면 DeadlineExceeded)"""
+        if priority not in PRIORITIES:
+            priority = PRIORITY_INTERACTIVE
+        
+        acquired = []
+        try:
+            for key, capacity in self._resource_keys(provider, server_url):
+                pool = self._get_pool(key, capacity)
+                remaining = request_deadline.remaining()
+                if remaining is None:
+                    await pool.acquire(str(user_id), priority)
+                else:
+                    try:
+                        await asyncio.wait_for(pool.acquire(str(user_id), priority), max(0.0, remaining))
+                    except asyncio.TimeoutError:
+                        raise request_deadline.exceeded(f"{key} 대기열")
+                acquired.append(pool)
+            yield
+        finally:
+            for pool in reversed(acquired):
+                pool.release()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """자원별 대기열 메트릭"""
+        return {key: pool.get_metrics() for key, pool in self.pools.items()}
+
+# 싱글톤 인스턴스
+inference_queue = InferenceQueue()
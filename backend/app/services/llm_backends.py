@@ -0,0 +1,399 @@
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable, Awaitable
+from ..core.config import settings
+from .structured_output import ANALYSIS_SCHEMAS
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 녹화 키 계산 시 제외할 요청 필드 (응답 내용과 무관한 운영 설정)
+IGNORED_REQUEST_KEYS = {"keep_alive", "stream"}
+
+class LLMBackend:
+    """프로바이더 호출 백엔드 기본 구현 (실제 Gemini/Ollama 호출을 그대로 수행)"""
+    
+    name = "real"
+    offline = False  # True면 API 키/서버 없이 동작
+    
+    def __init__(self):
+        self.stats: Dict[str, Dict[str, int]] = {}
+    
+    def _count(self, provider: str, field: str) -> None:
+        """프로바이더별 호출 통계"""
+        stats = self.stats.setdefault(provider, {"calls": 0, "streams": 0, "failures": 0})
+        stats[field] = stats.get(field, 0) + 1
+    
+    async def call(
+        self,
+        provider: str,
+        operation: str,
+        request: Dict[str, Any],
+        send: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """단건 요청 (send: 실제 프로바이더 호출)"""
+        self._count(provider, "calls")
+        return await send()
+    
+    async def stream(
+        self,
+        provider: str,
+        request: Dict[str, Any],
+        send: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """스트리밍 요청 (Gemini: 텍스트 청크, Ollama: NDJSON 청크)"""
+        self._count(provider, "streams")
+        source = send()
+        try:
+            async for chunk in source:
+                yield chunk
+        finally:
+            # 소비자가 중간에 닫으면(JSON 완성 시 조기 종료 등) 프로바이더 연결도 바로 닫음
+            await source.aclose()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """백엔드 종류와 프로바이더별 호출 통계"""
+        return {"backend": self.name, "providers": self.stats}
+
+class FakeLLMBackend(LLMBackend):
+    """네트워크 없이 결정적인 응답을 생성하는 가짜 백엔드 (지연/토큰 속도/장애 주입 설정 가능)
+    
+    profiles: 프로바이더별 설정 {"latency", "tokens_per_second", "failure_rate", "load_latency", "available", "models", "trailing_text"}
+              trailing_text: JSON 뒤에 이어서 생성할 텍스트 (설명을 덧붙이는 로컬 모델 재현)
+              "프로바이더:모델" 키로 모델별 설정을 덮어쓸 수 있음 (예: "gemini:gemini-1.5-flash")
+    """
+    
+    name = "fake"
+    offline = True
+    
+    def __init__(self, profiles: Dict[str, Dict[str, Any]] = None, seed: int = None):
+        super().__init__()
+        default = {
+            "latency": settings.fake_llm_latency,
+            "tokens_per_second": settings.fake_llm_tokens_per_second,
+            "failure_rate": settings.fake_llm_failure_rate,
+            "load_latency": 0.0,
+            "available": True,
+            "models": [settings.ollama_default_model],
+            "trailing_text": ""
+        }
+        profiles = profiles or {}
+        self.profiles = {
+            provider: {**default, **profiles.get(provider, {})}
+            for provider in ("gemini", "ollama")
+        }
+        for key, overrides in profiles.items():
+            if ":" in key:
+                self.profiles[key] = {**self.profiles[key.split(":", 1)[0]], **overrides}
+        self.rng = random.Random(settings.fake_llm_seed if seed is None else seed)
+        self._loaded_models: set = set()
+    
+    async def call(
+        self,
+        provider: str,
+        operation: str,
+        request: Dict[str, Any],
+        send: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """operation별 가짜 응답 (tags: 서버 상태, preload: 모델 로드, generate: 분석 응답)"""
+        self._count(provider, "calls")
+        profile = self._profile(provider, request)
+        
+        if operation == "tags":
+            if not profile["available"]:
+                raise RuntimeError("가짜 Ollama 서버가 비활성화되어 있습니다")
+            return {"models": [{"name": model} for model in profile["models"]]}
+        
+        load_seconds = self._load_seconds(provider, request)
+        if operation == "preload":
+            await asyncio.sleep(load_seconds)
+            return {"load_duration": int(load_seconds * 1e9), "total_duration": int(load_seconds * 1e9)}
+        
+        text = self._generate_text(request, profile)
+        tokens = self._token_count(text)
+        eval_seconds = tokens / profile["tokens_per_second"]
+        seconds = load_seconds + profile["latency"] + eval_seconds
+        await self._maybe_fail(provider, profile, seconds)
+        await asyncio.sleep(seconds)
+        return self._ollama_result(request, text, tokens, seconds, load_seconds, eval_seconds)
+    
+    async def stream(
+        self,
+        provider: str,
+        request: Dict[str, Any],
+        send: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """첫 토큰 지연 후 토큰 속도에 맞춰 청크 전송"""
+        self._count(provider, "streams")
+        profile = self._profile(provider, request)
+        load_seconds = self._load_seconds(provider, request)
+        await self._maybe_fail(provider, profile, load_seconds + profile["latency"])
+        await asyncio.sleep(load_seconds + profile["latency"])
+        
+        text = self._generate_text(request, profile)
+        tokens = self._token_count(text)
+        # 토큰마다 sleep하지 않고 약 50ms 단위로 묶어서 전송
+        chars_per_chunk = max(4, int(profile["tokens_per_second"] * 0.05) * 4)
+        for start in range(0, len(text), chars_per_chunk):
+            piece = text[start:start + chars_per_chunk]
+            await asyncio.sleep(self._token_count(piece) / profile["tokens_per_second"])
+            yield piece if provider == "gemini" else {"response": piece, "done": False}
+        
+        if provider == "ollama":
+            eval_seconds = tokens / profile["tokens_per_second"]
+            seconds = load_seconds + profile["latency"] + eval_seconds
+            yield {
+                **self._ollama_result(request, text, tokens, seconds, load_seconds, eval_seconds),
+                "response": "",
+                "done": True
+            }
+    
+    def render(self, request: Dict[str, Any]) -> str:
+        """요청 스키마(없으면 전체 분석 스키마 합집합)에 맞는 결정적 JSON 응답"""
+        digest = hashlib.sha256(request.get("prompt", "").encode("utf-8")).hexdigest()[:8]
+        schema = request.get("format")
+        if isinstance(schema, dict):
+            result = self._example(schema, digest)
+        else:
+            result = {}
+            for analysis_schema in ANALYSIS_SCHEMAS.values():
+                result.update(self._example(analysis_schema, digest))
+        return json.dumps(result, ensure_ascii=False)
+    
+    def _generate_text(self, request: Dict[str, Any], profile: Dict[str, Any]) -> str:
+        """생성 텍스트 (JSON 응답 + trailing_text, Ollama num_predict가 있으면 그 토큰 수까지만)"""
+        text = self.render(request) + profile["trailing_text"]
+        num_predict = (request.get("options") or {}).get("num_predict")
+        if num_predict:
+            text = text[:num_predict * 4]
+        return text
+    
+    def _example(self, schema: Dict[str, Any], digest: str, name: str = "result") -> Any:
+        """스키마 예시 값 생성"""
+        kind = schema.get("type")
+        if kind == "object":
+            if "properties" in schema:
+                return {key: self._example(item, digest, key) for key, item in schema["properties"].items()}
+            if isinstance(schema.get("additionalProperties"), dict):
+                return {
+                    category: self._example(schema["additionalProperties"], digest, category)
+                    for category in ("식비", "교통", "쇼핑")
+                }
+            return {}
+        if kind == "array":
+            return [self._example(schema.get("items", {}), digest, f"{name} {i + 1}") for i in range(2)]
+        if kind == "number":
+            return int(digest[:2], 16) % 100
+        if kind == "boolean":
+            return False
+        return f"[fake {digest}] {name}"
+    
+    def _profile(self, provider: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """요청 모델의 설정 (모델별 설정이 없으면 프로바이더 설정)"""
+        return self.profiles.get(f"{provider}:{request.get('model')}", self.profiles[provider])
+    
+    def _token_count(self, text: str) -> int:
+        """토큰 수 근사 (4자 = 1토큰)"""
+        return max(1, len(text) // 4)
+    
+    def _load_seconds(self, provider: str, request: Dict[str, Any]) -> float:
+        """모델별 첫 요청에만 로딩 지연 적용 (콜드 로드 재현)"""
+        model = f"{provider}:{request.get('model', '')}"
+        if model in self._loaded_models:
+            return 0.0
+        self._loaded_models.add(model)
+        return self._profile(provider, request)["load_latency"]
+    
+    async def _maybe_fail(self, provider: str, profile: Dict[str, Any], seconds: float) -> None:
+        """failure_rate 확률로 지연 후 장애 발생"""
+        if self.rng.random() < profile["failure_rate"]:
+            self._count(provider, "failures")
+            await asyncio.sleep(seconds)
+            raise RuntimeError(f"{provider} 가짜 장애 주입")
+    
+    def _ollama_result(
+        self,
+        request: Dict[str, Any],
+        text: str,
+        tokens: int,
+        seconds: float,
+        load_seconds: float,
+        eval_seconds: float
+    ) -> Dict[str, Any]:
+        """Ollama /api/generate 응답 형식 (Gemini는 response만 사용)"""
+        return {
+            "response": text,
+            "total_duration": int(seconds * 1e9),
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": self._token_count(request.get("prompt", "")),
+            "eval_count": tokens,
+            "eval_duration": int(eval_seconds * 1e9)
+        }
+
+class RecordReplayBackend(LLMBackend):
+    """실제 요청/응답 쌍을 JSONL로 녹화(record)하거나 녹화본을 재생(replay)하는 백엔드
+    
+    latency_scale: 재생 시 녹화된 지연 시간 배율 (0이면 즉시 응답)
+    """
+    
+    def __init__(self, path: str, mode: str, latency_scale: float = None):
+        super().__init__()
+        self.name = mode
+        self.offline = mode == "replay"
+        self.path = path
+        self.latency_scale = settings.ai_replay_latency_scale if latency_scale is None else latency_scale
+        self.recordings: Dict[str, Dict[str, Any]] = {}
+        self.replay_stats = {"recorded": 0, "hits": 0, "misses": 0}
+        if mode == "replay":
+            self._load()
+    
+    def _load(self) -> None:
+        """녹화 파일 로드 (같은 키는 마지막 녹화 사용)"""
+        if not os.path.exists(self.path):
+            logger.warning(f"AI 응답 녹화 파일이 없습니다: {self.path}")
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recordings[entry["key"]] = entry
+        logger.info(f"AI 응답 녹화 {len(self.recordings)}건 로드: {self.path}")
+    
+    def key(self, provider: str, operation: str, request: Dict[str, Any]) -> str:
+        """요청 내용 기준 녹화 키"""
+        canonical = json.dumps(
+            {
+                "provider": provider,
+                "operation": operation,
+                "request": {k: v for k, v in request.items() if k not in IGNORED_REQUEST_KEYS}
+            },
+            sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    
+    def _append(self, entry: Dict[str, Any]) -> None:
+        """녹화 한 건 추가"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        self.replay_stats["recorded"] += 1
+    
+    def _lookup(self, key: str) -> Dict[str, Any]:
+        """녹화본 조회 (없으면 실패 → 엔진의 fallback 경로로 이동)"""
+        entry = self.recordings.get(key)
+        if entry is None:
+            self.replay_stats["misses"] += 1
+            raise RuntimeError(f"녹화된 응답이 없습니다: {key[:12]}")
+        self.replay_stats["hits"] += 1
+        return entry
+    
+    async def call(
+        self,
+        provider: str,
+        operation: str,
+        request: Dict[str, Any],
+        send: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """record: 실제 호출 후 저장, replay: 녹화된 응답 반환"""
+        self._count(provider, "calls")
+        key = self.key(provider, operation, request)
+        
+        if self.name == "replay":
+            entry = self._lookup(key)
+            await asyncio.sleep(entry["elapsed"] * self.latency_scale)
+            return entry["result"]
+        
+        started_at = time.perf_counter()
+        result = await send()
+        self._append({
+            "key": key,
+            "provider": provider,
+            "operation": operation,
+            "request": request,
+            "result": result,
+            "elapsed": round(time.perf_counter() - started_at, 4)
+        })
+        return result
+    
+    async def stream(
+        self,
+        provider: str,
+        request: Dict[str, Any],
+        send: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """청크와 청크별 도착 시각을 함께 녹화/재생"""
+        self._count(provider, "streams")
+        key = self.key(provider, "stream", request)
+        
+        if self.name == "replay":
+            entry = self._lookup(key)
+            previous = 0.0
+            for offset, chunk in entry["chunks"]:
+                await asyncio.sleep((offset - previous) * self.latency_scale)
+                previous = offset
+                yield chunk
+            return
+        
+        started_at = time.perf_counter()
+        chunks: List[Any] = []
+        source = send()
+        try:
+            async for chunk in source:
+                chunks.append([round(time.perf_counter() - started_at, 4), chunk])
+                yield chunk
+        except GeneratorExit:
+            # 소비자가 필요한 만큼 받고 닫은 스트림(JSON 완성 시 조기 종료)은 받은 청크까지 녹화
+            self._append_stream(key, provider, request, chunks)
+            raise
+        finally:
+            await source.aclose()
+        # 끝까지 받은 스트림 녹화 (취소/오류는 제외)
+        self._append_stream(key, provider, request, chunks)
+    
+    def _append_stream(self, key: str, provider: str, request: Dict[str, Any], chunks: List[Any]) -> None:
+        """스트림 녹화 항목 저장"""
+        self._append({
+            "key": key,
+            "provider": provider,
+            "operation": "stream",
+            "request": request,
+            "chunks": chunks,
+            "elapsed": chunks[-1][0] if chunks else 0.0
+        })
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """호출 통계 + 녹화/재생 통계"""
+        return {**super().get_metrics(), "path": self.path, **self.replay_stats}
+
+def create_llm_backend(name: str = None) -> LLMBackend:
+    """AI_PROVIDER_BACKEND 설정값으로 백엔드 생성 (real, fake, record, replay)"""
+    name = name or settings.ai_provider_backend
+    if name == "fake":
+        return FakeLLMBackend()
+    if name in ("record", "replay"):
+        return RecordReplayBackend(settings.ai_recordings_path, name)
+    if name != "real":
+        logger.warning(f"알 수 없는 AI_PROVIDER_BACKEND: {name}, 실제 프로바이더 사용")
+    return LLMBackend()
+
+_backend: Optional[LLMBackend] = None
+
+def get_llm_backend() -> LLMBackend:
+    """현재 프로바이더 백엔드 (최초 호출 시 설정값으로 생성)"""
+    global _backend
+    if _backend is None:
+        _backend = create_llm_backend()
+        if _backend.name != "real":
+            logger.info(f"AI 프로바이더 백엔드: {_backend.name}")
+    return _backend
+
+def set_llm_backend(backend: LLMBackend) -> None:
+    """프로바이더 백엔드 교체 (벤치마크/개발용)"""
+    global _backend
+    _backend = backend
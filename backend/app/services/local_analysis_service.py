@@ -0,0 +1,298 @@
+from typing import Dict, Any, List, Optional
+from .transaction_summary import TransactionColumns, summarize_transactions
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LocalAnalysisService:
+    """LLM 호출 없이 거래 데이터 계산만으로 분석 결과 생성 (Gemini 프롬프트와 동일한 JSON 스키마)"""
+    
+    TREND_THRESHOLD = 0.1  # 직전 기간 대비 10% 이상 변하면 증가/감소
+    MONTH_DAYS = 30  # 월 환산/비교 기간 (일)
+    MIN_COMPARE_DAYS = 7  # 데이터 기간이 이 2배보다 짧으면 기간 비교 안 함
+    SPIKE_Z_SCORE = 2.0  # 일 평균 + 2 표준편차를 넘는 날을 급증일로 판단
+    HIGH_SHARE = 30.0  # 전체 대비 비중(%)이 이 이상이면 집중 카테고리
+    
+    def analyze(self, transactions: List[Dict[str, Any]], analysis_type: str) -> Dict[str, Any]:
+        """분석 타입별 로컬 분석"""
+        if analysis_type not in ("pattern", "report", "optimization"):
+            return {"error": f"지원하지 않는 분석 타입: {analysis_type}"}
+        
+        columns = TransactionColumns.from_records(transactions)
+        if len(columns) == 0:
+            return {"error": "분석할 거래 내역이 없습니다"}
+        
+        facts = self._compute_facts(columns)
+        if analysis_type == "pattern":
+            return self._build_pattern(facts)
+        elif analysis_type == "report":
+            return self._build_report(facts)
+        return self._build_optimization(facts)
+    
+    def _compute_facts(self, columns: TransactionColumns) -> Dict[str, Any]:
+        """카테고리 비중, 월 환산 금액, 직전 기간 대비 변화, 급증일, 주말 비중 계산"""
+        summary = summarize_transactions(columns)
+        total = summary["total_amount"]
+        
+        valid = ~np.isnat(columns.days)
+        days = columns.days[valid]
+        amounts = columns.amounts[valid]
+        
+        # 최근 N일 vs 직전 N일 카테고리별 변화 (N = min(30, 데이터 기간의 절반), 같은 길이의 기간끼리 비교)
+        month_over_month = {}
+        compare_days = 0
+        monthly_factor = 1.0
+        if len(days):
+            day_numbers = days.astype(np.int64)
+            first, last = int(day_numbers.min()), int(day_numbers.max())
+            span = last - first + 1
+            # 30일보다 긴 기간의 합계는 30일 기준으로 환산 (짧은 기간은 부풀리지 않음)
+            monthly_factor = self.MONTH_DAYS / max(span, self.MONTH_DAYS)
+            compare_days = min(self.MONTH_DAYS, span // 2)
+        if compare_days >= self.MIN_COMPARE_DAYS:
+            codes = columns.category_codes[valid]
+            size = len(columns.categories)
+            in_current = day_numbers > last - compare_days
+            in_previous = (day_numbers > last - 2 * compare_days) & ~in_current
+            current = np.bincount(codes[in_current], weights=amounts[in_current], minlength=size)
+            previous = np.bincount(codes[in_previous], weights=amounts[in_previous], minlength=size)
+            if previous.sum() > 0:
+                for i, name in enumerate(columns.categories):
+                    change_rate = (current[i] - previous[i]) / previous[i] if previous[i] else None
+                    month_over_month[name] = {
+                        "current": float(current[i]),
+                        "previous": float(previous[i]),
+                        "change_rate": float(change_rate) if change_rate is not None else None
+                    }
+        
+        categories = {}
+        for name, data in summary["categories"].items():
+            categories[name] = {
+                **data,
+                "percentage": round(data["amount"] / total * 100, 1) if total else 0.0,
+                "average": data["amount"] / data["count"] if data["count"] else 0.0,
+                "monthly_amount": data["amount"] * monthly_factor
+            }
+        
+        # 급증일 (거래가 있는 날 기준 평균 + 2 표준편차 초과)
+        daily = summary["daily_series"]
+        daily_amounts = np.array([d["amount"] for d in daily])
+        daily_mean = float(daily_amounts.mean()) if len(daily_amounts) else 0.0
+        spikes = []
+        if len(daily_amounts) >= 3:
+            threshold = daily_mean + self.SPIKE_Z_SCORE * float(daily_amounts.std())
+            spikes = sorted(
+                (d for d in daily if d["amount"] > threshold),
+                key=lambda d: d["amount"],
+                reverse=True
+            )[:3]
+        
+        # 주말 지출 비중 (1970-01-01은 목요일, 월요일 = 0)
+        weekdays = (days.astype(np.int64) + 3) % 7
+        weekend_amount = float(amounts[weekdays >= 5].sum())
+        
+        return {
+            "summary": summary,
+            "total": total,
+            "count": summary["total_transactions"],
+            "categories": dict(sorted(categories.items(), key=lambda item: item[1]["amount"], reverse=True)),
+            "month_over_month": month_over_month,
+            "compare_days": compare_days,
+            "spikes": spikes,
+            "daily_mean": daily_mean,
+            "weekend_share": round(weekend_amount / total * 100, 1) if total else 0.0,
+            "previous_total": sum(m["previous"] for m in month_over_month.values()),
+            "current_total": sum(m["current"] for m in month_over_month.values())
+        }
+    
+    def _trend(self, facts: Dict[str, Any], category: str) -> str:
+        """직전 기간 대비 추세 (비교 데이터가 없으면 유지)"""
+        change_rate = facts["month_over_month"].get(category, {}).get("change_rate")
+        if change_rate is None:
+            return "유지"
+        if change_rate >= self.TREND_THRESHOLD:
+            return "증가"
+        if change_rate <= -self.TREND_THRESHOLD:
+            return "감소"
+        return "유지"
+    
+    def _change_text(self, facts: Dict[str, Any], category: str) -> str:
+        """직전 기간 대비 변화 설명"""
+        change_rate = facts["month_over_month"].get(category, {}).get("change_rate")
+        return f", 직전 {facts['compare_days']}일 대비 {change_rate:+.0%}" if change_rate is not None else ""
+    
+    def _increased_categories(self, facts: Dict[str, Any]) -> List[str]:
+        """직전 기간 대비 증가한 카테고리 (증가율 순)"""
+        increased = [
+            (name, data["change_rate"]) for name, data in facts["month_over_month"].items()
+            if data["change_rate"] is not None and data["change_rate"] >= self.TREND_THRESHOLD
+        ]
+        return [name for name, _ in sorted(increased, key=lambda item: item[1], reverse=True)]
+    
+    def _top_category(self, facts: Dict[str, Any]) -> Optional[str]:
+        """최대 소비 카테고리"""
+        return next(iter(facts["categories"]), None)
+    
+    def _habits(self, facts: Dict[str, Any]) -> List[str]:
+        """계산 가능한 소비 습관"""
+        habits = [
+            f"거래가 있는 날 하루 평균 {facts['daily_mean']:,.0f}원을 지출했습니다",
+            f"주말 지출이 전체의 {facts['weekend_share']}%입니다"
+        ]
+        top_merchants = facts["summary"]["top_merchants"]
+        if top_merchants and top_merchants[0]["merchant"]:
+            merchant = top_merchants[0]
+            habits.insert(0, f"가장 많이 지출한 가맹점은 {merchant['merchant']}입니다 ({merchant['amount']:,.0f}원, {merchant['count']}건)")
+        return habits
+    
+    def _recommendations(self, facts: Dict[str, Any]) -> List[str]:
+        """비중/증가율 기반 개선 제안"""
+        recommendations = []
+        top = self._top_category(facts)
+        if top and facts["categories"][top]["percentage"] >= self.HIGH_SHARE:
+            recommendations.append(
+                f"{top} 지출이 전체의 {facts['categories'][top]['percentage']}%로 높습니다. 월 예산 상한을 정해보세요"
+            )
+        for name in self._increased_categories(facts)[:2]:
+            recommendations.append(
+                f"최근 {facts['compare_days']}일 {name} 지출이 직전 {facts['compare_days']}일보다 {facts['month_over_month'][name]['change_rate']:.0%} 늘었습니다. 원인을 점검해보세요"
+            )
+        if not recommendations:
+            recommendations.append("현재 소비 패턴을 유지하면서 정기적으로 지출을 점검하세요")
+        return recommendations
+    
+    def _risk_factors(self, facts: Dict[str, Any]) -> List[str]:
+        """급증일 / 급증 카테고리"""
+        risks = [
+            f"{spike['date']} 하루 {spike['amount']:,.0f}원 지출 (거래일 평균의 {spike['amount'] / facts['daily_mean']:.1f}배)"
+            for spike in facts["spikes"]
+        ]
+        for name in self._increased_categories(facts):
+            if facts["month_over_month"][name]["change_rate"] >= 0.5:
+                risks.append(f"최근 {facts['compare_days']}일 {name} 지출이 직전 {facts['compare_days']}일보다 50% 이상 늘었습니다")
+        return risks
+    
+    def _build_pattern(self, facts: Dict[str, Any]) -> Dict[str, Any]:
+        """소비 패턴 분석 (pattern 프롬프트 스키마)"""
+        date_range = facts["summary"]["date_range"]
+        top = self._top_category(facts)
+        summary = f"{date_range.get('start', '')} ~ {date_range.get('end', '')} 동안 {facts['count']}건, 총 {facts['total']:,.0f}원을 지출했습니다."
+        if top:
+            summary += f" 가장 큰 비중은 {top}({facts['categories'][top]['percentage']}%)입니다."
+        
+        return {
+            "summary": summary,
+            "category_analysis": {
+                name: {
+                    "percentage": data["percentage"],
+                    "trend": self._trend(facts, name),
+                    "insight": f"{data['amount']:,.0f}원 ({data['count']}건), 건당 평균 {data['average']:,.0f}원{self._change_text(facts, name)}"
+                }
+                for name, data in facts["categories"].items()
+            },
+            "spending_habits": self._habits(facts),
+            "recommendations": self._recommendations(facts),
+            "risk_factors": self._risk_factors(facts)
+        }
+    
+    def _build_report(self, facts: Dict[str, Any]) -> Dict[str, Any]:
+        """월간 리포트 (report 프롬프트 스키마)"""
+        end = facts["summary"]["date_range"].get("end", "")
+        title = f"{end[:4]}년 {end[5:7]}월 소비 리포트" if end else "소비 리포트"
+        top = self._top_category(facts)
+        most_frequent = max(facts["categories"], key=lambda name: facts["categories"][name]["count"])
+        
+        executive_summary = f"총 {facts['count']}건, {facts['total']:,.0f}원을 지출했습니다."
+        if facts["previous_total"]:
+            delta = facts["current_total"] - facts["previous_total"]
+            executive_summary += (
+                f" 최근 {facts['compare_days']}일 지출이 직전 {facts['compare_days']}일보다 "
+                f"{abs(delta):,.0f}원 {'늘었습니다' if delta >= 0 else '줄었습니다'}."
+            )
+        
+        trends = self._habits(facts) + [
+            f"최근 {facts['compare_days']}일 {name} 지출이 직전 {facts['compare_days']}일보다 {facts['month_over_month'][name]['change_rate']:.0%} 늘었습니다"
+            for name in self._increased_categories(facts)
+        ]
+        
+        return {
+            "title": title,
+            "executive_summary": executive_summary,
+            "key_metrics": {
+                "total_spending": facts["total"],
+                "transaction_count": facts["count"],
+                "average_per_transaction": round(facts["total"] / facts["count"]),
+                "most_spent_category": top,
+                "most_frequent_category": most_frequent
+            },
+            "category_breakdown": {
+                name: {
+                    "amount": data["amount"],
+                    "percentage": data["percentage"],
+                    "transaction_count": data["count"],
+                    "analysis": f"건당 평균 {data['average']:,.0f}원, 추세 {self._trend(facts, name)}{self._change_text(facts, name)}"
+                }
+                for name, data in facts["categories"].items()
+            },
+            "trends_and_insights": trends,
+            "next_month_goals": [
+                f"{action['category']} 지출을 {action['expected_savings']:,.0f}원 줄이기"
+                for action in self._priority_actions(facts)
+            ],
+            "action_items": self._recommendations(facts)
+        }
+    
+    def _priority_actions(self, facts: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """상위 3개 카테고리 월 절감 행동 (증가한 카테고리는 직전 기간 수준 복귀, 그 외 10% 절감)"""
+        actions = []
+        for name, data in list(facts["categories"].items())[:3]:
+            month_over_month = facts["month_over_month"].get(name, {})
+            if self._trend(facts, name) == "증가":
+                # 비교 기간 증가분을 30일 기준으로 환산
+                to_monthly = self.MONTH_DAYS / facts["compare_days"]
+                savings = (month_over_month["current"] - month_over_month["previous"]) * to_monthly
+                action = f"{name} 지출을 직전 {facts['compare_days']}일 수준(월 {month_over_month['previous'] * to_monthly:,.0f}원)으로 되돌리기"
+                difficulty = "보통"
+            else:
+                savings = data["monthly_amount"] * 0.1
+                action = f"{name} 지출 10% 줄이기"
+                difficulty = "어려움" if data["percentage"] >= self.HIGH_SHARE else "쉬움"
+            actions.append({
+                "category": name,
+                "action": action,
+                "expected_savings": round(savings, -2),
+                "difficulty": difficulty
+            })
+        return actions
+    
+    def _monthly_budget(self, facts: Dict[str, Any], name: str, savings: float) -> float:
+        """카테고리 월 예산 (증가한 카테고리는 직전 기간 수준, 그 외 월 환산 금액에서 절감액 제외)"""
+        if self._trend(facts, name) == "증가":
+            return facts["month_over_month"][name]["previous"] * self.MONTH_DAYS / facts["compare_days"]
+        return facts["categories"][name]["monthly_amount"] - savings
+    
+    def _build_optimization(self, facts: Dict[str, Any]) -> Dict[str, Any]:
+        """예산 최적화 제안 (optimization 프롬프트 스키마)"""
+        top = self._top_category(facts)
+        top_share = facts["categories"][top]["percentage"] if top else 0.0
+        
+        # 집중도 / 증가 카테고리 / 급증일 수에 따른 감점
+        score = 100 - max(0.0, top_share - 40) / 2 - 10 * len(self._increased_categories(facts)) - 5 * len(facts["spikes"])
+        actions = self._priority_actions(facts)
+        savings = {action["category"]: action["expected_savings"] for action in actions}
+        budgets = {name: self._monthly_budget(facts, name, savings.get(name, 0)) for name in facts["categories"]}
+        
+        return {
+            "optimization_score": int(min(100, max(1, round(score)))),
+            "priority_actions": actions,
+            "budget_recommendations": {name: round(budget, -3) for name, budget in budgets.items()},
+            "saving_strategies": self._recommendations(facts),
+            "long_term_goals": [
+                f"월 지출을 {sum(budgets.values()):,.0f}원 이하로 유지하기",
+                f"{top} 비중을 {self.HIGH_SHARE:.0f}% 이하로 유지하기" if top else "카테고리별 예산 설정하기"
+            ]
+        }
+
+# 싱글톤 인스턴스
+local_analysis_service = LocalAnalysisService()
@@ -0,0 +1,154 @@
+from typing import Dict, Any, List, Optional, Union, Iterable, Deque
+from collections import deque
+from datetime import datetime
+from ..core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+class ModelRouter:
+    """요청별 모델 선택 (분석 타입/입력 크기로 티어 결정, 최근 지연/오류율로 조정)"""
+    
+    MIN_CALLS = 5  # 이 이상 호출된 모델만 지연/오류율로 판단
+    
+    def __init__(self):
+        self.samples: Dict[str, Deque[Dict[str, Any]]] = {}  # "프로바이더:모델" -> 최근 호출 결과
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self.routed: Dict[str, int] = {}
+    
+    def tier_models(self, provider: str) -> Dict[str, Optional[str]]:
+        """프로바이더별 티어 모델 (Ollama는 미설정 시 None → 서버 기본 모델)"""
+        if provider == "gemini":
+            return {TIER_FAST: settings.gemini_fast_model, TIER_STRONG: settings.gemini_strong_model}
+        return {TIER_FAST: settings.ollama_fast_model or None, TIER_STRONG: settings.ollama_strong_model or None}
+    
+    def select_tier(self, analysis_types: List[str], input_tokens: int) -> Dict[str, str]:
+        """강한 모델이 필요한 분석 타입이거나 입력이 크면 strong, 그 외 fast"""
+        strong_types = {t.strip() for t in settings.model_router_strong_types.split(",") if t.strip()}
+        heavy = [t for t in analysis_types if t in strong_types]
+        if heavy:
+            return {"tier": TIER_STRONG, "reason": f"{heavy[0]} 분석"}
+        if input_tokens >= settings.model_router_large_input_tokens:
+            return {"tier": TIER_STRONG, "reason": f"입력 {input_tokens} 토큰"}
+        return {"tier": TIER_FAST, "reason": f"입력 {input_tokens} 토큰"}
+    
+    def preferred_model(
+        self,
+        provider: str,
+        analysis_type: str,
+        input_tokens: int,
+        available_models: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """라우팅 기록 없이 route와 같은 순서로 티어 모델 조회 (Ollama 서버 선택의 모델 affinity용, 서버에 없으면 None)"""
+        tier = self.select_tier([analysis_type], input_tokens)["tier"]
+        models = self.tier_models(provider)
+        for model in (models[tier], models[TIER_FAST if tier == TIER_STRONG else TIER_STRONG]):
+            if model and (available_models is None or model in available_models):
+                return model
+        return None
+    
+    def route(
+        self,
+        provider: str,
+        analysis_type: Union[str, Iterable[str]],
+        input_tokens: int,
+        available_models: Optional[List[str]] = None,
+        default_model: Optional[str] = None
+    ) -> Optional[str]:
+        """이번 요청에 사용할 모델. 티어 모델이 지연/오류율 기준을 넘으면 다른 티어로 전환
+        
+        available_models: 서버에 있는 모델 (Ollama). 목록에 없는 티어 모델은 건너뜀
+        default_model: 사용할 수 있는 티어 모델이 없을 때 사용할 모델
+        """
+        analysis_types = [analysis_type] if isinstance(analysis_type, str) else list(analysis_type)
+        decision = self.select_tier(analysis_types, input_tokens)
+        models = self.tier_models(provider)
+        other_tier = TIER_FAST if decision["tier"] == TIER_STRONG else TIER_STRONG
+        
+        candidates = []
+        for model in (models[decision["tier"]], models[other_tier]):
+            if model and model not in candidates and (available_models is None or model in available_models):
+                candidates.append(model)
+        
+        model = candidates[0] if candidates else default_model
+        if len(candidates) > 1:
+            health = self.health(provider, candidates[0])
+            if health["degraded"] and not self.health(provider, candidates[1])["degraded"]:
+                model = candidates[1]
+                decision["reason"] += f", {candidates[0]} {health['degraded']}"
+        
+        if model:
+            self._record_decision(provider, analysis_types, input_tokens, model, decision)
+        return model
+    
+    def health(self, provider: str, model: str) -> Dict[str, Any]:
+        """최근 창(MODEL_ROUTER_WINDOW_SECONDS)의 오류율/평균 지연과 기준 초과 여부"""
+        samples = self._recent(provider, model)
+        calls = len(samples)
+        errors = sum(1 for sample in samples if not sample["success"])
+        latencies = [sample["latency_ms"] for sample in samples if sample["success"]]
+        average_ms = sum(latencies) / len(latencies) if latencies else None
+        
+        degraded = None
+        if calls >= self.MIN_CALLS:
+            if errors / calls > settings.model_router_max_error_rate:
+                degraded = f"오류율 {errors / calls:.0%}"
+            elif average_ms is not None and settings.model_router_latency_slo_ms > 0 and average_ms > settings.model_router_latency_slo_ms:
+                degraded = f"평균 지연 {average_ms:.0f}ms"
+        
+        return {
+            "calls": calls,
+            "error_rate": round(errors / calls, 3) if calls else None,
+            "avg_latency_ms": round(average_ms, 1) if average_ms is not None else None,
+            "degraded": degraded
+        }
+    
+    def record(self, provider: str, model: Optional[str], latency_ms: int, success: bool) -> None:
+        """모델 호출 결과 기록 (라우팅 판단에 사용)"""
+        if not model:
+            return
+        samples = self.samples.setdefault(f"{provider}:{model}", deque(maxlen=100))
+        samples.append({"at": datetime.now().timestamp(), "latency_ms": latency_ms, "success": success})
+    
+    def _recent(self, provider: str, model: str) -> List[Dict[str, Any]]:
+        """창 안의 호출 결과 (창이 지나면 기준을 넘었던 모델도 다시 시도됨)"""
+        cutoff = datetime.now().timestamp() - settings.model_router_window_seconds
+        return [sample for sample in self.samples.get(f"{provider}:{model}", ()) if sample["at"] >= cutoff]
+    
+    def _record_decision(
+        self,
+        provider: str,
+        analysis_types: List[str],
+        input_tokens: int,
+        model: Optional[str],
+        decision: Dict[str, str]
+    ) -> None:
+        """라우팅 결정 로그/통계"""
+        key = f"{provider}:{model}"
+        self.routed[key] = self.routed.get(key, 0) + 1
+        self.decisions.append({
+            "at": datetime.now().isoformat(),
+            "provider": provider,
+            "analysis_types": analysis_types,
+            "input_tokens": input_tokens,
+            "tier": decision["tier"],
+            "model": model,
+            "reason": decision["reason"]
+        })
+        logger.info(f"모델 라우팅: {provider} {','.join(analysis_types)} -> {model} ({decision['tier']}, {decision['reason']})")
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """모델별 라우팅 횟수, 최근 지연/오류율, 최근 결정"""
+        return {
+            "routed": dict(self.routed),
+            "models": {
+                key: self.health(*key.split(":", 1)) for key in self.samples
+            },
+            "recent_decisions": list(self.decisions)[-10:]
+        }
+
+# 싱글톤 인스턴스
+model_router = ModelRouter()
@@ -0,0 +1,88 @@
+from typing import Dict, Any, Optional, Set
+from datetime import datetime
+from ..core.config import settings
+from .ollama_service import create_ollama_service
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class OllamaCapabilityRegistry:
+    """Ollama 서버별 연결 가능 여부/모델 목록 캐시 (TTL + 백그라운드 갱신)"""
+    
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl if ttl is not None else settings.ollama_capability_ttl
+        self.capabilities: Dict[str, Dict[str, Any]] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._background_tasks: Set[asyncio.Task] = set()
+    
+    def _resolve_url(self, server_url: Optional[str]) -> str:
+        """서버 URL 정규화 (미설정 시 기본 서버)"""
+        return (server_url or settings.default_ollama_server_url).rstrip("/")
+    
+    async def get_capabilities(self, server_url: str = None) -> Dict[str, Any]:
+        """서버 상태 조회. 캐시가 만료되었으면 기존 값을 반환하고 백그라운드에서 갱신"""
+        url = self._resolve_url(server_url)
+        entry = self.capabilities.get(url)
+        
+        if entry is None:
+            # 캐시가 없으면 동기적으로 조회 (동시 요청은 하나의 조회로 합침)
+            return await self._refresh(url)
+        
+        if datetime.now().timestamp() - entry["checked_at"] >= self.ttl:
+            self._schedule_refresh(url)
+        
+        return entry
+    
+    async def is_available(self, server_url: str = None) -> bool:
+        """서버 연결 가능 여부 (캐시 사용)"""
+        return (await self.get_capabilities(server_url))["available"]
+    
+    async def get_available_models(self, server_url: str = None) -> list:
+        """사용 가능한 모델 목록 (캐시 사용)"""
+        return (await self.get_capabilities(server_url))["models"]
+    
+    def invalidate(self, server_url: str = None) -> None:
+        """오류 발생 시 서버 캐시 무효화 (다음 요청에서 다시 조회)"""
+        url = self._resolve_url(server_url)
+        if self.capabilities.pop(url, None) is not None:
+            logger.info(f"Ollama 서버 캐시 무효화: {url}")
+    
+    def clear(self) -> None:
+        """전체 캐시 삭제"""
+        self.capabilities.clear()
+    
+    def _schedule_refresh(self, url: str) -> None:
+        """백그라운드 갱신 예약 (이미 진행 중이면 생략)"""
+        if url in self._refreshing:
+            return
+        
+        task = asyncio.ensure_future(self._refresh(url))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _refresh(self, url: str) -> Dict[str, Any]:
+        """서버 상태를 조회하여 캐시 갱신"""
+        task = self._refreshing.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url))
+            self._refreshing[url] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(url, None))
+        
+        return await asyncio.shield(task)
+    
+    async def _fetch(self, url: str) -> Dict[str, Any]:
+        """/api/tags 한 번으로 연결 여부와 모델 목록 조회"""
+        async with create_ollama_service(url) as ollama:
+            capabilities = await ollama.get_server_capabilities()
+        
+        entry = {
+            "available": capabilities["available"],
+            "models": capabilities["models"],
+            "checked_at": datetime.now().timestamp()
+        }
+        self.capabilities[url] = entry
+        return entry
+
+# 싱글톤 인스턴스
+ollama_capability_registry = OllamaCapabilityRegistry()
@@ -0,0 +1,325 @@
+from typing import Dict, Any, List, Optional, Iterable
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.ollama_model_benchmark import OllamaModelBenchmark
+from .ollama_service import OllamaService, create_ollama_service
+from .ollama_capability_registry import ollama_capability_registry
+from .inference_queue import inference_queue, PRIORITY_SCHEDULED
+from .request_deadline import request_deadline
+from .structured_output import ANALYSIS_SCHEMAS, extract_json, validate_schema, ollama_output_format
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 고정 분석 프롬프트용 거래 데이터 (모델 간 결과를 비교할 수 있도록 항상 같은 입력 사용)
+BENCHMARK_TRANSACTIONS = [
+    {
+        "amount": amount,
+        "transaction_type": "결제",
+        "transaction_date": datetime(2024, 5, day, 12, 0),
+        "original_merchant_name": merchant,
+        "manual_category": category,
+        "memo": ""
+    }
+    for day, merchant, category, amount in [
+        (1, "스타벅스 강남점", "식비", 6500.0),
+        (2, "GS25 역삼점", "식비", 4200.0),
+        (3, "카카오T", "교통", 13800.0),
+        (5, "쿠팡", "쇼핑", 58900.0),
+        (7, "김밥천국", "식비", 8000.0),
+        (9, "CGV 용산", "문화", 15000.0),
+        (10, "서울교통공사", "교통", 1400.0),
+        (12, "이마트 성수점", "식비", 87300.0),
+        (14, "올리브영", "쇼핑", 32000.0),
+        (16, "연세내과의원", "의료", 12500.0),
+        (18, "배달의민족", "식비", 24000.0),
+        (20, "관리비", "주거", 185000.0),
+        (22, "무신사", "쇼핑", 129000.0),
+        (25, "스타벅스 강남점", "식비", 5900.0),
+        (28, "넷플릭스", "문화", 17000.0)
+    ]
+]
+
+class OllamaModelBenchmarkService:
+    """Ollama 서버별 모델 벤치마크 (토큰 속도/로드 시간/JSON 유효성) 및 분석 타입별 자동 모델 선택"""
+    
+    BENCHMARK_USER = "benchmark"  # 추론 대기열에서 벤치마크 요청을 묶는 사용자 키
+    
+    def __init__(self):
+        self.results: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}  # 서버 -> 분석 타입 -> 모델 -> 측정 결과
+        self._running: Dict[str, asyncio.Task] = {}
+    
+    def _resolve_url(self, server_url: Optional[str]) -> str:
+        """서버 URL 정규화 (미설정 시 기본 서버)"""
+        return (server_url or settings.default_ollama_server_url).rstrip("/")
+    
+    def analysis_types(self) -> List[str]:
+        """벤치마크할 분석 타입 (OLLAMA_BENCHMARK_TYPES)"""
+        return [t.strip() for t in settings.ollama_benchmark_types.split(",") if t.strip()]
+    
+    def best_model(self, server_url: Optional[str], analysis_type: str, available_models: List[str]) -> Optional[str]:
+        """JSON 유효 비율 기준을 통과한 모델 중 평균 응답 시간이 가장 짧은 모델 (측정 결과가 없으면 None)"""
+        if not settings.ollama_auto_model:
+            return None
+        measured = self.results.get(self._resolve_url(server_url), {}).get(analysis_type, {})
+        candidates = [
+            (result["avg_latency_ms"], model)
+            for model, result in measured.items()
+            if model in available_models
+            and result["avg_latency_ms"] is not None
+            and result["valid_rate"] >= settings.ollama_benchmark_min_valid_rate
+        ]
+        return min(candidates)[1] if candidates else None
+    
+    def schedule(self, server_url: Optional[str] = None, models: Optional[Iterable[str]] = None) -> bool:
+        """백그라운드 벤치마크 시작 (같은 서버에서 이미 실행 중이면 False)"""
+        url = self._resolve_url(server_url)
+        if url in self._running:
+            return False
+        self._start(url, models, only_new=False, persist=True)
+        return True
+    
+    async def benchmark(
+        self,
+        server_url: Optional[str] = None,
+        models: Optional[Iterable[str]] = None,
+        only_new: bool = False,
+        persist: bool = True
+    ) -> Dict[str, Any]:
+        """서버의 모델별 벤치마크 실행 후 결과 반환 (같은 서버에서 실행 중이면 그 결과를 기다림)
+        
+        only_new: 아직 측정하지 않은 모델만 (새로 pull한 모델)
+        persist: 결과를 DB에 저장
+        """
+        url = self._resolve_url(server_url)
+        task = self._running.get(url) or self._start(url, models, only_new, persist)
+        return await asyncio.shield(task)
+    
+    def _start(self, url: str, models: Optional[Iterable[str]], only_new: bool, persist: bool) -> asyncio.Task:
+        """서버별 벤치마크 태스크 생성"""
+        task = asyncio.ensure_future(self._benchmark(url, set(models) if models else None, only_new, persist))
+        self._running[url] = task
+        task.add_done_callback(lambda _: self._running.pop(url, None))
+        return task
+    
+    async def _benchmark(self, url: str, models: Optional[set], only_new: bool, persist: bool) -> Dict[str, Any]:
+        """모델을 하나씩 측정 (모델끼리 서버 메모리/연산을 다투지 않도록 순차 실행)"""
+        # 요청 처리 중 시작되어도 응답 마감과 무관하게 끝까지 측정
+        with request_deadline.detached():
+            capabilities = await ollama_capability_registry.get_capabilities(url)
+            if not capabilities["available"]:
+                return {"success": False, "server_url": url, "error": "Ollama 서버에 연결할 수 없습니다"}
+            
+            targets = [model for model in capabilities["models"] if models is None or model in models]
+            if only_new:
+                measured = {model for by_model in self.results.get(url, {}).values() for model in by_model}
+                targets = [model for model in targets if model not in measured]
+            
+            results = {}
+            for model in targets:
+                results[model] = await self._benchmark_model(url, model)
+            
+            if persist and results:
+                try:
+                    await asyncio.to_thread(self._store, url, results)
+                except Exception as e:
+                    logger.error(f"Ollama 모델 벤치마크 저장 실패 ({url}): {e}")
+            
+            return {
+                "success": True,
+                "server_url": url,
+                "models": results,
+                "selected": {
+                    analysis_type: self.best_model(url, analysis_type, capabilities["models"])
+                    for analysis_type in self.analysis_types()
+                }
+            }
+    
+    async def _benchmark_model(self, url: str, model: str) -> Dict[str, Dict[str, Any]]:
+        """모델 로드 시간 측정 후 분석 타입별로 고정 프롬프트를 OLLAMA_BENCHMARK_RUNS회 생성"""
+        by_type = {}
+        async with create_ollama_service(url) as ollama:
+            async with inference_queue.slot("ollama", self.BENCHMARK_USER, PRIORITY_SCHEDULED, url):
+                loaded = await ollama.preload_model(model)
+            load_ms = round(loaded.get("load_duration", 0) / 1_000_000, 1) if loaded["success"] else None
+            
+            for analysis_type in self.analysis_types():
+                prompts = ollama.build_prompt(BENCHMARK_TRANSACTIONS, analysis_type)
+                if prompts is None:
+                    continue
+                runs = [
+                    await self._run_once(ollama, url, model, analysis_type, *prompts)
+                    for _ in range(max(1, settings.ollama_benchmark_runs))
+                ]
+                result = self._summarize(runs, load_ms, loaded.get("error"))
+                self.results.setdefault(url, {}).setdefault(analysis_type, {})[model] = result
+                by_type[analysis_type] = result
+                logger.info(
+                    f"Ollama 모델 벤치마크: {url} {model} {analysis_type} "
+                    f"(유효 {result['valid_runs']}/{result['runs']}, {result['avg_latency_ms']}ms, "
+                    f"{result['tokens_per_second']} tok/s, 로드 {load_ms}ms)"
+                )
+        return by_type
+    
+    async def _run_once(
+        self,
+        ollama: OllamaService,
+        url: str,
+        model: str,
+        analysis_type: str,
+        prompt: str,
+        system_prompt: str
+    ) -> Dict[str, Any]:
+        """1회 생성 (실제 분석과 같은 출력 형식/최대 토큰/조기 종료 설정)"""
+        chunks = []
+        done = {}
+        first_token_at = None
+        try:
+            async with inference_queue.slot("ollama", self.BENCHMARK_USER, PRIORITY_SCHEDULED, url):
+                started_at = time.perf_counter()
+                async for chunk in ollama.stream_response(
+                    prompt, model, system_prompt, ollama_output_format(analysis_type),
+                    analysis_type, stop_at_json=settings.ollama_early_stop
+                ):
+                    if chunk.get("response"):
+                        first_token_at = first_token_at or time.perf_counter()
+                        chunks.append(chunk["response"])
+                    if chunk.get("done"):
+                        done = chunk
+                finished_at = time.perf_counter()
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        
+        # 서버가 보고한 생성 시간이 있으면 사용, 조기 종료로 없으면 첫 토큰 이후 경과 시간 기준
+        tokens = done.get("eval_count") or len(chunks)
+        if done.get("eval_duration"):
+            tokens_per_second = tokens / (done["eval_duration"] / 1e9)
+        elif first_token_at is not None and finished_at > first_token_at:
+            tokens_per_second = tokens / (finished_at - first_token_at)
+        else:
+            tokens_per_second = None
+        
+        return {
+            "success": True,
+            "valid": self._is_valid("".join(chunks), analysis_type),
+            "latency_ms": (finished_at - started_at) * 1000,
+            "first_token_ms": (first_token_at - started_at) * 1000 if first_token_at is not None else None,
+            "tokens_per_second": tokens_per_second
+        }
+    
+    def _is_valid(self, response_text: str, analysis_type: str) -> bool:
+        """복구 없이 파싱되고 분석 타입 스키마를 통과한 JSON 객체인지"""
+        value, repaired = extract_json(response_text)
+        if not isinstance(value, dict) or repaired:
+            return False
+        schema = ANALYSIS_SCHEMAS.get(analysis_type)
+        return schema is None or not validate_schema(value, schema)
+    
+    def _summarize(self, runs: List[Dict[str, Any]], load_ms: Optional[float], load_error: Optional[str]) -> Dict[str, Any]:
+        """측정 결과 집계 (지연/토큰 속도는 성공한 생성의 평균)"""
+        completed = [run for run in runs if run["success"]]
+        errors = [run["error"] for run in runs if not run["success"]]
+        
+        def average(key: str) -> Optional[float]:
+            values = [run[key] for run in completed if run[key] is not None]
+            return round(sum(values) / len(values), 1) if values else None
+        
+        valid_runs = sum(1 for run in completed if run["valid"])
+        return {
+            "runs": len(runs),
+            "valid_runs": valid_runs,
+            "valid_rate": round(valid_runs / len(runs), 3),
+            "tokens_per_second": average("tokens_per_second"),
+            "avg_latency_ms": average("latency_ms"),
+            "first_token_ms": average("first_token_ms"),
+            "load_ms": load_ms,
+            "last_error": errors[-1] if errors else load_error,
+            "benchmarked_at": datetime.now(timezone.utc).isoformat()
+        }
+    
+    def load(self, db: Session) -> int:
+        """저장된 측정 결과를 메모리로 로드 (모델 선택은 요청마다 DB를 조회하지 않음). 로드한 건수 반환"""
+        rows = db.execute(select(OllamaModelBenchmark)).scalars().all()
+        for row in rows:
+            self.results.setdefault(row.server_url, {}).setdefault(row.analysis_type, {})[row.model] = {
+                "runs": row.runs,
+                "valid_runs": row.valid_runs,
+                "valid_rate": round(row.valid_runs / row.runs, 3) if row.runs else 0.0,
+                "tokens_per_second": row.tokens_per_second,
+                "avg_latency_ms": row.avg_latency_ms,
+                "first_token_ms": row.first_token_ms,
+                "load_ms": row.load_ms,
+                "last_error": row.last_error,
+                "benchmarked_at": row.benchmarked_at.isoformat()
+            }
+        return len(rows)
+    
+    def _store(self, url: str, results: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        """서버/모델/분석 타입별 1건으로 upsert (스레드에서 실행)"""
+        db = SessionLocal()
+        try:
+            for model, by_type in results.items():
+                for analysis_type, result in by_type.items():
+                    values = {
+                        "server_url": url,
+                        "model": model,
+                        "analysis_type": analysis_type,
+                        **{key: result[key] for key in (
+                            "runs", "valid_runs", "tokens_per_second", "avg_latency_ms",
+                            "first_token_ms", "load_ms", "last_error"
+                        )}
+                    }
+                    stmt = pg_insert(OllamaModelBenchmark).values(**values)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[
+                            OllamaModelBenchmark.server_url, OllamaModelBenchmark.model, OllamaModelBenchmark.analysis_type
+                        ],
+                        set_={
+                            **{key: stmt.excluded[key] for key in values if key not in ("server_url", "model", "analysis_type")},
+                            "benchmarked_at": datetime.now(timezone.utc)
+                        }
+                    )
+                    db.execute(stmt)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def get_results(self, server_url: Optional[str] = None) -> Dict[str, Any]:
+        """서버의 분석 타입별 모델 측정 결과와 현재 자동 선택 모델"""
+        url = self._resolve_url(server_url)
+        measured = self.results.get(url, {})
+        return {
+            "server_url": url,
+            "running": url in self._running,
+            "auto_model": settings.ollama_auto_model,
+            "selected": {
+                analysis_type: self.best_model(url, analysis_type, list(by_model))
+                for analysis_type, by_model in measured.items()
+            },
+            "results": measured
+        }
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """실행 중인 벤치마크와 서버별 분석 타입 자동 선택 모델"""
+        return {
+            "running": sorted(self._running),
+            "selected": {
+                url: {
+                    analysis_type: self.best_model(url, analysis_type, list(by_model))
+                    for analysis_type, by_model in by_type.items()
+                }
+                for url, by_type in self.results.items()
+            }
+        }
+
+# 싱글톤 인스턴스
+ollama_model_benchmark_service = OllamaModelBenchmarkService()
@@ -0,0 +1,161 @@
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+from datetime import datetime
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.user import User
+from .ollama_service import create_ollama_service, resolve_keep_alive, parse_keep_alive
+from .ollama_capability_registry import ollama_capability_registry
+from .ollama_model_benchmark_service import ollama_model_benchmark_service
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class OllamaModelManager:
+    """Ollama 서버별 모델 예열, keep-alive 기반 로드 상태 추적, 로딩 시간 통계"""
+    
+    COLD_LOAD_MS = 1000  # 이 이상 걸린 로딩은 콜드 로드로 집계
+    
+    def __init__(self):
+        self.loaded_until: Dict[str, Dict[str, Optional[float]]] = {}  # 서버 -> 모델 -> 언로드 예상 시각 (None: 무기한)
+        self.load_history: Dict[str, List[Dict[str, Any]]] = {}  # "서버|모델" -> 최근 로딩 시간
+        self.last_warmup: Dict[str, Dict[str, Any]] = {}
+        self._warming: Dict[Tuple[str, Optional[str]], asyncio.Task] = {}  # (서버, 요청 모델) -> 진행 중인 예열
+    
+    def _resolve_url(self, server_url: Optional[str]) -> str:
+        """서버 URL 정규화 (미설정 시 기본 서버)"""
+        return (server_url or settings.default_ollama_server_url).rstrip("/")
+    
+    def select_model(
+        self,
+        available_models: List[str],
+        server_url: str = None,
+        analysis_type: str = None
+    ) -> Optional[str]:
+        """분석에 사용할 모델 (서버/분석 타입 벤치마크 결과가 있으면 가장 빠른 모델, 없으면 기본 모델 또는 첫 번째 모델)"""
+        if not available_models:
+            return None
+        if analysis_type:
+            benchmarked = ollama_model_benchmark_service.best_model(server_url, analysis_type, available_models)
+            if benchmarked:
+                return benchmarked
+        if settings.ollama_default_model in available_models:
+            return settings.ollama_default_model
+        return available_models[0]
+    
+    async def warm_up(self, server_url: str = None, model: str = None) -> Dict[str, Any]:
+        """모델을 미리 메모리에 로드 (같은 서버·같은 모델에 대한 동시 요청만 하나로 합침)"""
+        url = self._resolve_url(server_url)
+        key = (url, model)
+        task = self._warming.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._warm_up(url, model))
+            self._warming[key] = task
+            task.add_done_callback(lambda _: self._warming.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _warm_up(self, url: str, model: str = None) -> Dict[str, Any]:
+        """서버 상태 확인 후 모델 preload"""
+        capabilities = await ollama_capability_registry.get_capabilities(url)
+        if not capabilities["available"]:
+            result = {"success": False, "error": "Ollama 서버에 연결할 수 없습니다"}
+        else:
+            # 모델을 지정하지 않으면 pattern 분석에 선택될 모델을 예열
+            model = model or self.select_model(capabilities["models"], url, "pattern")
+            if model is None:
+                result = {"success": False, "error": "사용 가능한 Ollama 모델이 없습니다"}
+            else:
+                # 이미 로드된 모델도 다시 요청하여 keep-alive 갱신
+                async with create_ollama_service(url) as ollama:
+                    result = await ollama.preload_model(model)
+                if result["success"]:
+                    self.record_load(url, model, result.get("load_duration", 0))
+        
+        self.last_warmup[url] = {**result, "at": datetime.now().isoformat()}
+        if result["success"]:
+            logger.info(f"Ollama 모델 예열 완료: {url} {result.get('model')}")
+        else:
+            logger.warning(f"Ollama 모델 예열 실패: {url} ({result.get('error')})")
+        return result
+    
+    async def warm_up_all(self, server_urls: Iterable[Optional[str]]) -> Dict[str, Any]:
+        """여러 서버 동시 예열"""
+        urls = sorted({self._resolve_url(url) for url in server_urls})
+        results = await asyncio.gather(*(self.warm_up(url) for url in urls), return_exceptions=True)
+        return {
+            url: result if not isinstance(result, Exception) else {"success": False, "error": str(result)}
+            for url, result in zip(urls, results)
+        }
+    
+    def get_known_servers(self, db: Session) -> List[str]:
+        """기본 서버 + 사용자가 등록한 Ollama 서버 목록"""
+        rows = db.query(User.ollama_server_url).filter(User.ollama_server_url.isnot(None)).distinct().all()
+        return sorted({self._resolve_url(None)} | {self._resolve_url(row[0]) for row in rows if row[0]})
+    
+    def record_load(self, server_url: str, model: str, load_duration_ns: Optional[int]) -> None:
+        """요청/예열 후 로딩 시간 기록 및 keep-alive 만료 시각 갱신 (로딩 시간을 모르면 만료 시각만 갱신)"""
+        url = self._resolve_url(server_url)
+        now = datetime.now().timestamp()
+        
+        keep_alive = parse_keep_alive(resolve_keep_alive(url))
+        self.loaded_until.setdefault(url, {})[model] = None if keep_alive is None else now + keep_alive
+        if load_duration_ns is None:
+            return
+        
+        history = self.load_history.setdefault(f"{url}|{model}", [])
+        history.append({"at": now, "load_ms": round(load_duration_ns / 1_000_000, 1)})
+        del history[:-100]
+    
+    def is_hot(self, server_url: str, model: str) -> bool:
+        """keep-alive 기준으로 모델이 아직 메모리에 있을 것으로 보이는지"""
+        loaded_until = self.loaded_until.get(self._resolve_url(server_url), {})
+        if model not in loaded_until:
+            return False
+        expires_at = loaded_until[model]
+        return expires_at is None or datetime.now().timestamp() < expires_at
+    
+    async def get_running_models(self, server_url: str = None) -> List[Dict[str, Any]]:
+        """서버에 실제로 로드된 모델 조회 (/api/ps) 후 추적 상태 동기화"""
+        url = self._resolve_url(server_url)
+        async with create_ollama_service(url) as ollama:
+            running = await ollama.get_running_models()
+        
+        # 서버에서 내려간 모델은 추적 목록에서도 제거
+        running_names = {model["name"] for model in running}
+        tracked = self.loaded_until.get(url, {})
+        for model in [name for name in tracked if name not in running_names]:
+            del tracked[model]
+        return running
+    
+    def get_status(self, server_url: str = None) -> Dict[str, Any]:
+        """서버별 keep-alive / 로드 상태 / 로딩 시간 통계"""
+        urls = [self._resolve_url(server_url)] if server_url else sorted(
+            set(self.loaded_until) | set(self.last_warmup) | {key.split("|")[0] for key in self.load_history}
+        )
+        
+        status = {}
+        for url in urls:
+            models = {}
+            for key, history in self.load_history.items():
+                key_url, model = key.split("|", 1)
+                if key_url != url:
+                    continue
+                loads = sorted(sample["load_ms"] for sample in history)
+                models[model] = {
+                    "hot": self.is_hot(url, model),
+                    "samples": len(loads),
+                    "cold_loads": sum(1 for load in loads if load >= self.COLD_LOAD_MS),
+                    "avg_load_ms": round(sum(loads) / len(loads), 1),
+                    "p95_load_ms": loads[min(len(loads) - 1, int(len(loads) * 0.95))],
+                    "last_load_ms": history[-1]["load_ms"]
+                }
+            status[url] = {
+                "keep_alive": resolve_keep_alive(url),
+                "hot_models": [model for model in self.loaded_until.get(url, {}) if self.is_hot(url, model)],
+                "models": models,
+                "last_warmup": self.last_warmup.get(url)
+            }
+        return status
+
+# 싱글톤 인스턴스
+ollama_model_manager = OllamaModelManager()
@@ -0,0 +1,170 @@
+from typing import Dict, Any, List, Optional, Iterable, AsyncIterator
+from contextlib import asynccontextmanager
+from ..core.config import settings
+from .ollama_capability_registry import ollama_capability_registry
+from .ollama_model_manager import ollama_model_manager
+from .circuit_breaker import circuit_breakers
+from .model_router import model_router
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_LEAST_OUTSTANDING = "least_outstanding"
+STRATEGY_LATENCY = "latency"
+
+class OllamaServerPool:
+    """여러 Ollama 서버 부하 분산 (개인 서버가 없는 사용자의 기본 서버)
+    
+    상태 확인은 서버 상태 캐시(OLLAMA_CAPABILITY_TTL마다 백그라운드 갱신)와 서버별 서킷 브레이커를 사용하고,
+    서버마다 실제로 실행될 모델이 로드된 서버를 우선한 뒤 사용 중 요청 수 또는 지연 가중치로 서버를 고른다
+    """
+    
+    LATENCY_ALPHA = 0.3  # 평균 지연 EWMA 가중치
+    
+    def __init__(self):
+        self.outstanding: Dict[str, int] = {}  # 서버 -> 선택 후 아직 끝나지 않은 요청 수 (대기열 대기 포함)
+        self.latency_ms: Dict[str, float] = {}  # 서버 -> 최근 응답 시간 EWMA
+        self.stats: Dict[str, Dict[str, int]] = {}  # 서버 -> 선택/성공/실패/affinity 횟수
+        self._rotation = 0
+    
+    @property
+    def servers(self) -> List[str]:
+        """풀에 포함된 서버 (OLLAMA_POOL_SERVERS, 미설정 시 기본 서버)"""
+        urls = [url.strip().rstrip("/") for url in settings.ollama_pool_servers.split(",") if url.strip()]
+        return list(dict.fromkeys(urls)) or [settings.default_ollama_server_url.rstrip("/")]
+    
+    @property
+    def enabled(self) -> bool:
+        """서버 풀이 설정되었는지 (미설정 시 기존처럼 기본 서버 하나만 사용)"""
+        return bool(settings.ollama_pool_servers.strip())
+    
+    def pooled(self, server_url: Optional[str]) -> bool:
+        """이 요청이 서버 풀을 사용하는지 (개인 서버가 있으면 항상 개인 서버)"""
+        return not server_url and self.enabled
+    
+    async def select(
+        self,
+        analysis_type: str = None,
+        input_tokens: int = 0,
+        exclude: Iterable[str] = ()
+    ) -> Optional[str]:
+        """요청을 보낼 서버 선택 (제외 후 남은 서버가 없으면 None)
+        
+        1. 연결 가능하고 모델이 있으며 서킷 브레이커가 닫힌 서버 (없으면 남은 서버 전체에서 선택해 빠르게 실패)
+        2. 티어 모델이 설정되어 있으면 그 모델이 있는 서버, 그중 서버별 실행 모델이 로드된 서버에 여유 슬롯이 있으면 그 서버들로 한정
+        3. 사용 중 요청 수(또는 지연 가중치)가 가장 낮은 서버 (같으면 순환)
+        """
+        excluded = set(exclude)
+        urls = [url for url in self.servers if url not in excluded]
+        if not urls:
+            return None
+        
+        capabilities = await asyncio.gather(*(ollama_capability_registry.get_capabilities(url) for url in urls))
+        models_by_url = {
+            url: capability["models"]
+            for url, capability in zip(urls, capabilities)
+            if capability["available"] and capability["models"] and not circuit_breakers.get("ollama", url).rejecting()
+        }
+        candidates = list(models_by_url) or urls
+        
+        affinity = False
+        if analysis_type and models_by_url:
+            tier_model = model_router.preferred_model("ollama", analysis_type, input_tokens)
+            with_model = [url for url in candidates if tier_model in models_by_url[url]]
+            candidates = with_model or candidates
+            hot = [
+                url for url in candidates
+                if ollama_model_manager.is_hot(url, self._expected_model(url, models_by_url[url], analysis_type, input_tokens))
+            ]
+            # 모델이 로드된 서버가 모두 바쁘면 콜드 로드를 감수하고 한가한 서버로 분산
+            if any(self.outstanding.get(url, 0) < settings.ollama_server_max_concurrency for url in hot):
+                candidates = hot
+                affinity = True
+        
+        # 점수가 같으면 순환 순서로 선택
+        self._rotation += 1
+        offset = self._rotation % len(candidates)
+        selected = min(candidates[offset:] + candidates[:offset], key=self._score)
+        
+        stats = self._stats(selected)
+        stats["selected"] += 1
+        if affinity:
+            stats["affinity"] += 1
+        return selected
+    
+    def _expected_model(self, url: str, models: List[str], analysis_type: str, input_tokens: int) -> Optional[str]:
+        """이 서버에서 실행될 모델 (분석 호출과 같은 순서: 서버에 있는 티어 모델, 없으면 벤치마크 선택 모델 또는 기본 모델)"""
+        return (
+            model_router.preferred_model("ollama", analysis_type, input_tokens, models)
+            or ollama_model_manager.select_model(models, url, analysis_type)
+        )
+    
+    @asynccontextmanager
+    async def lease(
+        self,
+        server_url: Optional[str] = None,
+        analysis_type: str = None,
+        input_tokens: int = 0,
+        exclude: Iterable[str] = ()
+    ) -> AsyncIterator[Optional[str]]:
+        """요청에 사용할 서버 (개인 서버가 있거나 풀이 없으면 그대로). 블록 안에서는 사용 중 요청으로 집계"""
+        if not self.pooled(server_url):
+            yield server_url
+            return
+        
+        selected = await self.select(analysis_type, input_tokens, exclude)
+        if selected is None:
+            yield None
+            return
+        
+        self.outstanding[selected] = self.outstanding.get(selected, 0) + 1
+        try:
+            yield selected
+        finally:
+            self.outstanding[selected] -= 1
+    
+    def record(self, server_url: Optional[str], latency_ms: int, success: bool) -> None:
+        """풀 서버의 호출 결과 기록 (성공 호출의 지연은 latency 전략에 사용)"""
+        if not server_url or server_url.rstrip("/") not in self.servers:
+            return
+        url = server_url.rstrip("/")
+        stats = self._stats(url)
+        if not success:
+            stats["failures"] += 1
+            return
+        
+        stats["successes"] += 1
+        previous = self.latency_ms.get(url)
+        self.latency_ms[url] = latency_ms if previous is None else (
+            self.LATENCY_ALPHA * latency_ms + (1 - self.LATENCY_ALPHA) * previous
+        )
+    
+    def _score(self, url: str) -> float:
+        """낮을수록 우선 (latency 전략에서 지연 기록이 없는 서버는 먼저 시도)"""
+        outstanding = self.outstanding.get(url, 0)
+        if settings.ollama_pool_strategy == STRATEGY_LATENCY:
+            return (outstanding + 1) * self.latency_ms.get(url, 0.0)
+        return outstanding
+    
+    def _stats(self, url: str) -> Dict[str, int]:
+        """서버별 통계 (없으면 생성)"""
+        return self.stats.setdefault(url, {"selected": 0, "affinity": 0, "successes": 0, "failures": 0})
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """서버별 상태(캐시 기준)/브레이커/사용 중 요청 수/평균 지연/선택 통계"""
+        servers = {}
+        for url in self.servers:
+            capability = ollama_capability_registry.capabilities.get(url)
+            servers[url] = {
+                "available": capability["available"] if capability else None,
+                "models": capability["models"] if capability else [],
+                "circuit": circuit_breakers.get("ollama", url).state,
+                "outstanding": self.outstanding.get(url, 0),
+                "avg_latency_ms": round(self.latency_ms[url], 1) if url in self.latency_ms else None,
+                **self._stats(url)
+            }
+        return {"enabled": self.enabled, "strategy": settings.ollama_pool_strategy, "servers": servers}
+
+# 싱글톤 인스턴스
+ollama_server_pool = OllamaServerPool()
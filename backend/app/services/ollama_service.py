@@ -1,16 +1,62 @@
 import aiohttp
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ..core.config import settings
+from .transaction_summary import build_transaction_summary
+from .structured_output import structured_output_parser, ollama_output_format, StreamingJSONExtractor
+from .llm_backends import get_llm_backend
+from .request_deadline import request_deadline
 import json
+import re
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# JSON 완성 시 조기 종료 통계 (서비스 인스턴스는 요청마다 생성되므로 모듈 단위로 집계)
+early_stop_stats = {"json_streams": 0, "stopped": 0}
+
+def resolve_keep_alive(server_url: str = None) -> str:
+    """서버별 keep-alive 값 (OLLAMA_KEEP_ALIVE_OVERRIDES에 없으면 기본값)"""
+    url = (server_url or settings.default_ollama_server_url).rstrip("/")
+    for item in settings.ollama_keep_alive_overrides.split(","):
+        override_url, _, value = item.strip().rpartition("=")
+        if override_url and override_url.rstrip("/") == url:
+            return value.strip()
+    return settings.ollama_keep_alive
+
+_DURATION = re.compile(r"^(-?\d+(?:\.\d+)?)(ms|s|m|h)?$")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+def parse_keep_alive(value: str) -> Optional[float]:
+    """keep-alive 값을 초로 변환 (음수는 무기한 유지 = None)"""
+    match = _DURATION.match(str(value).strip())
+    if not match:
+        return 0.0
+    seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    return None if seconds < 0 else seconds
+
+def resolve_num_predict(analysis_type: str = None) -> Optional[int]:
+    """분석 타입별 최대 생성 토큰 수 (OLLAMA_NUM_PREDICT에 없으면 default 값, 둘 다 없으면 None)"""
+    limits = {}
+    for item in settings.ollama_num_predict.split(","):
+        name, _, value = item.strip().partition("=")
+        if name and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    limit = limits.get(analysis_type) if analysis_type else None
+    limit = limit if limit is not None else limits.get("default")
+    return limit or None
+
 class OllamaService:
     """Ollama 로컬 LLM 연동 서비스"""
     
+    # 분석 타입별 시스템 프롬프트
+    SYSTEM_PROMPTS = {
+        "pattern": """당신은 개인 금융 분석 전문가입니다. 사용자의 거래 데이터를 분석하여 소비 패턴을 파악하고 유용한 인사이트를 제공해주세요. 응답은 반드시 JSON 형식으로 제공해야 합니다.""",
+        "report": """당신은 개인 금융 리포트 작성 전문가입니다. 월간 소비 데이터를 바탕으로 상세하고 유용한 리포트를 작성해주세요. 응답은 반드시 JSON 형식으로 제공해야 합니다."""
+    }
+    
     def __init__(self, server_url: str = None):
         self.server_url = server_url or settings.default_ollama_server_url
         self.session = None
@@ -50,55 +96,141 @@ class OllamaService:
             logger.error(f"Ollama 모델 목록 조회 실패: {e}")
             return []
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def get_server_capabilities(self) -> Dict[str, Any]:
+        """서버 연결 가능 여부와 모델 목록을 한 번의 /api/tags 요청으로 조회"""
+        try:
+            if not self.session:
+                self.session = aiohttp.ClientSession()
+            
+            async def send() -> Dict[str, Any]:
+                async with self.session.get(f"{self.server_url}/api/tags", timeout=5) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"HTTP {response.status}")
+                    return await response.json()
+            
+            data = await get_llm_backend().call("ollama", "tags", {}, send)
+            return {
+                "available": True,
+                "models": [model["name"] for model in data.get("models", [])]
+            }
+        except Exception as e:
+            logger.warning(f"Ollama 서버 연결 실패: {e}")
+            return {"available": False, "models": []}
+    
+    async def preload_model(self, model: str) -> Dict[str, Any]:
+        """프롬프트 없는 generate 요청으로 모델을 메모리에 로드 (keep-alive 적용)"""
+        if not self.session:
+            raise RuntimeError("Service not initialized. Use async context manager.")
+        
+        request_data = {"model": model, "keep_alive": resolve_keep_alive(self.server_url)}
+        
+        async def send() -> Dict[str, Any]:
+            # 큰 모델은 로딩에 수십 초가 걸릴 수 있음
+            async with self.session.post(
+                f"{self.server_url}/api/generate",
+                json=request_data,
+                timeout=aiohttp.ClientTimeout(total=300)
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise RuntimeError(f"HTTP {response.status}: {error_text}")
+                return await response.json()
+        
+        try:
+            result = await get_llm_backend().call("ollama", "preload", request_data, send)
+            return {
+                "success": True,
+                "model": model,
+                "load_duration": result.get("load_duration", 0),
+                "total_duration": result.get("total_duration", 0)
+            }
+        except Exception as e:
+            logger.warning(f"Ollama 모델 로드 실패 ({model}): {e}")
+            return {"success": False, "error": str(e)}
+    
+    async def get_running_models(self) -> List[Dict[str, Any]]:
+        """현재 메모리에 로드된 모델 목록 (/api/ps)"""
+        if not self.session:
+            raise RuntimeError("Service not initialized. Use async context manager.")
+        
+        try:
+            async with self.session.get(f"{self.server_url}/api/ps", timeout=5) as response:
+                if response.status != 200:
+                    return []
+                data = await response.json()
+                return [
+                    {"name": model["name"], "expires_at": model.get("expires_at")}
+                    for model in data.get("models", [])
+                ]
+        except Exception as e:
+            logger.warning(f"Ollama 로드된 모델 조회 실패: {e}")
+            return []
+    
+    @retry(stop=stop_after_attempt(3) | request_deadline.retry_stop, wait=wait_exponential(multiplier=1, min=4, max=10))
     async def generate_response(
         self, 
         prompt: str, 
         model: str = "llama3", 
-        system_prompt: str = None
+        system_prompt: str = None,
+        output_format: Any = None,
+        analysis_type: str = None
     ) -> Dict[str, Any]:
-        """Ollama를 통한 텍스트 생성"""
+        """Ollama를 통한 텍스트 생성 (output_format: "json" 또는 JSON 스키마, analysis_type: 최대 생성 토큰 기준)"""
         if not self.session:
             raise RuntimeError("Service not initialized. Use async context manager.")
         
         try:
-            # 요청 데이터 구성
-            request_data = {
-                "model": model,
-                "prompt": prompt,
-                "stream": False
-            }
+            # 서버/모델별 관측 p95 기반 타임아웃 (요청 마감까지 남은 시간 이내, 언로드되었을 수 있으면 기본 타임아웃)
+            timeout = request_deadline.timeout(
+                "ollama", settings.ollama_request_timeout, model, self.server_url,
+                parse_keep_alive(resolve_keep_alive(self.server_url))
+            )
             
-            if system_prompt:
-                request_data["system"] = system_prompt
+            # 분석 응답(JSON)은 스트리밍으로 받아 최상위 객체가 완성되면 생성 중단
+            if settings.ollama_early_stop and analysis_type:
+                started_at = time.perf_counter()
+                result = await asyncio.wait_for(
+                    self._generate_until_json(prompt, model, system_prompt, output_format, analysis_type),
+                    timeout=timeout
+                )
+                request_deadline.record("ollama", time.perf_counter() - started_at, model, self.server_url)
+                return {"success": True, "model": model, **result}
             
-            async with self.session.post(
-                f"{self.server_url}/api/generate",
-                json=request_data,
-                timeout=60
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    return {
-                        "success": True,
-                        "response": result.get("response", ""),
-                        "model": model,
-                        "total_duration": result.get("total_duration", 0),
-                        "load_duration": result.get("load_duration", 0),
-                        "prompt_eval_count": result.get("prompt_eval_count", 0),
-                        "eval_count": result.get("eval_count", 0)
-                    }
-                else:
-                    error_text = await response.text()
-                    return {
-                        "success": False,
-                        "error": f"HTTP {response.status}: {error_text}"
-                    }
+            request_data = self._build_request(prompt, model, system_prompt, output_format, analysis_type, stream=False)
+            
+            async def send() -> Dict[str, Any]:
+                async with self.session.post(
+                    f"{self.server_url}/api/generate",
+                    json=request_data,
+                    timeout=timeout
+                ) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise RuntimeError(f"HTTP {response.status}: {error_text}")
+                    return await response.json()
+            
+            # 설정된 백엔드(실제/가짜/녹화 재생)를 통해 호출
+            started_at = time.perf_counter()
+            result = await asyncio.wait_for(
+                get_llm_backend().call("ollama", "generate", request_data, send), timeout=timeout
+            )
+            request_deadline.record("ollama", time.perf_counter() - started_at, model, self.server_url)
+            return {
+                "success": True,
+                "response": result.get("response", ""),
+                "model": model,
+                "total_duration": result.get("total_duration", 0),
+                "load_duration": result.get("load_duration", 0),
+                "prompt_eval_count": result.get("prompt_eval_count", 0),
+                "eval_count": result.get("eval_count", 0),
+                "eval_duration": result.get("eval_duration")
+            }
         
         except asyncio.TimeoutError:
             return {
                 "success": False,
-                "error": "요청 시간 초과"
+                "error": "요청 시간 초과",
+                "deadline_exceeded": request_deadline.expired()
             }
         except Exception as e:
             logger.error(f"Ollama 응답 생성 실패: {e}")
@@ -107,6 +239,167 @@ class OllamaService:
                 "error": str(e)
             }
     
+    async def _generate_until_json(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: Optional[str],
+        output_format: Any,
+        analysis_type: Optional[str]
+    ) -> Dict[str, Any]:
+        """스트리밍 생성 결과를 모아 비스트리밍 응답과 같은 형태로 반환 (JSON 객체 완성 시 조기 종료)"""
+        chunks = []
+        stats = {}
+        async for chunk in self.stream_response(
+            prompt, model, system_prompt, output_format, analysis_type, stop_at_json=True
+        ):
+            chunks.append(chunk.get("response", ""))
+            if chunk.get("done"):
+                stats = chunk
+        
+        return {
+            "response": "".join(chunks),
+            "total_duration": stats.get("total_duration", 0),
+            "load_duration": stats.get("load_duration"),
+            "prompt_eval_count": stats.get("prompt_eval_count"),
+            "eval_count": stats.get("eval_count"),
+            "eval_duration": stats.get("eval_duration"),
+            "early_stopped": stats.get("early_stopped", False)
+        }
+    
+    async def stream_response(
+        self, 
+        prompt: str, 
+        model: str = "llama3", 
+        system_prompt: str = None,
+        output_format: Any = None,
+        analysis_type: str = None,
+        stop_at_json: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Ollama 스트리밍 생성 (NDJSON 청크를 순서대로 반환)
+        
+        stop_at_json: 최상위 JSON 객체가 완성되면 연결을 끊어 서버의 남은 생성을 중단하고
+                      done 청크 반환 (서버 통계는 마지막 청크에만 오므로 load_duration/prompt_eval_count/eval_count/eval_duration은 None,
+                      받은 청크 수는 streamed_chunks)
+        """
+        if not self.session:
+            raise RuntimeError("Service not initialized. Use async context manager.")
+        
+        request_data = self._build_request(prompt, model, system_prompt, output_format, analysis_type, stream=True)
+        
+        # 전체 생성 시간 대신 청크 간 대기 시간만 제한 (요청 마감까지 남은 시간 이내)
+        timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=10, sock_read=request_deadline.bounded("ollama", settings.ollama_request_timeout)
+        )
+        
+        async def send() -> AsyncIterator[Dict[str, Any]]:
+            async with self.session.post(
+                f"{self.server_url}/api/generate",
+                json=request_data,
+                timeout=timeout
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise RuntimeError(f"HTTP {response.status}: {error_text}")
+                
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    
+                    yield chunk
+                    
+                    if chunk.get("done"):
+                        break
+        
+        extractor = StreamingJSONExtractor() if stop_at_json else None
+        if extractor:
+            early_stop_stats["json_streams"] += 1
+        started_at = time.perf_counter()
+        received = 0
+        stream = get_llm_backend().stream("ollama", request_data, send)
+        try:
+            async for chunk in stream:
+                request_deadline.check("ollama 스트리밍")
+                yield chunk
+                if chunk.get("done") or extractor is None:
+                    continue
+                
+                received += 1
+                if not extractor.feed(chunk.get("response", "")):
+                    continue
+                
+                # 완성된 객체가 그대로 파싱되지 않으면 끝까지 받아 기존 파서(복구 포함)에 맡김
+                value, repaired = extractor.result()
+                extractor = None
+                if value is not None and not repaired:
+                    early_stop_stats["stopped"] += 1
+                    logger.info(f"Ollama JSON 응답 완료, 생성 조기 종료 ({model}, {received}청크)")
+                    yield {
+                        "response": "",
+                        "done": True,
+                        "early_stopped": True,
+                        "load_duration": None,
+                        "prompt_eval_count": None,
+                        "eval_count": None,
+                        "eval_duration": None,
+                        "streamed_chunks": received,
+                        "total_duration": int((time.perf_counter() - started_at) * 1e9)
+                    }
+                    break
+        finally:
+            # 조기 종료/취소 시 응답 연결을 바로 닫아 서버가 생성을 멈추도록 함
+            await stream.aclose()
+    
+    def _build_request(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: Optional[str],
+        output_format: Any,
+        analysis_type: Optional[str],
+        stream: bool
+    ) -> Dict[str, Any]:
+        """generate 요청 데이터 (시스템 프롬프트, 출력 형식, keep-alive, 분석 타입별 최대 생성 토큰)"""
+        request_data = {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream
+        }
+        
+        if system_prompt:
+            request_data["system"] = system_prompt
+        
+        if output_format:
+            request_data["format"] = output_format
+        
+        # 서버별 keep-alive 동안 모델을 메모리에 유지
+        request_data["keep_alive"] = resolve_keep_alive(self.server_url)
+        
+        num_predict = resolve_num_predict(analysis_type)
+        if num_predict:
+            request_data["options"] = {"num_predict": num_predict}
+        
+        return request_data
+    
+    def build_prompt(
+        self, 
+        transactions: List[Dict[str, Any]], 
+        analysis_type: str
+    ) -> Optional[Tuple[str, str]]:
+        """분석 타입별 (프롬프트, 시스템 프롬프트) 생성. 지원하지 않는 타입이면 None"""
+        if analysis_type == "pattern":
+            transaction_summary = self._prepare_transaction_summary(transactions)
+            return self._create_analysis_prompt(transaction_summary), self.SYSTEM_PROMPTS["pattern"]
+        elif analysis_type == "report":
+            monthly_summary = self._prepare_monthly_summary(transactions)
+            return self._create_report_prompt(monthly_summary), self.SYSTEM_PROMPTS["report"]
+        return None
+    
     async def analyze_spending_patterns(
         self, 
         transactions: List[Dict[str, Any]], 
@@ -118,18 +411,19 @@ class OllamaService:
             transaction_summary = self._prepare_transaction_summary(transactions)
             
             # 분석 프롬프트 생성
-            system_prompt = """당신은 개인 금융 분석 전문가입니다. 사용자의 거래 데이터를 분석하여 소비 패턴을 파악하고 유용한 인사이트를 제공해주세요. 응답은 반드시 JSON 형식으로 제공해야 합니다."""
+            system_prompt = self.SYSTEM_PROMPTS["pattern"]
             
             prompt = self._create_analysis_prompt(transaction_summary)
             
             # Ollama API 호출
-            result = await self.generate_response(prompt, model, system_prompt)
+            result = await self.generate_response(prompt, model, system_prompt, ollama_output_format("pattern"), "pattern")
             
             if result["success"]:
                 # JSON 응답 파싱
-                analysis_result = self._parse_json_response(result["response"])
+                analysis_result = self._parse_json_response(result["response"], "pattern")
                 analysis_result["model_used"] = model
                 analysis_result["processing_time"] = result.get("total_duration", 0)
+                analysis_result["token_usage"] = self._token_usage(result)
                 return analysis_result
             else:
                 return {"error": result["error"]}
@@ -150,18 +444,19 @@ class OllamaService:
             monthly_summary = self._prepare_monthly_summary(transactions, previous_month_data)
             
             # 리포트 생성 프롬프트
-            system_prompt = """당신은 개인 금융 리포트 작성 전문가입니다. 월간 소비 데이터를 바탕으로 상세하고 유용한 리포트를 작성해주세요. 응답은 반드시 JSON 형식으로 제공해야 합니다."""
+            system_prompt = self.SYSTEM_PROMPTS["report"]
             
             prompt = self._create_report_prompt(monthly_summary)
             
             # Ollama API 호출
-            result = await self.generate_response(prompt, model, system_prompt)
+            result = await self.generate_response(prompt, model, system_prompt, ollama_output_format("report"), "report")
             
             if result["success"]:
                 # JSON 응답 파싱
-                report_result = self._parse_json_response(result["response"])
+                report_result = self._parse_json_response(result["response"], "report")
                 report_result["model_used"] = model
                 report_result["processing_time"] = result.get("total_duration", 0)
+                report_result["token_usage"] = self._token_usage(result)
                 return report_result
             else:
                 return {"error": result["error"]}
@@ -170,31 +465,21 @@ class OllamaService:
             logger.error(f"Ollama 월간 리포트 생성 실패: {e}")
             return {"error": str(e)}
     
-    def _prepare_transaction_summary(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """거래 데이터 요약 준비 (Gemini 서비스와 동일)"""
-        if not transactions:
-            return {"total_transactions": 0, "categories": {}, "total_amount": 0}
-        
-        categories = {}
-        total_amount = 0
-        
-        for transaction in transactions:
-            amount = float(transaction.get("amount", 0))
-            category = transaction.get("manual_category", "기타")
-            
-            if category not in categories:
-                categories[category] = {"count": 0, "amount": 0}
-            
-            categories[category]["count"] += 1
-            categories[category]["amount"] += amount
-            total_amount += amount
-        
+    def _token_usage(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Ollama 응답 메타데이터에서 토큰 수 / 생성 시간 / 모델 로딩 시간 추출 (조기 종료 등으로 알 수 없으면 None)"""
+        eval_duration = result.get("eval_duration")
         return {
-            "total_transactions": len(transactions),
-            "total_amount": total_amount,
-            "categories": categories
+            "prompt_tokens": result.get("prompt_eval_count"),
+            "completion_tokens": result.get("eval_count"),
+            # 토큰 생성에 걸린 시간 (대기열/모델 로드/프롬프트 처리 제외)
+            "generation_ms": round(eval_duration / 1_000_000) if eval_duration else None,
+            "load_duration": result.get("load_duration")
         }
     
+    def _prepare_transaction_summary(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """거래 데이터 요약 준비 (Gemini 서비스와 공통)"""
+        return build_transaction_summary(transactions)
+    
     def _prepare_monthly_summary(
         self, 
         transactions: List[Dict[str, Any]], 
@@ -288,20 +573,9 @@ JSON 형식만 응답해주세요.
         
         return prompt
     
-    def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
-        """JSON 응답 파싱"""
-        try:
-            # JSON 부분 추출
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response_text[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                return {"error": "JSON 형식을 찾을 수 없습니다", "raw_response": response_text}
-        except json.JSONDecodeError as e:
-            return {"error": f"JSON 파싱 실패: {str(e)}", "raw_response": response_text}
+    def _parse_json_response(self, response_text: str, analysis_type: str = "pattern") -> Dict[str, Any]:
+        """JSON 응답 파싱 (JSON 추출/복구 + 스키마 검증)"""
+        return structured_output_parser.parse(response_text, analysis_type, "ollama")
 
 # 팩토리 함수
 def create_ollama_service(server_url: str = None) -> OllamaService:
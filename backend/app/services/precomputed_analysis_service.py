@@ -0,0 +1,180 @@
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud import user as user_crud
+from ..models.user import User
+from ..models.precomputed_analysis import PrecomputedAnalysis
+from .ai_analysis_engine import ai_analysis_engine
+from .inference_queue import PRIORITY_SCHEDULED
+from .analysis_transactions import load_analysis_transactions
+import asyncio
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_TYPES = ("pattern", "report", "optimization")
+
+class PrecomputedAnalysisService:
+    """사용자별 최신 pattern/report/optimization 분석을 미리 계산해 저장 (거래 동기화 후, 결과가 없을 때 조회 시 백그라운드 갱신)"""
+    
+    def __init__(self):
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._dirty: set = set()
+        self.stats = {"refreshed": 0, "unchanged": 0, "failed": 0}
+    
+    def data_version(self, user: User, transactions_data: List[Dict[str, Any]]) -> str:
+        """분석 입력(거래 데이터 + 선호 모델)의 SHA-256. 같으면 다시 계산할 필요 없음"""
+        canonical = json.dumps(
+            {"model": user.preferred_ai_model, "transactions": transactions_data},
+            sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+        ).encode("utf-8")
+        return hashlib.sha256(canonical).hexdigest()
+    
+    def get(self, db: Session, user_id: Any, analysis_type: str) -> Optional[Dict[str, Any]]:
+        """저장된 최신 분석 조회 (user_id, analysis_type 유니크 인덱스 단건 조회)"""
+        row = db.execute(
+            select(PrecomputedAnalysis).where(
+                PrecomputedAnalysis.user_id == user_id,
+                PrecomputedAnalysis.analysis_type == analysis_type
+            )
+        ).scalar_one_or_none()
+        if row is None:
+            return None
+        
+        return {
+            "analysis_type": row.analysis_type,
+            "model_used": row.ai_model_used,
+            "analysis": row.result,
+            "data_version": row.data_version,
+            "transaction_count": row.transaction_count,
+            "days_back": row.days_back,
+            "computed_at": row.computed_at.isoformat(),
+            "age_seconds": int((datetime.now(timezone.utc) - row.computed_at).total_seconds()),
+            "refreshing": str(user_id) in self._pending
+        }
+    
+    def schedule_refresh(self, user_id: Any) -> None:
+        """백그라운드 갱신 예약 (대기/실행 중 요청은 하나로 합치고, 실행 중 들어온 요청은 끝난 뒤 한 번 더 실행)"""
+        key = str(user_id)
+        task = self._pending.get(key)
+        if task is not None and not task.done():
+            self._dirty.add(key)
+            return
+        
+        task = asyncio.ensure_future(self._refresh_later(key))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+    
+    async def _refresh_later(self, user_id: str) -> None:
+        """잠시 대기 후 갱신 (연속 동기화를 한 번으로 합침)"""
+        while True:
+            await asyncio.sleep(settings.precomputed_analysis_delay)
+            self._dirty.discard(user_id)
+            try:
+                await self.refresh_user(user_id)
+            except Exception as e:
+                logger.error(f"사전 계산 분석 갱신 실패 (사용자: {user_id}): {e}")
+            if user_id not in self._dirty:
+                return
+    
+    async def refresh_user(
+        self,
+        user_id: Any,
+        analysis_types: Iterable[str] = ANALYSIS_TYPES,
+        force: bool = False
+    ) -> Dict[str, str]:
+        """분석 타입별로 데이터가 바뀐 경우에만 다시 분석하여 저장. 타입별 처리 결과 반환"""
+        days_back = settings.precomputed_analysis_days_back
+        db = SessionLocal()
+        try:
+            task_user, transactions_data, versions = await asyncio.to_thread(
+                self._load_inputs, db, user_id, days_back
+            )
+            if task_user is None:
+                return {}
+            if not transactions_data:
+                return {analysis_type: "no_data" for analysis_type in analysis_types}
+            
+            data_version = self.data_version(task_user, transactions_data)
+            outcome = {}
+            for analysis_type in analysis_types:
+                if not force and versions.get(analysis_type) == data_version:
+                    self.stats["unchanged"] += 1
+                    outcome[analysis_type] = "unchanged"
+                    continue
+                
+                result = await ai_analysis_engine.analyze_with_preferred_ai(
+                    task_user, transactions_data, analysis_type, db, priority=PRIORITY_SCHEDULED
+                )
+                analysis = result.get("analysis") or {}
+                if "error" in analysis:
+                    # 실패 결과로 기존 분석을 덮어쓰지 않음
+                    self.stats["failed"] += 1
+                    outcome[analysis_type] = "failed"
+                    continue
+                
+                await asyncio.to_thread(self._store, db, {
+                    "user_id": task_user.id,
+                    "analysis_type": analysis_type,
+                    "ai_model_used": result["model_used"],
+                    "result": analysis,
+                    "data_version": data_version,
+                    "transaction_count": len(transactions_data),
+                    "days_back": days_back
+                })
+                self.stats["refreshed"] += 1
+                outcome[analysis_type] = "refreshed"
+            
+            logger.info(f"사전 계산 분석 갱신 (사용자: {user_id}): {outcome}")
+            return outcome
+        finally:
+            db.close()
+    
+    def _load_inputs(
+        self,
+        db: Session,
+        user_id: Any,
+        days_back: int
+    ) -> Tuple[Optional[User], List[Dict[str, Any]], Dict[str, str]]:
+        """사용자, 최근 거래 데이터, 저장된 분석 타입별 data_version 조회"""
+        task_user = user_crud.get(db, id=user_id)
+        if task_user is None:
+            return None, [], {}
+        
+        transactions_data = load_analysis_transactions(db, task_user.id, days_back)
+        
+        versions = dict(db.execute(
+            select(PrecomputedAnalysis.analysis_type, PrecomputedAnalysis.data_version)
+            .where(PrecomputedAnalysis.user_id == task_user.id)
+        ).all())
+        return task_user, transactions_data, versions
+    
+    def _store(self, db: Session, values: Dict[str, Any]) -> None:
+        """사용자/분석 타입별 1건으로 upsert"""
+        stmt = pg_insert(PrecomputedAnalysis).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PrecomputedAnalysis.user_id, PrecomputedAnalysis.analysis_type],
+            set_={
+                **{key: stmt.excluded[key] for key in values if key not in ("user_id", "analysis_type")},
+                "computed_at": datetime.now(timezone.utc)
+            }
+        )
+        try:
+            db.execute(stmt)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """갱신 통계"""
+        return {"pending": len(self._pending), **self.stats}
+
+# 싱글톤 인스턴스
+precomputed_analysis_service = PrecomputedAnalysisService()
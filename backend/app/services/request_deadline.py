@@ -0,0 +1,150 @@
+from typing import Dict, Any, Optional, Iterator, Deque
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from ..core.config import settings
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 현재 요청의 마감 시각 (time.monotonic 기준, None이면 마감 없음). 요청 안에서 만든 asyncio 태스크에도 전파됨
+_deadline: ContextVar[Optional[float]] = ContextVar("analysis_deadline", default=None)
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """요청 마감 시간 초과 (프로바이더 타임아웃과 같은 경로로 처리되도록 TimeoutError 상속)"""
+
+class RequestDeadline:
+    """요청 단위 마감 시간 전파와 프로바이더/모델(/서버)별 적응형 타임아웃 (관측 p95 기반)"""
+    
+    MIN_SAMPLES = 20  # 이 이상 관측된 모델만 적응형 타임아웃 적용
+    
+    def __init__(self):
+        self.latencies: Dict[str, Deque[float]] = {}  # "프로바이더:모델@서버" -> 최근 성공 호출 시간 (초)
+        self.last_success: Dict[str, float] = {}  # "프로바이더:모델@서버" -> 마지막 성공 시각 (time.monotonic)
+        self.stats = {"scoped": 0, "exceeded": 0}
+    
+    @contextmanager
+    def scope(self, seconds: Optional[float]) -> Iterator[None]:
+        """블록 안(과 여기서 시작한 태스크)에 마감 시간 적용. 바깥 마감이 더 이르면 그대로 유지"""
+        if not seconds or seconds <= 0:
+            yield
+            return
+        
+        deadline = time.monotonic() + seconds
+        current = _deadline.get()
+        token = _deadline.set(deadline if current is None else min(current, deadline))
+        self.stats["scoped"] += 1
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+    
+    @contextmanager
+    def detached(self) -> Iterator[None]:
+        """블록 안에서는 마감 시간 미적용 (응답 후에도 계속되는 백그라운드 작업)"""
+        token = _deadline.set(None)
+        try:
+            yield
+        finally:
+            _deadline.reset(token)
+    
+    def remaining(self) -> Optional[float]:
+        """남은 시간 (초, 마감이 없으면 None)"""
+        deadline = _deadline.get()
+        return None if deadline is None else deadline - time.monotonic()
+    
+    def expired(self) -> bool:
+        """마감 시간이 지났는지"""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+    
+    def check(self, stage: str) -> None:
+        """마감 시간이 지났으면 다음 단계를 시작하지 않고 DeadlineExceeded"""
+        if self.expired():
+            raise self.exceeded(stage)
+    
+    def exceeded(self, stage: str) -> DeadlineExceeded:
+        """마감 초과 예외 생성 (초과 횟수 집계)"""
+        self.stats["exceeded"] += 1
+        return DeadlineExceeded(f"요청 마감 시간 초과 ({stage})")
+    
+    def bounded(self, stage: str, default: float) -> float:
+        """기본 타임아웃과 남은 시간 중 짧은 쪽"""
+        self.check(stage)
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+    
+    def timeout(
+        self,
+        provider: str,
+        default: float,
+        model: Optional[str] = None,
+        server_url: Optional[str] = None,
+        warm_for: Optional[float] = None
+    ) -> float:
+        """프로바이더 호출 타임아웃 = min(적응형 타임아웃, 남은 시간)"""
+        return self.bounded(provider, self.adaptive_timeout(provider, default, model, server_url, warm_for))
+    
+    def adaptive_timeout(
+        self,
+        provider: str,
+        default: float,
+        model: Optional[str] = None,
+        server_url: Optional[str] = None,
+        warm_for: Optional[float] = None
+    ) -> float:
+        """같은 프로바이더/모델/서버의 관측 p95 x ADAPTIVE_TIMEOUT_MULTIPLIER (ADAPTIVE_TIMEOUT_MIN ~ 기본 타임아웃 범위)
+        
+        warm_for: 마지막 성공 후 이 시간(초)이 지났으면 모델 로드 시간이 더해질 수 있으므로 기본 타임아웃 (Ollama keep-alive)
+        """
+        key = self._key(provider, model, server_url)
+        last_success = self.last_success.get(key)
+        if warm_for is not None and (last_success is None or time.monotonic() - last_success > warm_for):
+            return default
+        
+        p95 = self._p95(key)
+        if p95 is None or settings.adaptive_timeout_multiplier <= 0:
+            return default
+        return min(default, max(settings.adaptive_timeout_min, p95 * settings.adaptive_timeout_multiplier))
+    
+    def record(self, provider: str, seconds: float, model: Optional[str] = None, server_url: Optional[str] = None) -> None:
+        """성공한 프로바이더 호출 시간 기록 (모델/서버별)"""
+        key = self._key(provider, model, server_url)
+        self.latencies.setdefault(key, deque(maxlen=200)).append(seconds)
+        self.last_success[key] = time.monotonic()
+    
+    def _key(self, provider: str, model: Optional[str], server_url: Optional[str]) -> str:
+        """지연 표본 키 (빠른/강한 모델, 서버마다 응답 시간이 달라 따로 관측)"""
+        key = f"{provider}:{model}" if model else provider
+        return f"{key}@{server_url.rstrip('/')}" if server_url else key
+    
+    def retry_stop(self, retry_state: Any) -> bool:
+        """tenacity stop 조건: 남은 시간이 다음 재시도 대기보다 짧으면 재시도 중단"""
+        remaining = self.remaining()
+        return remaining is not None and remaining <= (getattr(retry_state, "upcoming_sleep", 0) or 0)
+    
+    def _p95(self, key: str) -> Optional[float]:
+        """최근 성공 호출 시간의 p95 (표본이 부족하면 None)"""
+        samples = self.latencies.get(key)
+        if not samples or len(samples) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """마감 적용/초과 횟수와 프로바이더/모델(/서버)별 관측 p95"""
+        return {
+            **self.stats,
+            "providers": {
+                key: {
+                    "samples": len(samples),
+                    "p95_ms": round(self._p95(key) * 1000, 1) if self._p95(key) is not None else None
+                }
+                for key, samples in self.latencies.items()
+            }
+        }
+
+# 싱글톤 인스턴스
+request_deadline = RequestDeadline()
@@ -4,9 +4,11 @@ from apscheduler.triggers.interval import IntervalTrigger
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
+from ..core.config import settings
 from ..core.database import SessionLocal
 from ..crud import scheduled_task, user, transaction
 from ..services.ai_analysis_engine import ai_analysis_engine
+from ..services.inference_queue import PRIORITY_SCHEDULED
 from ..services.woori_bank_service import woori_bank_service
 import asyncio
 import logging
@@ -133,7 +135,7 @@ class SchedulerService:
         """AI 리포트 생성"""
         try:
             # 최근 30일 거래 내역 조회
-            user_transactions = transaction.get_by_user(db, user_id=task_user.id, limit=1000)
+            user_transactions = transaction.get_by_user(db, user_id=task_user.id, limit=settings.analysis_max_transactions)
             
             # 기간 필터링
             end_date = datetime.now()
@@ -161,7 +163,7 @@ class SchedulerService:
             
             # AI 분석 실행
             analysis_result = await ai_analysis_engine.analyze_with_preferred_ai(
-                task_user, transactions_data, "report", db
+                task_user, transactions_data, "report", db, priority=PRIORITY_SCHEDULED
             )
             
             logger.info(f"사용자 {task_user.username}의 AI 리포트 생성 완료")
@@ -176,7 +178,7 @@ class SchedulerService:
             now = datetime.now()
             start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
             
-            user_transactions = transaction.get_by_user(db, user_id=task_user.id, limit=1000)
+            user_transactions = transaction.get_by_user(db, user_id=task_user.id, limit=settings.analysis_max_transactions)
             
             # 이번 달 거래만 필터링
             monthly_transactions = [
@@ -202,7 +204,7 @@ class SchedulerService:
             
             # AI 분석 실행
             analysis_result = await ai_analysis_engine.analyze_with_preferred_ai(
-                task_user, transactions_data, "pattern", db
+                task_user, transactions_data, "pattern", db, priority=PRIORITY_SCHEDULED
             )
             
             logger.info(f"사용자 {task_user.username}의 월간 분석 완료")
@@ -0,0 +1,358 @@
+from typing import Dict, Any, List, Optional, Tuple, Union
+from ..core.config import settings
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 분석 타입별 응답 스키마 (Gemini/Ollama 프롬프트 형식의 합집합, required는 공통 필수 키)
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+ANALYSIS_SCHEMAS = {
+    "pattern": {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string"},
+            "category_analysis": {
+                "type": "object",
+                "additionalProperties": {
+                    "type": "object",
+                    "properties": {
+                        "percentage": {"type": "number"},
+                        "trend": {"type": "string"},
+                        "insight": {"type": "string"}
+                    },
+                    "required": ["percentage", "insight"]
+                }
+            },
+            "spending_habits": _STRING_LIST,
+            "recommendations": _STRING_LIST,
+            "risk_factors": _STRING_LIST
+        },
+        "required": ["summary", "category_analysis", "spending_habits", "recommendations"]
+    },
+    "report": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "executive_summary": {"type": "string"},
+            "key_metrics": {
+                "type": "object",
+                "properties": {
+                    "total_spending": {"type": "number"},
+                    "transaction_count": {"type": "number"},
+                    "average_per_transaction": {"type": "number"},
+                    "most_spent_category": {"type": "string"},
+                    "most_frequent_category": {"type": "string"}
+                }
+            },
+            "category_breakdown": {
+                "type": "object",
+                "additionalProperties": {
+                    "type": "object",
+                    "properties": {
+                        "amount": {"type": "number"},
+                        "percentage": {"type": "number"},
+                        "transaction_count": {"type": "number"},
+                        "analysis": {"type": "string"}
+                    }
+                }
+            },
+            "trends_and_insights": _STRING_LIST,
+            "insights": _STRING_LIST,
+            "next_month_goals": _STRING_LIST,
+            "action_items": _STRING_LIST
+        },
+        "required": ["title", "executive_summary", "key_metrics", "category_breakdown"]
+    },
+    "optimization": {
+        "type": "object",
+        "properties": {
+            "optimization_score": {"type": "number"},
+            "priority_actions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "category": {"type": "string"},
+                        "action": {"type": "string"},
+                        "expected_savings": {"type": "number"},
+                        "difficulty": {"type": "string"}
+                    },
+                    "required": ["category", "action"]
+                }
+            },
+            "budget_recommendations": {"type": "object", "additionalProperties": {"type": "number"}},
+            "saving_strategies": _STRING_LIST,
+            "long_term_goals": _STRING_LIST
+        },
+        "required": ["optimization_score", "priority_actions", "budget_recommendations"]
+    }
+}
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "boolean": bool
+}
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_PARTIAL_LITERAL = re.compile(r"(?<=[\s:\[,])(?:t(?:r(?:ue?)?)?|f(?:a(?:l(?:se?)?)?)?|n(?:u(?:ll?)?)?)$")
+_PARTIAL_NUMBER = re.compile(r"(?:(?<=\d)[.eE+-]+|(?<=[\s:\[,])-)$")
+_CLOSERS = {"{": "}", "[": "]"}
+
+def ollama_output_format(analysis_type: str) -> Optional[Union[str, Dict[str, Any]]]:
+    """Ollama generate 요청의 format 값 (schema: JSON 스키마 제약, json: JSON 모드, none: 제약 없음)"""
+    mode = settings.ollama_output_format
+    if mode == "schema" and analysis_type in ANALYSIS_SCHEMAS:
+        return ANALYSIS_SCHEMAS[analysis_type]
+    if mode in ("schema", "json"):
+        return "json"
+    return None
+
+class StreamingJSONExtractor:
+    """청크 단위로 텍스트를 받아 첫 번째 최상위 JSON 객체의 시작/끝을 추적 (문자열/이스케이프 인식)"""
+    
+    def __init__(self):
+        self.text = ""
+        self.start = -1
+        self.end = -1
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+    
+    @property
+    def complete(self) -> bool:
+        """최상위 객체가 닫혔는지"""
+        return self.end != -1
+    
+    def feed(self, chunk: str) -> bool:
+        """텍스트 추가 후 최상위 객체 완료 여부 반환 (완료 이후 입력은 무시)"""
+        if self.complete:
+            return True
+        self.text += chunk
+        
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self.start == -1:
+                if char == "{":
+                    self.start = i
+                    self._depth = 1
+                continue
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = i + 1
+                    self._pos = i + 1
+                    return True
+        
+        self._pos = len(text)
+        return False
+    
+    def result(self) -> Tuple[Optional[Any], bool]:
+        """(파싱 결과, 복구 여부). 객체가 없거나 복구 불가능하면 (None, False)"""
+        if self.start == -1:
+            return None, False
+        
+        fragment = self.text[self.start:self.end] if self.complete else self.text[self.start:]
+        if self.complete:
+            try:
+                return json.loads(fragment), False
+            except json.JSONDecodeError:
+                pass
+        
+        repaired = repair_json(fragment)
+        if repaired is None:
+            return None, False
+        return repaired, True
+
+def repair_json(fragment: str) -> Optional[Any]:
+    """흔한 LLM JSON 오류 복구 (문자열 내 개행, 후행 쉼표, 잘린 문자열/값/괄호)"""
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    # 객체 안에서 마지막 '{' 또는 ',' 직후 위치 (잘린 키 제거용)와 현재 위치가 키/값 중 무엇인지
+    member_start: List[int] = []
+    expecting_value: List[bool] = []
+    
+    for char in fragment:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            elif char == "\n":
+                char = "\\n"
+            elif char == "\r":
+                continue
+            elif char == "\t":
+                char = "\\t"
+            out.append(char)
+            continue
+        
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            member_start.append(len(out) + 1)
+            expecting_value.append(char == "[")
+        elif char in "}]":
+            if not stack:
+                break
+            # 후행 쉼표 제거
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            # 괄호 짝이 맞지 않으면 열린 괄호 기준으로 닫음
+            out.append(_CLOSERS[stack.pop()])
+            member_start.pop()
+            expecting_value.pop()
+            if not stack:
+                break
+            continue
+        elif char == ":" and stack and stack[-1] == "{":
+            expecting_value[-1] = True
+        elif char == "," and stack:
+            if stack[-1] == "{":
+                expecting_value[-1] = False
+            member_start[-1] = len(out) + 1
+        out.append(char)
+    
+    if stack:
+        if in_string:
+            if escape:
+                out.pop()
+            out.append('"')
+        
+        text = "".join(out).rstrip()
+        if stack[-1] == "{" and not expecting_value[-1]:
+            # 값 없이 잘린 키 제거
+            text = text[:member_start[-1]].rstrip()
+        else:
+            # 잘린 리터럴/숫자 정리
+            literal = _PARTIAL_LITERAL.search(text)
+            if literal and literal.group() not in ("true", "false", "null"):
+                text = text[:literal.start()] + "null"
+            text = _PARTIAL_NUMBER.sub("", text).rstrip()
+            if text.endswith(":"):
+                text += " null"
+        
+        text = text.rstrip()
+        if text.endswith(","):
+            text = text[:-1]
+        text += "".join(_CLOSERS[opener] for opener in reversed(stack))
+    else:
+        text = "".join(out)
+    
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+def extract_json(text: str) -> Tuple[Optional[Any], bool]:
+    """응답 텍스트에서 JSON 추출. (결과, 복구 여부)"""
+    stripped = _CODE_FENCE.sub("", text.strip())
+    if stripped.startswith("{"):
+        try:
+            return json.loads(stripped), False
+        except json.JSONDecodeError:
+            pass
+    
+    extractor = StreamingJSONExtractor()
+    extractor.feed(stripped)
+    return extractor.result()
+
+def validate_schema(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """JSON 스키마 부분 집합(type/properties/required/items/additionalProperties) 검증. 오류 목록 반환"""
+    expected = schema.get("type")
+    if expected:
+        python_type = _JSON_TYPES[expected]
+        if not isinstance(value, python_type) or (expected == "number" and isinstance(value, bool)):
+            return [f"{path}: {expected} 타입이 아닙니다"]
+    
+    errors = []
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: 필수 키가 없습니다")
+        for key, item in value.items():
+            item_schema = properties.get(key, schema.get("additionalProperties"))
+            if isinstance(item_schema, dict):
+                errors.extend(validate_schema(item, item_schema, f"{path}.{key}"))
+    elif isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate_schema(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+class StructuredOutputParser:
+    """LLM 응답 JSON 추출/복구 및 스키마 검증 (프로바이더별 파싱 실패율/복구율 집계)"""
+    
+    def __init__(self):
+        self.stats: Dict[str, Dict[str, int]] = {}
+    
+    def parse(self, response_text: str, analysis_type: str, provider: str) -> Dict[str, Any]:
+        """응답 파싱. 필수 키가 없으면 오류, 그 외 스키마 불일치는 schema_errors로 첨부"""
+        stats = self.stats.setdefault(provider, {"total": 0, "repaired": 0, "failed": 0, "schema_invalid": 0})
+        stats["total"] += 1
+        
+        result, repaired = extract_json(response_text or "")
+        if repaired:
+            stats["repaired"] += 1
+        
+        if not isinstance(result, dict):
+            stats["failed"] += 1
+            message = "JSON 파싱 실패" if "{" in (response_text or "") else "JSON 형식을 찾을 수 없습니다"
+            logger.warning(f"{provider} {analysis_type} 응답 {message}")
+            return {"error": message, "raw_response": response_text}
+        
+        schema = ANALYSIS_SCHEMAS.get(analysis_type)
+        if schema:
+            errors = validate_schema(result, schema)
+            if errors:
+                stats["schema_invalid"] += 1
+                missing = [key for key in schema["required"] if key not in result]
+                if missing:
+                    return {
+                        "error": f"응답에 필수 항목이 없습니다: {', '.join(missing)}",
+                        "schema_errors": errors,
+                        "raw_response": response_text
+                    }
+                result["schema_errors"] = errors
+        
+        return result
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """프로바이더별 파싱 통계 (복구율/실패율 포함)"""
+        return {
+            provider: {
+                **stats,
+                "repair_rate": round(stats["repaired"] / stats["total"], 3) if stats["total"] else 0.0,
+                "failure_rate": round(stats["failed"] / stats["total"], 3) if stats["total"] else 0.0
+            }
+            for provider, stats in self.stats.items()
+        }
+
+# 싱글톤 인스턴스
+structured_output_parser = StructuredOutputParser()
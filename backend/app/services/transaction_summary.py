@@ -0,0 +1,150 @@
+from typing import Dict, Any, List, Iterable, Sequence, Tuple
+from datetime import date
+import numpy as np
+
+DEFAULT_CATEGORY = "기타"
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_NAT_DAY = np.iinfo(np.int64).min  # datetime64의 NaT 표현
+
+def _to_epoch_day(value: Any) -> int:
+    """거래 일시를 1970-01-01 기준 일수로 변환 (없으면 NaT)"""
+    if not value:
+        return _NAT_DAY
+    if isinstance(value, date):
+        # datetime도 date의 하위 클래스 (타임존이 있으면 해당 타임존의 날짜 기준)
+        return value.toordinal() - _EPOCH_ORDINAL
+    return date.fromisoformat(str(value)[:10]).toordinal() - _EPOCH_ORDINAL
+
+def _encode(values: List[Any], default: str) -> Tuple[np.ndarray, List[str]]:
+    """문자열 컬럼을 정수 코드 배열과 고유값 목록으로 인코딩"""
+    index: Dict[str, int] = {}
+    codes = [index.setdefault(value or default, len(index)) for value in values]
+    return np.asarray(codes, dtype=np.int64), list(index)
+
+class TransactionColumns:
+    """거래 데이터의 컬럼형 표현 (카테고리/가맹점은 정수 코드로 인코딩)"""
+    
+    def __init__(
+        self,
+        amounts: np.ndarray,
+        category_codes: np.ndarray,
+        categories: List[str],
+        merchant_codes: np.ndarray,
+        merchants: List[str],
+        days: np.ndarray
+    ):
+        self.amounts = amounts
+        self.category_codes = category_codes
+        self.categories = categories
+        self.merchant_codes = merchant_codes
+        self.merchants = merchants
+        self.days = days
+    
+    def __len__(self) -> int:
+        return len(self.amounts)
+    
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "TransactionColumns":
+        """(금액, 거래일시, 가맹점명, 카테고리) 튜플 목록에서 생성 (DB 컬럼 조회 결과용)"""
+        rows = rows if isinstance(rows, list) else list(rows)
+        
+        # 컬럼 단위로 분리한 뒤 카테고리/가맹점은 정수 코드화
+        amounts = np.fromiter((row[0] or 0 for row in rows), dtype=np.float64, count=len(rows))
+        days = np.fromiter((_to_epoch_day(row[1]) for row in rows), dtype=np.int64, count=len(rows))
+        merchant_codes, merchants = _encode([row[2] for row in rows], "")
+        category_codes, categories = _encode([row[3] for row in rows], DEFAULT_CATEGORY)
+        
+        return cls(
+            amounts=amounts,
+            category_codes=category_codes,
+            categories=categories,
+            merchant_codes=merchant_codes,
+            merchants=merchants,
+            days=days.view("datetime64[D]")
+        )
+    
+    @classmethod
+    def from_records(cls, transactions: List[Dict[str, Any]]) -> "TransactionColumns":
+        """분석용 거래 dict 목록에서 생성"""
+        return cls.from_rows([
+            (
+                t.get("amount", 0),
+                t.get("transaction_date"),
+                t.get("original_merchant_name", ""),
+                t.get("manual_category")
+            )
+            for t in transactions
+        ])
+
+def summarize_transactions(columns: TransactionColumns, top_merchants: int = 5) -> Dict[str, Any]:
+    """카테고리별 합계/건수, 기간, 일별 추이, 상위 가맹점을 벡터 연산으로 계산"""
+    if len(columns) == 0:
+        return {
+            "total_transactions": 0,
+            "total_amount": 0,
+            "categories": {},
+            "date_range": {},
+            "daily_series": [],
+            "top_merchants": []
+        }
+    
+    amounts = columns.amounts
+    
+    # 카테고리별 합계/건수
+    category_amounts = np.bincount(columns.category_codes, weights=amounts, minlength=len(columns.categories))
+    category_counts = np.bincount(columns.category_codes, minlength=len(columns.categories))
+    categories = {
+        name: {"count": int(category_counts[i]), "amount": float(category_amounts[i])}
+        for i, name in enumerate(columns.categories)
+    }
+    
+    # 기간 및 일별 추이 (날짜 없는 거래 제외)
+    valid = ~np.isnat(columns.days)
+    date_range = {}
+    daily_series = []
+    if valid.any():
+        days = columns.days[valid]
+        start, end = days.min(), days.max()
+        offsets = (days - start).astype(np.int64)
+        daily_amounts = np.bincount(offsets, weights=amounts[valid])
+        daily_counts = np.bincount(offsets)
+        active = np.flatnonzero(daily_counts)
+        active_days = start + active.astype("timedelta64[D]")
+        
+        date_range = {"start": str(start), "end": str(end)}
+        daily_series = [
+            {"date": str(day), "amount": float(amount), "count": int(count)}
+            for day, amount, count in zip(active_days, daily_amounts[active], daily_counts[active])
+        ]
+    
+    # 상위 가맹점 (금액 기준, 가맹점명이 없는 거래는 제외하여 프롬프트에 빈 이름이 들어가지 않도록)
+    merchant_amounts = np.bincount(columns.merchant_codes, weights=amounts, minlength=len(columns.merchants))
+    merchant_counts = np.bincount(columns.merchant_codes, minlength=len(columns.merchants))
+    named = np.flatnonzero([bool(name.strip()) for name in columns.merchants])
+    k = min(top_merchants, len(named))
+    top_merchant_list = []
+    if k > 0:
+        top = named[np.argpartition(-merchant_amounts[named], k - 1)[:k]]
+        top = top[np.argsort(-merchant_amounts[top], kind="stable")]
+        top_merchant_list = [
+            {
+                "merchant": columns.merchants[i],
+                "amount": float(merchant_amounts[i]),
+                "count": int(merchant_counts[i])
+            }
+            for i in top
+        ]
+    
+    return {
+        "total_transactions": len(columns),
+        "total_amount": float(amounts.sum()),
+        "categories": categories,
+        "date_range": date_range,
+        "daily_series": daily_series,
+        "top_merchants": top_merchant_list
+    }
+
+def build_transaction_summary(transactions: List[Dict[str, Any]], top_merchants: int = 5) -> Dict[str, Any]:
+    """거래 dict 목록 요약 (Gemini/Ollama 공통)"""
+    return summarize_transactions(TransactionColumns.from_records(transactions), top_merchants)
@@ -0,0 +1,69 @@
+import asyncio
+from app.services import analysis_log_writer as analysis_log_writer_module
+from app.services.analysis_log_writer import AnalysisLogWriter
+
+def _writer(monkeypatch, fail_times: int = 0):
+    """_write_batch를 기록용 함수로 바꾼 기록기 (처음 fail_times번은 실패)"""
+    writer = AnalysisLogWriter(batch_size=10, flush_interval=60, max_buffer_size=100)
+    writer.batches = []
+    writer.attempts = 0
+    
+    def write_batch(records):
+        writer.attempts += 1
+        if writer.attempts <= fail_times:
+            # 기록 중에 새 로그가 들어온 상황
+            writer.enqueue(analysis_type=f"during-{writer.attempts}")
+            raise RuntimeError("connection lost")
+        writer.batches.append([record["analysis_type"] for record in records])
+    
+    monkeypatch.setattr(writer, "_write_batch", write_batch)
+    monkeypatch.setattr(analysis_log_writer_module.analysis_payload_store, "log_table_partitioned", True)
+    return writer
+
+def test_failed_flush_requeues_batch_ahead_of_newer_logs(monkeypatch):
+    writer = _writer(monkeypatch, fail_times=1)
+    writer.enqueue(analysis_type="old-1")
+    writer.enqueue(analysis_type="old-2")
+    
+    assert asyncio.run(writer.flush()) == 0
+    # 실패한 배치는 기록 중 들어온 로그보다 앞에 다시 들어감
+    assert [record["analysis_type"] for record in writer.buffer] == ["old-1", "old-2", "during-1"]
+    assert writer.total_written == 0
+    
+    assert asyncio.run(writer.flush()) == 3
+    assert writer.batches == [["old-1", "old-2", "during-1"]]
+    assert writer.buffer == []
+    assert writer.get_metrics() == {"buffered": 0, "total_written": 3, "total_dropped": 0}
+
+def test_enqueue_fills_optional_columns_for_batch_insert(monkeypatch):
+    writer = _writer(monkeypatch)
+    writer.enqueue(analysis_type="a", latency_ms=120, cache_hit=True)
+    writer.enqueue(analysis_type="b", error_message="실패")
+    
+    # 배치 INSERT는 모든 행의 컬럼이 같아야 함
+    assert set(writer.buffer[0]) == set(writer.buffer[1])
+    assert writer.buffer[1]["latency_ms"] is None
+    assert writer.buffer[1]["cache_hit"] is False
+
+def test_flush_holds_logs_until_table_is_partitioned(monkeypatch):
+    writer = _writer(monkeypatch)
+    monkeypatch.setattr(analysis_log_writer_module.analysis_payload_store, "log_table_partitioned", False)
+    writer.enqueue(analysis_type="held")
+    
+    # 변환 전 테이블에는 기록하지 않고 버퍼에 보관
+    assert asyncio.run(writer.flush()) == 0
+    assert writer.attempts == 0
+    assert len(writer.buffer) == 1
+    
+    monkeypatch.setattr(analysis_log_writer_module.analysis_payload_store, "log_table_partitioned", True)
+    assert asyncio.run(writer.flush()) == 1
+    assert writer.batches == [["held"]]
+
+def test_buffer_limit_drops_oldest_logs(monkeypatch):
+    writer = _writer(monkeypatch)
+    writer.max_buffer_size = 2
+    for i in range(4):
+        writer.enqueue(analysis_type=f"log-{i}")
+    
+    assert [record["analysis_type"] for record in writer.buffer] == ["log-2", "log-3"]
+    assert writer.total_dropped == 2
@@ -0,0 +1,58 @@
+from app.services import chunked_analysis as chunked_analysis_module
+from app.services.chunked_analysis import ChunkedAnalysisService, estimate_tokens, RESPONSE_RESERVE_TOKENS
+
+TRANSACTIONS = [
+    {"amount": 30000, "transaction_date": "2024-04-03", "original_merchant_name": "마트", "manual_category": "식비"},
+    {"amount": 5000, "transaction_date": "2024-05-01", "original_merchant_name": "카페", "manual_category": "식비"},
+    {"amount": 1500, "transaction_date": "2024-05-02", "original_merchant_name": "지하철", "manual_category": "교통"},
+    {"amount": 2000, "transaction_date": None, "original_merchant_name": "편의점"}
+]
+
+def _service(monkeypatch, prompt_tokens: int, budget: int = 1000, partition: str = "month") -> ChunkedAnalysisService:
+    """단일 프롬프트가 prompt_tokens 토큰(한글 1자 = 1토큰)인 청크 분석 서비스"""
+    for name, value in (
+        ("chunked_analysis_token_budget", budget),
+        ("chunked_analysis_partition", partition),
+        ("ollama_context_tokens", 2048),
+        ("gemini_context_tokens", 30720)
+    ):
+        monkeypatch.setattr(chunked_analysis_module.settings, name, value, raising=False)
+    service = ChunkedAnalysisService()
+    monkeypatch.setattr(service, "_single_prompt", lambda provider, transactions, analysis_type: ("가" * (prompt_tokens - 1), None))
+    return service
+
+def test_estimate_tokens_counts_korean_digits_and_ascii():
+    assert estimate_tokens("가나다") == 4
+    assert estimate_tokens("123456") == 3
+    assert estimate_tokens("abcdefgh") == 3
+
+def test_partition_by_month_and_category(monkeypatch):
+    service = _service(monkeypatch, prompt_tokens=10)
+    assert [(label, len(chunk)) for label, chunk in service.partition(TRANSACTIONS)] == [
+        ("2024-04", 1), ("2024-05", 2), ("날짜 없음", 1)
+    ]
+    assert [label for label, _ in service.partition(TRANSACTIONS, mode="category")] == ["교통", "기타", "식비"]
+
+def test_token_limit_uses_smaller_of_budget_and_context(monkeypatch):
+    service = _service(monkeypatch, prompt_tokens=10, budget=6000)
+    assert service.token_limit("gemini") == 6000
+    assert service.token_limit("ollama") == 2048 - RESPONSE_RESERVE_TOKENS
+
+def test_plan_chunks_only_prompts_over_limit(monkeypatch):
+    assert _service(monkeypatch, prompt_tokens=1000).plan(TRANSACTIONS, "pattern") is None
+    
+    chunks = _service(monkeypatch, prompt_tokens=1001).plan(TRANSACTIONS, "pattern")
+    assert [chunk["label"] for chunk in chunks] == ["2024-04", "2024-05", "날짜 없음"]
+    assert chunks[1]["facts"] == "\n".join([
+        "[2024-05] 총 6,500원 / 2건",
+        "- 식비: 5,000원 (1건)",
+        "- 교통: 1,500원 (1건)",
+        "- 주요 가맹점: 카페 5,000원, 지하철 1,500원"
+    ])
+
+def test_plan_skips_single_partition_disabled_budget_and_other_types(monkeypatch):
+    service = _service(monkeypatch, prompt_tokens=5000)
+    assert service.plan(TRANSACTIONS[1:3], "pattern") is None
+    assert service.plan(TRANSACTIONS, "chat") is None
+    
+    assert _service(monkeypatch, prompt_tokens=5000, budget=0).plan(TRANSACTIONS, "pattern") is None
@@ -0,0 +1,90 @@
+from typing import Tuple
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CircuitBreaker, STATE_OPEN, STATE_HALF_OPEN, STATE_CLOSED
+
+class FakeClock:
+    """time.monotonic 대체 (테스트에서 시간 이동)"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+def _open_breaker(monkeypatch, **kwargs) -> Tuple[CircuitBreaker, FakeClock]:
+    """실패 2회로 open된 브레이커와 가짜 시계"""
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    breaker = CircuitBreaker(
+        "test", failure_rate_threshold=0.5, minimum_calls=2, window_size=10, open_seconds=30, probe_timeout=60, **kwargs
+    )
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    return breaker, clock
+
+def test_probe_without_result_does_not_wedge_half_open(monkeypatch):
+    breaker, clock = _open_breaker(monkeypatch)
+    clock.now += 31
+    
+    # 시험 요청이 결과를 보고하지 않음 (취소/요청 마감 초과)
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejecting()
+    
+    # PROBE_TIMEOUT이 지나면 새 시험 요청 허용
+    clock.now += 61
+    assert not breaker.rejecting()
+    assert breaker.allow_request()
+    assert breaker.get_state()["probe_timeouts"] == 1
+    
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+
+def test_release_returns_probe_slot(monkeypatch):
+    breaker, clock = _open_breaker(monkeypatch)
+    clock.now += 31
+    
+    probe = breaker.allow_request()
+    assert probe
+    breaker.release(probe)
+    assert not breaker.rejecting()
+    assert breaker.allow_request()
+    
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+
+def test_release_without_probe_token_keeps_probe_slot(monkeypatch):
+    breaker = CircuitBreaker("test", failure_rate_threshold=0.5, minimum_calls=2, open_seconds=30, probe_timeout=60)
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    
+    # open 전에 허용된 요청 (시험 요청이 아님)
+    earlier = breaker.allow_request()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 31
+    probe = breaker.allow_request()
+    assert probe
+    
+    # 시험 요청이 아닌 요청의 취소/마감 초과는 진행 중인 시험 슬롯을 반환하지 않음
+    breaker.release(earlier)
+    breaker.release(None)
+    assert breaker.half_open_calls == 1
+    assert not breaker.allow_request()
+    
+    # 같은 토큰을 두 번 반환해도 다음 시험 요청 슬롯은 유지
+    breaker.release(probe)
+    second = breaker.allow_request()
+    assert second
+    breaker.release(probe)
+    assert breaker.half_open_calls == 1
+
+def test_release_is_noop_when_closed():
+    breaker = CircuitBreaker("test", minimum_calls=2, open_seconds=30, probe_timeout=60)
+    token = breaker.allow_request()
+    assert token
+    breaker.release(token)
+    assert breaker.state == STATE_CLOSED
+    assert breaker.half_open_calls == 0
@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+from app.services import ai_analysis_engine as ai_analysis_engine_module
+from app.services.ai_analysis_engine import AIAnalysisEngine
+
+USER = SimpleNamespace(id="user-1")
+
+def _engine(monkeypatch, delays: dict, errors: tuple = (), hedge_delay: float = 0.05, loser_budget: float = 0.05):
+    """프로바이더별 지연(초) 후 결과를 내는 가짜 Gemini/Ollama 분석을 쓰는 엔진"""
+    monkeypatch.setattr(ai_analysis_engine_module.settings, "hybrid_hedge_delay", hedge_delay, raising=False)
+    monkeypatch.setattr(ai_analysis_engine_module.settings, "hybrid_loser_budget", loser_budget, raising=False)
+    engine = AIAnalysisEngine()
+    engine.started, engine.cancelled = [], []
+    
+    async def provider(name: str):
+        engine.started.append(name)
+        try:
+            await asyncio.sleep(delays[name])
+        except asyncio.CancelledError:
+            engine.cancelled.append(name)
+            raise
+        if name in errors:
+            return {"error": f"{name} 실패"}
+        return {"summary": f"{name} 분석"}
+    
+    async def analyze_with_gemini(transactions_data, analysis_type, user_id, priority):
+        return await provider("gemini")
+    
+    async def analyze_with_ollama(user, transactions_data, analysis_type, priority):
+        return await provider("ollama")
+    
+    monkeypatch.setattr(engine, "_analyze_with_gemini", analyze_with_gemini)
+    monkeypatch.setattr(engine, "_analyze_with_ollama", analyze_with_ollama)
+    return engine
+
+async def _hedge(engine: AIAnalysisEngine):
+    """hybrid_fast 분석 후 느린 모델 처리(백그라운드)까지 대기"""
+    result = await engine._analyze_with_hedged_hybrid(USER, [], "pattern")
+    await asyncio.gather(*engine._background_tasks)
+    return result
+
+def test_fast_primary_does_not_start_secondary(monkeypatch):
+    engine = _engine(monkeypatch, {"gemini": 0, "ollama": 0})
+    result = asyncio.run(_hedge(engine))
+    
+    assert result["winner"] == "gemini"
+    assert result["secondary_started"] is False
+    assert engine.started == ["gemini"]
+    assert engine.hedge_stats["wins"] == {"gemini": 1}
+
+def test_slow_loser_is_cancelled_after_budget(monkeypatch):
+    engine = _engine(monkeypatch, {"gemini": 5, "ollama": 0})
+    result = asyncio.run(asyncio.wait_for(_hedge(engine), timeout=2))
+    
+    # 헤징 지연 후 시작한 Ollama가 먼저 도착하고, 예산을 넘긴 Gemini는 취소
+    assert result["winner"] == "ollama"
+    assert result["secondary_started"] is True
+    assert result["recommended_result"] == {"source": "ollama", "result": {"summary": "ollama 분석"}}
+    assert engine.cancelled == ["gemini"]
+    assert engine._background_tasks == set()
+    # 취소된 모델은 격차를 측정할 수 없음
+    assert engine.hedge_stats["total"] == 1
+    assert engine.hedge_stats["recent_margins_ms"] == []
+
+def test_loser_within_budget_records_margin(monkeypatch):
+    engine = _engine(monkeypatch, {"gemini": 0.1, "ollama": 0}, hedge_delay=0.05, loser_budget=1)
+    result = asyncio.run(asyncio.wait_for(_hedge(engine), timeout=2))
+    
+    assert result["winner"] == "ollama"
+    assert engine.cancelled == []
+    assert len(engine.hedge_stats["recent_margins_ms"]) == 1
+    assert engine.hedge_stats["recent_margins_ms"][0] > 0
+
+def test_primary_failure_starts_secondary_without_waiting(monkeypatch):
+    engine = _engine(monkeypatch, {"gemini": 0, "ollama": 0}, errors=("gemini",), hedge_delay=10)
+    result = asyncio.run(asyncio.wait_for(_hedge(engine), timeout=1))
+    
+    assert result["winner"] == "ollama"
+    assert engine.started == ["gemini", "ollama"]
+
+def test_all_providers_failing_returns_error(monkeypatch):
+    engine = _engine(monkeypatch, {"gemini": 0, "ollama": 0}, errors=("gemini", "ollama"))
+    result = asyncio.run(asyncio.wait_for(_hedge(engine), timeout=1))
+    
+    assert result["error"] == "모든 AI 모델 분석 실패"
+    assert result["attempts"] == {"gemini": {"error": "gemini 실패"}, "ollama": {"error": "ollama 실패"}}
+    assert engine.hedge_stats["total"] == 0
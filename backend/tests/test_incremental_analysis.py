@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from app.services.incremental_analysis import IncrementalAnalysisStore
+
+def _summary(**amounts: float) -> dict:
+    """카테고리별 금액(건수 1)으로 만든 거래 집계"""
+    return {
+        "total_amount": sum(amounts.values()),
+        "total_transactions": len(amounts),
+        "categories": {name: {"count": 1, "amount": amount} for name, amount in amounts.items()}
+    }
+
+BASE_RESULT = {"summary": "식비 위주 소비", "category_analysis": {"식비": {"percentage": 80.0}, "교통": {"percentage": 20.0}}}
+
+def _store(**kwargs) -> IncrementalAnalysisStore:
+    store = IncrementalAnalysisStore(**{"threshold": 0.05, "max_age": 3600, "max_baselines": 10, **kwargs})
+    store.save("user-1", "pattern", _summary(식비=80000, 교통=20000), BASE_RESULT, "gemini", "gemini")
+    return store
+
+def test_small_change_reuses_result_with_refreshed_numbers():
+    store = _store()
+    reused = store.reuse("user-1", "pattern", _summary(식비=84000, 교통=20000), "gemini")
+    
+    assert reused["model_used"] == "gemini"
+    assert reused["analysis"]["summary"] == "식비 위주 소비"
+    assert reused["analysis"]["category_analysis"]["식비"]["percentage"] == 80.8
+    assert reused["analysis"]["incremental"]["change_ratio"] == 0.04
+    # 저장된 기준 결과는 바뀌지 않음
+    assert BASE_RESULT["category_analysis"]["식비"]["percentage"] == 80.0
+    assert store.stats["reused"] == 1
+
+def test_change_over_threshold_or_new_category_is_not_reused():
+    store = _store()
+    assert store.reuse("user-1", "pattern", _summary(식비=86000, 교통=20000), "gemini") is None
+    assert store.reuse("user-1", "pattern", _summary(식비=80000, 교통=20000, 쇼핑=100), "gemini") is None
+    assert store.stats == {"reused": 0, "missed": 2, "evicted": 0}
+
+def test_other_model_or_disabled_threshold_is_not_reused():
+    store = _store()
+    assert store.reuse("user-1", "pattern", _summary(식비=80000, 교통=20000), "ollama") is None
+    
+    store.threshold = 0
+    assert store.reuse("user-1", "pattern", _summary(식비=80000, 교통=20000), "gemini") is None
+
+def test_baseline_older_than_max_age_is_discarded():
+    store = _store()
+    store.baselines["user-1:pattern:gemini"]["analyzed_at"] = datetime.now() - timedelta(seconds=3601)
+    
+    assert store.reuse("user-1", "pattern", _summary(식비=80000, 교통=20000), "gemini") is None
+    assert store.baselines == {}
+
+def test_oldest_baselines_are_evicted_over_limit():
+    store = _store(max_baselines=2)
+    store.save("user-2", "pattern", _summary(식비=1000), BASE_RESULT, "gemini", "gemini")
+    store.save("user-3", "report", _summary(식비=1000), {"executive_summary": "요약"}, "gemini", "gemini")
+    # optimization은 수치를 다시 계산할 수 없어 저장하지 않음
+    store.save("user-4", "optimization", _summary(식비=1000), {"priority_actions": []}, "gemini", "gemini")
+    
+    assert list(store.baselines) == ["user-2:pattern:gemini", "user-3:report:gemini"]
+    assert store.get_metrics() == {"baselines": 2, "reused": 0, "missed": 0, "evicted": 1}
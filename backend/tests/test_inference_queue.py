@@ -0,0 +1,98 @@
+import asyncio
+from app.services import inference_queue as inference_queue_module
+from app.services.inference_queue import InferenceQueue, ResourcePool, PRIORITY_INTERACTIVE, PRIORITY_SCHEDULED
+
+def _configure(monkeypatch, total: int, per_server: int) -> None:
+    """Ollama 전체/서버당 동시 실행 수 설정"""
+    monkeypatch.setattr(inference_queue_module.settings, "ollama_max_concurrency", total, raising=False)
+    monkeypatch.setattr(inference_queue_module.settings, "ollama_server_max_concurrency", per_server, raising=False)
+
+def test_slow_server_does_not_stall_other_servers(monkeypatch):
+    _configure(monkeypatch, total=4, per_server=1)
+    queue = InferenceQueue()
+    requests_per_server = 4
+    
+    async def scenario():
+        slow_release = asyncio.Event()
+        
+        async def call(server_url: str, user_id: str, work: asyncio.Event = None) -> str:
+            async with queue.slot("ollama", user_id, server_url=server_url):
+                if work is not None:
+                    await work.wait()
+            return server_url
+        
+        # 느린 서버에 먼저 요청이 몰림 (첫 요청이 끝나지 않는 동안 나머지는 서버 슬롯 대기)
+        slow = [
+            asyncio.create_task(call("http://slow:11434", f"slow-{i}", slow_release))
+            for i in range(requests_per_server)
+        ]
+        await asyncio.sleep(0)
+        
+        # 다른 서버 요청은 느린 서버를 기다리지 않고 모두 완료
+        fast = [
+            asyncio.create_task(call("http://fast:11434", f"fast-{i}"))
+            for i in range(requests_per_server)
+        ]
+        done = await asyncio.wait_for(asyncio.gather(*fast), timeout=1)
+        assert done == ["http://fast:11434"] * requests_per_server
+        assert not any(task.done() for task in slow)
+        
+        # 느린 서버 대기 요청은 전체 슬롯을 잡지 않음
+        assert queue.pools["ollama"].in_flight == 1
+        assert queue.pools["ollama:http://slow:11434"].queue_depth() == requests_per_server - 1
+        
+        slow_release.set()
+        await asyncio.wait_for(asyncio.gather(*slow), timeout=1)
+        assert queue.pools["ollama"].in_flight == 0
+    
+    asyncio.run(scenario())
+
+def test_queue_serves_interactive_first_and_round_robins_users():
+    pool = ResourcePool("test", capacity=1)
+    order = []
+    
+    async def scenario():
+        await pool.acquire("holder", PRIORITY_INTERACTIVE)
+        
+        async def request(user_id: str, priority: str, label: str) -> None:
+            await pool.acquire(user_id, priority)
+            order.append(label)
+            pool.release()
+        
+        # 사용자 A가 먼저 여러 건을 넣어도 B가 사이에 실행되고, 스케줄 작업은 대화형 요청 뒤에 실행
+        tasks = [
+            asyncio.create_task(request("batch", PRIORITY_SCHEDULED, "batch-1")),
+            asyncio.create_task(request("a", PRIORITY_INTERACTIVE, "a-1")),
+            asyncio.create_task(request("a", PRIORITY_INTERACTIVE, "a-2")),
+            asyncio.create_task(request("a", PRIORITY_INTERACTIVE, "a-3")),
+            asyncio.create_task(request("b", PRIORITY_INTERACTIVE, "b-1"))
+        ]
+        await asyncio.sleep(0)
+        assert pool.queue_depth(PRIORITY_INTERACTIVE) == 4
+        assert pool.queue_depth(PRIORITY_SCHEDULED) == 1
+        
+        pool.release()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+    
+    asyncio.run(scenario())
+    assert order == ["a-1", "b-1", "a-2", "a-3", "batch-1"]
+    assert pool.in_flight == 0
+
+def test_cancelled_waiter_does_not_take_slot():
+    pool = ResourcePool("test", capacity=1)
+    
+    async def scenario():
+        await pool.acquire("holder", PRIORITY_INTERACTIVE)
+        cancelled = asyncio.create_task(pool.acquire("a", PRIORITY_INTERACTIVE))
+        waiting = asyncio.create_task(pool.acquire("b", PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert pool.queue_depth() == 1
+        
+        pool.release()
+        await asyncio.wait_for(waiting, timeout=1)
+        assert pool.in_flight == 1
+    
+    asyncio.run(scenario())
@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+from app.services import ollama_server_pool as ollama_server_pool_module
+from app.services.ollama_server_pool import OllamaServerPool, STRATEGY_LATENCY
+
+A, B, C = "http://a:11434", "http://b:11434", "http://c:11434"
+
+def _pool(monkeypatch, models: dict, down: tuple = (), hot: dict = None, tier_model: str = None, strategy: str = "least_outstanding") -> OllamaServerPool:
+    """서버별 모델 목록(None이면 연결 불가), 브레이커가 열린 서버, 로드된 모델을 지정한 서버 풀"""
+    for name, value in (
+        ("ollama_pool_servers", ",".join(models)),
+        ("ollama_pool_strategy", strategy),
+        ("ollama_server_max_concurrency", 1)
+    ):
+        monkeypatch.setattr(ollama_server_pool_module.settings, name, value, raising=False)
+    
+    async def get_capabilities(url):
+        return {"available": models[url] is not None, "models": models[url] or []}
+    
+    hot = hot or {}
+    monkeypatch.setattr(ollama_server_pool_module.ollama_capability_registry, "get_capabilities", get_capabilities)
+    monkeypatch.setattr(ollama_server_pool_module.circuit_breakers, "get", lambda provider, url: SimpleNamespace(rejecting=lambda: url in down))
+    monkeypatch.setattr(
+        ollama_server_pool_module.model_router, "preferred_model",
+        lambda provider, analysis_type, input_tokens, available_models=None: (
+            tier_model if available_models is None or tier_model in available_models else None
+        )
+    )
+    monkeypatch.setattr(ollama_server_pool_module.ollama_model_manager, "select_model", lambda models, url, analysis_type: models[0])
+    monkeypatch.setattr(ollama_server_pool_module.ollama_model_manager, "is_hot", lambda url, model: model in hot.get(url, ()))
+    return OllamaServerPool()
+
+def test_select_skips_unavailable_and_open_breaker_servers(monkeypatch):
+    pool = _pool(monkeypatch, {A: ["llama3"], B: None, C: ["llama3"]}, down=(C,))
+    assert [asyncio.run(pool.select()) for _ in range(3)] == [A, A, A]
+    assert asyncio.run(pool.select(exclude=[A])) in (B, C)
+    assert asyncio.run(pool.select(exclude=[A, B, C])) is None
+
+def test_select_falls_back_to_all_servers_when_none_healthy(monkeypatch):
+    pool = _pool(monkeypatch, {A: None, B: ["llama3"]}, down=(B,))
+    # 정상 서버가 없으면 남은 서버 전체에서 골라 빠르게 실패
+    assert {asyncio.run(pool.select()) for _ in range(4)} == {A, B}
+
+def test_select_prefers_least_outstanding_and_rotates_ties(monkeypatch):
+    pool = _pool(monkeypatch, {A: ["llama3"], B: ["llama3"], C: ["llama3"]})
+    assert {asyncio.run(pool.select()) for _ in range(3)} == {A, B, C}
+    
+    pool.outstanding = {A: 2, B: 0, C: 1}
+    assert asyncio.run(pool.select()) == B
+
+def test_select_prefers_servers_with_tier_model_loaded(monkeypatch):
+    models = {A: ["llama3"], B: ["llama3", "qwen"], C: ["llama3", "qwen"]}
+    pool = _pool(monkeypatch, models, hot={C: ("qwen",)}, tier_model="qwen")
+    pool.outstanding = {A: 0, B: 0, C: 0}
+    
+    # 티어 모델이 있고 이미 로드된 서버 우선
+    assert asyncio.run(pool.select("pattern")) == C
+    assert pool.stats[C]["affinity"] == 1
+    
+    # 로드된 서버가 바쁘면 티어 모델이 있는 한가한 서버로 분산
+    pool.outstanding[C] = 1
+    assert asyncio.run(pool.select("pattern")) == B
+    assert pool.stats[B]["affinity"] == 0
+
+def test_latency_strategy_weights_outstanding_by_average_latency(monkeypatch):
+    pool = _pool(monkeypatch, {A: ["llama3"], B: ["llama3"]}, strategy=STRATEGY_LATENCY)
+    pool.record(A, 1000, success=True)
+    pool.record(A, 2000, success=True)
+    pool.record(B, 900, success=True)
+    pool.record(B, 5000, success=False)
+    pool.record("http://other:11434", 1, success=True)
+    
+    assert pool.latency_ms == {A: 1300.0, B: 900}
+    assert pool.stats[B]["failures"] == 1
+    assert asyncio.run(pool.select()) == B
+    
+    # 대기 요청이 있으면 (사용 중 요청 수 + 1) x 평균 지연으로 비교
+    pool.outstanding[B] = 1
+    assert asyncio.run(pool.select()) == A
+
+def test_lease_counts_outstanding_requests(monkeypatch):
+    pool = _pool(monkeypatch, {A: ["llama3"], B: ["llama3"]})
+    
+    async def scenario():
+        async with pool.lease() as first, pool.lease() as second:
+            assert {first, second} == {A, B}
+            assert pool.outstanding == {A: 1, B: 1}
+        assert pool.outstanding == {A: 0, B: 0}
+        
+        # 개인 서버가 있으면 풀을 거치지 않음
+        async with pool.lease("http://mine:11434") as url:
+            assert url == "http://mine:11434"
+    
+    asyncio.run(scenario())
@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+from app.services.ai_analysis_engine import AIAnalysisEngine
+from app.services.request_deadline import request_deadline
+
+TRANSACTIONS = [{"amount": 12000, "transaction_date": "2024-05-01", "original_merchant_name": "카페"}]
+
+def _engine(monkeypatch, release: asyncio.Event, error: Exception = None):
+    """_analyze_uncached를 release 이후 결과를 내는 함수로 바꾼 엔진 (error가 있으면 첫 호출만 실패)"""
+    engine = AIAnalysisEngine()
+    engine.calls = 0
+    
+    async def analyze_uncached(user, transactions_data, analysis_type, db, priority, preferred_model, cache_key):
+        engine.calls += 1
+        await release.wait()
+        if error is not None and engine.calls == 1:
+            raise error
+        return {"model_used": preferred_model, "analysis": {"summary": f"분석 {engine.calls}"}, "cached": False}
+    
+    monkeypatch.setattr(engine, "_analyze_uncached", analyze_uncached)
+    return engine
+
+def _analyze(engine: AIAnalysisEngine) -> asyncio.Task:
+    user = SimpleNamespace(id="user-1", preferred_ai_model="gemini")
+    return asyncio.ensure_future(engine.analyze_with_preferred_ai(user, TRANSACTIONS, "pattern"))
+
+def test_concurrent_requests_share_one_analysis(monkeypatch):
+    async def scenario():
+        release = asyncio.Event()
+        engine = _engine(monkeypatch, release)
+        leader = _analyze(engine)
+        await asyncio.sleep(0)
+        followers = [_analyze(engine) for _ in range(3)]
+        await asyncio.sleep(0)
+        
+        release.set()
+        results = await asyncio.wait_for(asyncio.gather(leader, *followers), timeout=1)
+        
+        assert engine.calls == 1
+        assert results[0] == {"model_used": "gemini", "analysis": {"summary": "분석 1"}, "cached": False}
+        assert all(result == {**results[0], "coalesced": True} for result in results[1:])
+        assert engine.single_flight_stats == {"leaders": 1, "coalesced": 3}
+        assert engine._in_flight == {}
+    
+    asyncio.run(scenario())
+
+def test_leader_failure_reaches_followers_and_clears_flight(monkeypatch):
+    async def scenario():
+        release = asyncio.Event()
+        engine = _engine(monkeypatch, release, error=RuntimeError("provider down"))
+        leader = _analyze(engine)
+        await asyncio.sleep(0)
+        follower = _analyze(engine)
+        await asyncio.sleep(0)
+        
+        release.set()
+        # 팔로워도 같은 오류를 받고 멈춰 있지 않음
+        results = await asyncio.wait_for(asyncio.gather(leader, follower, return_exceptions=True), timeout=1)
+        assert [str(result) for result in results] == ["provider down", "provider down"]
+        assert engine._in_flight == {}
+        
+        # 실패한 분석은 공유되지 않고 다음 요청이 새로 실행
+        retried = await asyncio.wait_for(_analyze(engine), timeout=1)
+        assert retried["analysis"] == {"summary": "분석 2"}
+        assert engine.calls == 2
+        assert engine.single_flight_stats["leaders"] == 2
+    
+    asyncio.run(asyncio.wait_for(scenario(), timeout=2))
+
+def test_cancelled_follower_does_not_affect_others(monkeypatch):
+    async def scenario():
+        release = asyncio.Event()
+        engine = _engine(monkeypatch, release)
+        leader = _analyze(engine)
+        await asyncio.sleep(0)
+        cancelled, follower = _analyze(engine), _analyze(engine)
+        await asyncio.sleep(0)
+        
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert cancelled.cancelled()
+        assert len(engine._in_flight) == 1
+        
+        release.set()
+        results = await asyncio.wait_for(asyncio.gather(leader, follower), timeout=1)
+        assert results[1]["analysis"] == results[0]["analysis"] == {"summary": "분석 1"}
+        assert engine.calls == 1
+    
+    asyncio.run(scenario())
+
+def test_cancelled_leader_keeps_analysis_running_for_followers(monkeypatch):
+    async def scenario():
+        release = asyncio.Event()
+        engine = _engine(monkeypatch, release)
+        leader = _analyze(engine)
+        await asyncio.sleep(0)
+        follower = _analyze(engine)
+        await asyncio.sleep(0)
+        
+        # 먼저 요청한 사용자가 연결을 끊어도 분석은 계속 진행
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert leader.cancelled()
+        
+        release.set()
+        result = await asyncio.wait_for(follower, timeout=1)
+        assert result["analysis"] == {"summary": "분석 1"}
+        assert result["coalesced"] is True
+        assert engine.calls == 1
+    
+    asyncio.run(scenario())
+
+def test_follower_past_deadline_falls_back_to_local(monkeypatch):
+    async def scenario():
+        release = asyncio.Event()
+        engine = _engine(monkeypatch, release)
+        monkeypatch.setattr(engine, "_analyze_with_local", lambda transactions_data, analysis_type: {"summary": "로컬"})
+        leader = _analyze(engine)
+        await asyncio.sleep(0)
+        
+        # 마감이 짧은 팔로워는 남은 시간까지만 기다리고 로컬 분석 반환
+        with request_deadline.scope(0.05):
+            follower = _analyze(engine)
+        result = await asyncio.wait_for(follower, timeout=1)
+        assert result == {"model_used": "local", "analysis": {"summary": "로컬", "deadline_exceeded": True}, "cached": False}
+        assert not leader.done()
+        
+        release.set()
+        assert (await asyncio.wait_for(leader, timeout=1))["analysis"] == {"summary": "분석 1"}
+    
+    asyncio.run(scenario())
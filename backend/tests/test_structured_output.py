@@ -0,0 +1,52 @@
+from app.services.structured_output import StreamingJSONExtractor, repair_json, extract_json, structured_output_parser
+
+def test_repair_json_fixes_common_llm_mistakes():
+    # 후행 쉼표, 문자열 안의 실제 개행
+    assert repair_json('{"a": [1, 2,], "b": "x",}') == {"a": [1, 2], "b": "x"}
+    assert repair_json('{"summary": "첫 줄\n둘째 줄"}') == {"summary": "첫 줄\n둘째 줄"}
+
+def test_repair_json_closes_truncated_output():
+    # 잘린 문자열/배열/객체
+    assert repair_json('{"summary": "요약", "habits": ["커피", "택') == {"summary": "요약", "habits": ["커피", "택"]}
+    # 값 없이 잘린 키는 제거
+    assert repair_json('{"summary": "요약", "recommen') == {"summary": "요약"}
+    assert repair_json('{"summary": "요약", "score":') == {"summary": "요약", "score": None}
+    # 잘린 리터럴/숫자
+    assert repair_json('{"ok": tr') == {"ok": None}
+    assert repair_json('{"ok": true, "amount": 12.') == {"ok": True, "amount": 12}
+
+def test_repair_json_returns_none_when_unrecoverable():
+    assert repair_json('{"a": }') is None
+
+def test_streaming_extractor_finds_first_object_across_chunks():
+    extractor = StreamingJSONExtractor()
+    chunks = ['분석 결과입니다:\n{"summary": "중괄호 } 와 ', '따옴표 \\" 포함", ', '"items": [{"a": 1}]', '}\n추가 설명 {"b": 2}']
+    
+    completed = [extractor.feed(chunk) for chunk in chunks]
+    
+    # 문자열 안의 괄호/이스케이프된 따옴표는 무시하고 마지막 청크에서 완료
+    assert completed == [False, False, False, True]
+    assert extractor.result() == ({"summary": '중괄호 } 와 따옴표 " 포함', "items": [{"a": 1}]}, False)
+    # 완료 이후 입력은 무시
+    assert extractor.feed('{"c": 3}')
+    assert extractor.result()[0]["items"] == [{"a": 1}]
+
+def test_streaming_extractor_repairs_incomplete_object():
+    extractor = StreamingJSONExtractor()
+    assert not extractor.feed('{"summary": "잘린 응답", "habits": ["a",')
+    assert not extractor.complete
+    assert extractor.result() == ({"summary": "잘린 응답", "habits": ["a"]}, True)
+    
+    assert StreamingJSONExtractor().result() == (None, False)
+
+def test_extract_json_and_parser_report_repairs():
+    assert extract_json('```json\n{"summary": "x"}\n```') == ({"summary": "x"}, False)
+    
+    result = structured_output_parser.parse('{"summary": "x", "category_analysis": {}, "spending_habits": [], "recommendations": [', "pattern", "test")
+    assert result["summary"] == "x"
+    assert "error" not in result
+    assert structured_output_parser.stats["test"]["repaired"] == 1
+    
+    missing = structured_output_parser.parse('{"title": "리포트"}', "pattern", "test")
+    assert missing["error"].startswith("응답에 필수 항목이 없습니다")
+    assert "raw_response" in missing
@@ -0,0 +1,26 @@
+from datetime import datetime
+from app.services.transaction_summary import build_transaction_summary, DEFAULT_CATEGORY
+
+def test_top_merchants_skip_missing_merchant_names():
+    transactions = [
+        {"amount": 90000, "transaction_date": datetime(2024, 5, 1), "original_merchant_name": None},
+        {"amount": 80000, "transaction_date": datetime(2024, 5, 2), "original_merchant_name": ""},
+        {"amount": 30000, "transaction_date": datetime(2024, 5, 3), "original_merchant_name": "마트", "manual_category": "식비"},
+        {"amount": 10000, "transaction_date": datetime(2024, 5, 4), "original_merchant_name": "카페", "manual_category": "식비"},
+        {"amount": 5000, "transaction_date": datetime(2024, 5, 4), "original_merchant_name": "카페", "manual_category": "식비"}
+    ]
+    
+    summary = build_transaction_summary(transactions, top_merchants=5)
+    
+    # 가맹점명이 없는 거래는 금액이 커도 상위 가맹점에 들어가지 않음 (합계/카테고리에는 포함)
+    assert summary["top_merchants"] == [
+        {"merchant": "마트", "amount": 30000.0, "count": 1},
+        {"merchant": "카페", "amount": 15000.0, "count": 2}
+    ]
+    assert summary["total_amount"] == 215000.0
+    assert summary["categories"][DEFAULT_CATEGORY] == {"count": 2, "amount": 170000.0}
+
+def test_top_merchants_empty_when_no_merchant_names():
+    summary = build_transaction_summary([{"amount": 1000, "transaction_date": "2024-05-01"}])
+    assert summary["top_merchants"] == []
+    assert summary["date_range"] == {"start": "2024-05-01", "end": "2024-05-01"}
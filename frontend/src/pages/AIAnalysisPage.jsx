@@ -202,7 +202,9 @@ function AIAnalysisPage() {
     { value: 'auto', label: '자동 선택' },
     { value: 'gemini', label: 'Google Gemini' },
     { value: 'ollama', label: 'Ollama (로컬)' },
-    { value: 'hybrid', label: '하이브리드' }
+    { value: 'hybrid', label: '하이브리드' },
+    { value: 'hybrid_fast', label: '하이브리드 (빠른 응답)' },
+    { value: 'local', label: '빠른 분석 (LLM 없음)' }
   ];
 
   return (
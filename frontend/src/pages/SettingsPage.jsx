@@ -188,6 +188,8 @@ function SettingsPage() {
                     <SelectItem value="gemini">Google Gemini</SelectItem>
                     <SelectItem value="ollama">Ollama (로컬)</SelectItem>
                     <SelectItem value="hybrid">하이브리드</SelectItem>
+                    <SelectItem value="hybrid_fast">하이브리드 (빠른 응답)</SelectItem>
+                    <SelectItem value="local">빠른 분석 (LLM 없음)</SelectItem>
                   </SelectContent>
                 </Select>
                 <p className="text-sm text-muted-foreground">
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+AI 분석 엔진 오프라인 벤치마크 (가짜 프로바이더 백엔드로 캐시/하이브리드/fallback 시나리오 측정)
+
+실제 Gemini/Ollama 호출 없이 엔진의 추론 대기열, 서킷 브레이커, 캐시, single-flight, fallback 경로를 그대로 실행한다.
+
+사용법: python scripts/benchmark_ai_engine.py [동시 요청 수] [시나리오별 요청 수]
+동시 실행 한도는 GEMINI_MAX_CONCURRENCY / OLLAMA_MAX_CONCURRENCY / OLLAMA_SERVER_MAX_CONCURRENCY로,
+모델 라우터의 지연 기준은 MODEL_ROUTER_LATENCY_SLO_MS로 조정한다.
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+# 설정 로드 전에 벤치마크용 기본 동시 실행 한도 지정 (환경 변수가 있으면 우선)
+os.environ.setdefault("GEMINI_MAX_CONCURRENCY", "32")
+os.environ.setdefault("OLLAMA_MAX_CONCURRENCY", "8")
+os.environ.setdefault("OLLAMA_SERVER_MAX_CONCURRENCY", "8")
+os.environ.setdefault("MODEL_ROUTER_LATENCY_SLO_MS", "1000")
+
+from app.services.llm_backends import FakeLLMBackend, set_llm_backend
+from app.services.ai_analysis_engine import ai_analysis_engine
+from app.services.circuit_breaker import circuit_breakers
+from app.services.ollama_capability_registry import ollama_capability_registry
+from app.services.model_router import model_router
+from app.services.ollama_service import early_stop_stats
+from app.services.ollama_model_benchmark_service import ollama_model_benchmark_service
+from app.core.config import settings
+
+OLLAMA_URL = "http://fake-ollama:11434"
+CATEGORIES = ["식비", "쇼핑", "교통", "문화", "의료", "주거", "기타"]
+
+FAST_GEMINI = {"latency": 0.3, "tokens_per_second": 800}
+SLOW_OLLAMA = {"latency": 0.5, "tokens_per_second": 400, "load_latency": 2.0}
+FAILING = {"failure_rate": 1.0, "latency": 0.1}
+SLOW_FAST_TIER = {"latency": 1.5, "tokens_per_second": 800}  # MODEL_ROUTER_LATENCY_SLO_MS(1000ms) 초과
+CHATTY_OLLAMA = {**SLOW_OLLAMA, "trailing_text": "\n\n참고: " + "위 분석에 대한 추가 설명입니다. " * 150}  # JSON 뒤에 설명을 덧붙이는 모델
+
+# (이름, 사용자 선호 모델, 사용자마다 다른 데이터 여부, 프로바이더별 가짜 백엔드 설정)
+SCENARIOS = [
+    ("캐시 + single-flight (동일 요청)", "gemini", False, {"gemini": FAST_GEMINI}),
+    ("gemini (서로 다른 요청)", "gemini", True, {"gemini": FAST_GEMINI}),
+    ("ollama (서로 다른 요청)", "ollama", True, {"ollama": SLOW_OLLAMA}),
+    ("hybrid (두 모델 결과 비교)", "hybrid", True, {"gemini": FAST_GEMINI, "ollama": SLOW_OLLAMA}),
+    ("hybrid_fast (헤징)", "hybrid_fast", True, {"gemini": FAST_GEMINI, "ollama": SLOW_OLLAMA}),
+    ("hybrid_shadow (응답 후 백그라운드 비교)", "hybrid_shadow", True, {"gemini": FAST_GEMINI, "ollama": SLOW_OLLAMA}),
+    ("ollama JSON 뒤 설명 -> 조기 종료 (OLLAMA_EARLY_STOP)", "ollama", True, {"ollama": CHATTY_OLLAMA}),
+    ("ollama 장애 -> gemini fallback", "ollama", True, {"gemini": FAST_GEMINI, "ollama": FAILING}),
+    ("gemini 장애 -> 브레이커 -> ollama fallback", "gemini", True, {"gemini": FAILING, "ollama": SLOW_OLLAMA}),
+    ("전체 장애 -> local fallback", "gemini", True, {"gemini": FAILING, "ollama": FAILING}),
+    ("fast 티어 지연 -> 라우터 strong 전환", "gemini", True, {"gemini": FAST_GEMINI, f"gemini:{settings.gemini_fast_model}": SLOW_FAST_TIER}),
+]
+
+def generate_transactions(n: int, seed: int = 42):
+    """벤치마크용 가상 거래 데이터 생성"""
+    rng = random.Random(seed)
+    base = datetime.now() - timedelta(days=30)
+    return [
+        {
+            "amount": float(rng.randint(1000, 200000)),
+            "transaction_type": "결제",
+            "transaction_date": base + timedelta(minutes=rng.randint(0, 30 * 24 * 60)),
+            "original_merchant_name": f"가맹점_{rng.randint(0, 200)}",
+            "manual_category": rng.choice(CATEGORIES),
+            "memo": ""
+        }
+        for _ in range(n)
+    ]
+
+def reset_engine(profiles):
+    """시나리오 간 엔진 상태 초기화 후 새 가짜 백엔드 설치"""
+    ai_analysis_engine.clear_cache()
+    circuit_breakers.breakers.clear()
+    ollama_capability_registry.clear()
+    model_router.samples.clear()
+    model_router.routed.clear()
+    backend = FakeLLMBackend(profiles, seed=42)
+    set_llm_backend(backend)
+    return backend
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run_scenario(name, model, distinct, profiles, concurrency, total):
+    backend = reset_engine(profiles)
+    shared_user = SimpleNamespace(id=uuid.uuid4(), preferred_ai_model=model, ollama_server_url=OLLAMA_URL)
+    transactions = generate_transactions(200)
+    coalesced_before = ai_analysis_engine.single_flight_stats["coalesced"]
+    shadow_before = dict(ai_analysis_engine.shadow_stats)
+    early_stopped_before = early_stop_stats["stopped"]
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    models_used = Counter()
+    
+    async def one_request():
+        user = SimpleNamespace(id=uuid.uuid4(), preferred_ai_model=model, ollama_server_url=OLLAMA_URL) if distinct else shared_user
+        async with semaphore:
+            started = time.perf_counter()
+            result = await ai_analysis_engine.analyze_with_preferred_ai(user, transactions, "pattern")
+            latencies.append((time.perf_counter() - started) * 1000)
+            models_used[result["model_used"] + (" (cached)" if result.get("cached") else "")] += 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    # 섀도 비교는 응답 지연에 포함되지 않으므로 측정 후 완료를 기다려 호출 수에만 반영
+    await ai_analysis_engine.wait_for_shadow_comparisons()
+    
+    calls = {provider: stats["calls"] + stats["streams"] for provider, stats in backend.stats.items()}
+    print(f"\n[{name}]")
+    print(f"  처리량 {total / elapsed:>8.1f} req/s   p50 {percentile(latencies, 0.5):>8.1f} ms   p95 {percentile(latencies, 0.95):>8.1f} ms")
+    print(f"  사용 모델: {dict(models_used)}")
+    print(f"  프로바이더 호출: {calls}   single-flight 합류: {ai_analysis_engine.single_flight_stats['coalesced'] - coalesced_before}")
+    print(f"  모델 라우팅: {model_router.routed}")
+    if early_stop_stats["stopped"] > early_stopped_before:
+        print(f"  Ollama 조기 종료: {early_stop_stats['stopped'] - early_stopped_before}건")
+    if model == "hybrid_shadow":
+        shadow = ai_analysis_engine.shadow_stats
+        print(
+            f"  섀도 비교: 시작 {shadow['started'] - shadow_before['started']}건, "
+            f"건너뜀 {shadow['skipped'] - shadow_before['skipped']}건, 완료 {shadow['completed'] - shadow_before['completed']}건"
+        )
+
+# 모델 벤치마크 -> 자동 선택: 기본 모델보다 빠른 작은 모델, 항상 실패하는 모델
+BENCHMARK_MODELS = {
+    "ollama": {**SLOW_OLLAMA, "models": ["llama3", "qwen2.5:3b", "broken:1b"]},
+    "ollama:qwen2.5:3b": {"latency": 0.1, "tokens_per_second": 2000, "load_latency": 0.5},
+    "ollama:broken:1b": {"latency": 0.05, "failure_rate": 1.0}
+}
+
+async def run_model_benchmark(concurrency, total):
+    """서버의 모델을 벤치마크한 뒤 같은 요청이 자동 선택 모델로 처리되는지 측정"""
+    reset_engine(BENCHMARK_MODELS)
+    ollama_model_benchmark_service.results.clear()
+    started = time.perf_counter()
+    result = await ollama_model_benchmark_service.benchmark(OLLAMA_URL, persist=False)
+    
+    print(f"\n[Ollama 모델 벤치마크 ({time.perf_counter() - started:.1f}s)]")
+    for model, by_type in result["models"].items():
+        for analysis_type, measured in by_type.items():
+            print(
+                f"  {model:<12} {analysis_type:<8} 유효 {measured['valid_runs']}/{measured['runs']}   "
+                f"평균 {measured['avg_latency_ms'] or 0:>8.1f} ms   {measured['tokens_per_second'] or 0:>8.1f} tok/s   "
+                f"로드 {measured['load_ms'] or 0:>7.1f} ms"
+            )
+    print(f"  자동 선택: {result['selected']}")
+    
+    await run_scenario("ollama (벤치마크 자동 선택 모델)", "ollama", True, BENCHMARK_MODELS, concurrency, total)
+
+async def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    print(f"동시 요청 {concurrency}, 시나리오별 요청 {total}건 (가짜 백엔드)")
+    
+    for name, model, distinct, profiles in SCENARIOS:
+        await run_scenario(name, model, distinct, profiles, concurrency, total)
+    
+    await run_model_benchmark(concurrency, total)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+거래 요약 엔진 벤치마크 (기존 Python 루프 vs 컬럼형 벡터 연산)
+
+사용법: python scripts/benchmark_transaction_summary.py [행 수]
+"""
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from app.services.transaction_summary import TransactionColumns, summarize_transactions
+
+CATEGORIES = ["식비", "쇼핑", "교통", "문화", "의료", "주거", "기타"]
+
+def generate_transactions(n: int):
+    """벤치마크용 가상 거래 데이터 생성"""
+    rng = random.Random(42)
+    base = datetime(2024, 1, 1)
+    merchants = [f"가맹점_{i}" for i in range(5000)]
+    return [
+        {
+            "amount": float(rng.randint(1000, 200000)),
+            "transaction_date": base + timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+            "original_merchant_name": rng.choice(merchants),
+            "manual_category": rng.choice(CATEGORIES),
+        }
+        for _ in range(n)
+    ]
+
+def legacy_summary(transactions):
+    """기존 GeminiService._prepare_transaction_summary 구현 (비교용)"""
+    categories = {}
+    total_amount = 0
+    for transaction in transactions:
+        amount = float(transaction.get("amount", 0))
+        category = transaction.get("manual_category", "기타")
+        if category not in categories:
+            categories[category] = {"count": 0, "amount": 0, "transactions": []}
+        categories[category]["count"] += 1
+        categories[category]["amount"] += amount
+        categories[category]["transactions"].append({
+            "merchant": transaction.get("original_merchant_name", ""),
+            "amount": amount,
+            "date": transaction.get("transaction_date", "").strftime("%Y-%m-%d") if transaction.get("transaction_date") else ""
+        })
+        total_amount += amount
+    return {
+        "total_transactions": len(transactions),
+        "total_amount": total_amount,
+        "categories": categories,
+        "date_range": {
+            "start": min(t.get("transaction_date", "") for t in transactions if t.get("transaction_date")),
+            "end": max(t.get("transaction_date", "") for t in transactions if t.get("transaction_date"))
+        }
+    }
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<40} {(time.perf_counter() - started) * 1000:>10.1f} ms")
+    return result
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"거래 {n:,}건 생성 중...")
+    transactions = generate_transactions(n)
+    
+    legacy = timed("기존 Python 루프 (dict 입력)", legacy_summary, transactions)
+    columns = timed("컬럼 변환 (dict -> 배열)", TransactionColumns.from_records, transactions)
+    summary = timed("벡터 요약 (배열 입력)", summarize_transactions, columns)
+    
+    # 결과 검증
+    assert summary["total_transactions"] == legacy["total_transactions"]
+    assert np.isclose(summary["total_amount"], legacy["total_amount"])
+    for category, data in legacy["categories"].items():
+        assert summary["categories"][category]["count"] == data["count"]
+        assert np.isclose(summary["categories"][category]["amount"], data["amount"])
+    print(f"검증 완료: 일별 추이 {len(summary['daily_series'])}일, 상위 가맹점 {summary['top_merchants'][0]['merchant']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+ai_analysis_logs 변환 (JSONB payload 일반 테이블 → 월 RANGE 파티션 + 압축 payload 해시)
+
+절차:
+1. 백엔드 서버 중지 후 데이터베이스 백업
+2. python scripts/migrate_ai_analysis_logs.py [--batch-size 1000]
+   - 기존 테이블을 ai_analysis_logs_legacy로 이름 변경, 새 파티션 테이블과 기존 로그 기간의 월 파티션 생성
+   - 기존 행을 배치로 복사하면서 payload를 압축/해시해 ai_analysis_payloads에 저장 (배치마다 커밋)
+   - 중단되면 다시 실행: 이미 복사된 행은 건너뛰고 이어서 복사
+3. 행 수 일치 메시지 확인 후 백엔드 서버 시작
+4. 로그 조회가 정상이면 python scripts/migrate_ai_analysis_logs.py --drop-legacy 로 기존 테이블 삭제
+"""
+import os
+import sys
+import argparse
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models import user  # noqa: F401 (users 외래 키 해석)
+from app.models.ai_analysis_log import AIAnalysisLog
+from app.models.ai_analysis_payload import AIAnalysisPayload
+from app.services.analysis_payload_store import analysis_payload_store, LOG_TABLE
+
+LEGACY_TABLE = f"{LOG_TABLE}_legacy"
+
+def table_exists(db: Session, name: str) -> bool:
+    """현재 스키마에 테이블이 있는지"""
+    return db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+def rename_legacy_table(db: Session) -> None:
+    """기존 테이블과 인덱스 이름 변경 (새 테이블의 기본 키/인덱스 이름과 충돌 방지)"""
+    db.execute(text(f"ALTER TABLE {LOG_TABLE} RENAME TO {LEGACY_TABLE}"))
+    indexes = db.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table AND schemaname = current_schema()"
+    ), {"table": LEGACY_TABLE}).scalars().all()
+    for name in indexes:
+        db.execute(text(f'ALTER INDEX "{name}" RENAME TO "{(name + "_legacy")[:63]}"'))
+
+def create_partitioned_table(db: Session, since: datetime = None) -> None:
+    """payload 테이블과 파티션 로그 테이블, since부터의 월 파티션 생성 (ensure_partitions가 커밋)"""
+    AIAnalysisPayload.__table__.create(db.connection(), checkfirst=True)
+    AIAnalysisLog.__table__.create(db.connection())
+    analysis_payload_store.ensure_partitions(db, since=since)
+
+def copy_rows(db: Session, batch_size: int) -> int:
+    """기존 행을 배치로 복사 (payload는 압축/해시 저장, 이미 복사된 행은 건너뜀)"""
+    legacy_columns = set(db.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_name = :table AND table_schema = current_schema()"
+    ), {"table": LEGACY_TABLE}).scalars())
+    # 두 테이블에 모두 있는 컬럼만 그대로 복사 (나머지는 새 테이블 기본값)
+    columns = [column.name for column in AIAnalysisLog.__table__.columns if column.name in legacy_columns]
+    
+    # 파티션 키가 비어 있는 행은 현재 시각으로 채움 (재실행해도 같은 값이 되도록 기존 테이블에 반영)
+    db.execute(text(f"UPDATE {LEGACY_TABLE} SET request_timestamp = now() WHERE request_timestamp IS NULL"))
+    db.commit()
+    
+    copied = 0
+    last_id = None
+    while True:
+        rows = db.execute(text(
+            f"SELECT {', '.join(columns)}, request_payload, response_payload FROM {LEGACY_TABLE} "
+            + ("WHERE id > :last_id " if last_id else "")
+            + "ORDER BY id LIMIT :limit"
+        ), {"last_id": last_id, "limit": batch_size}).mappings().all()
+        if not rows:
+            break
+        
+        hashes = analysis_payload_store.store_many(
+            db,
+            [row["request_payload"] for row in rows] + [row["response_payload"] for row in rows]
+        )
+        values = []
+        for i, row in enumerate(rows):
+            value = {column: row[column] for column in columns}
+            value["request_payload_hash"] = hashes[i]
+            value["response_payload_hash"] = hashes[len(rows) + i]
+            values.append(value)
+        
+        db.execute(
+            pg_insert(AIAnalysisLog)
+            .values(values)
+            .on_conflict_do_nothing(index_elements=["id", "request_timestamp"])
+        )
+        db.commit()
+        
+        copied += len(rows)
+        last_id = rows[-1]["id"]
+        print(f"{copied:,}행 처리")
+    return copied
+
+def count_missing(db: Session) -> int:
+    """새 테이블에 복사되지 않은 기존 행 수"""
+    return db.execute(text(
+        f"SELECT count(*) FROM {LEGACY_TABLE} l "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {LOG_TABLE} n WHERE n.id = l.id AND n.request_timestamp = l.request_timestamp)"
+    )).scalar()
+
+def main():
+    parser = argparse.ArgumentParser(description="ai_analysis_logs를 월 파티션 + payload 해시 구조로 변환")
+    parser.add_argument("--batch-size", type=int, default=1000, help="배치당 복사 행 수 (기본 1000)")
+    parser.add_argument("--drop-legacy", action="store_true", help="모든 행이 복사되었으면 기존 테이블 삭제")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        kind = analysis_payload_store.log_table_kind(db)
+        if kind == "legacy":
+            since = db.execute(text(f"SELECT min(request_timestamp) FROM {LOG_TABLE}")).scalar()
+            rename_legacy_table(db)
+            create_partitioned_table(db, since)
+            print(f"{LOG_TABLE} → {LEGACY_TABLE} 이름 변경, 파티션 테이블 생성 완료")
+        elif kind is None:
+            create_partitioned_table(db)
+            print(f"{LOG_TABLE} 파티션 테이블 생성 완료")
+        
+        if not table_exists(db, LEGACY_TABLE):
+            print(f"{LOG_TABLE}는 이미 파티션 테이블이며 복사할 기존 테이블이 없습니다.")
+            return
+        
+        missing = count_missing(db)
+        if missing:
+            started_at = datetime.now(timezone.utc)
+            copied = copy_rows(db, args.batch_size)
+            missing = count_missing(db)
+            print(f"복사 완료: {copied:,}행 처리, 누락 {missing:,}행 ({(datetime.now(timezone.utc) - started_at).total_seconds():.1f}초)")
+        
+        if args.drop_legacy:
+            if missing:
+                print(f"누락된 행이 있어 {LEGACY_TABLE}를 삭제하지 않습니다. 다시 실행해 주세요.")
+                sys.exit(1)
+            db.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+            db.commit()
+            print(f"{LEGACY_TABLE} 삭제 완료")
+        elif not missing:
+            print(f"확인 후 --drop-legacy로 다시 실행하면 {LEGACY_TABLE}를 삭제합니다.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()